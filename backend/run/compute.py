@@ -28,10 +28,21 @@ try:
     PARSER.add_argument("--repair_id", type=int, default=None)
     PARSER.add_argument("--extend_timeframe", type=float, default=None, help="proportion of duration to add past end date (e.g., 1.0 for double time)")
     PARSER.add_argument("--num_runs", type=int, default=None)
+    PARSER.add_argument("--ci_tolerance", type=float, default=None, help="stop resilience runs once every confidence interval half-width is at most this")
     PARSER.add_argument("--num_shift_hours", type=int, default=None)    
     PARSER.add_argument("--method", type=str, default=None)
     PARSER.add_argument("--num_levels", type=int, default=11)
-    PARSER.add_argument("--algorithm", type=str, default="heuristic")
+    PARSER.add_argument("--algorithm", type=str, default="heuristic", help="sizing algorithm (exact, heuristic or frontier)")
+    PARSER.add_argument("--engine", type=str, choices=run_helpers.ENGINES, default=run_helpers.ENGINE_TIMESTEP)
+    PARSER.add_argument("--weather_sample_method", type=str, choices=run_helpers.SAMPLE_METHODS, default="mean")
+    PARSER.add_argument("--seed", type=int, default=None, help="random number generator seed for weather and disturbance sampling")
+    PARSER.add_argument("--batch_size", type=int, default=None, help="number of sizing designs simulated in lockstep")
+    PARSER.add_argument("--num_workers", type=int, default=0, help="number of worker processes for sizing and resilience (0 for all available cpus)")
+    PARSER.add_argument("--stop_on_deficit", dest="stop_on_deficit", action="store_true", help="stop simulating sizing designs at their first deficit")
+    PARSER.add_argument("--screening_days", type=int, default=None, help="number of representative days to screen sizing designs on")
+    PARSER.add_argument("--coarse_hours", type=float, default=None, help="duration of aggregated timesteps to screen sizing designs on")
+    PARSER.add_argument("--energy_bounds", dest="energy_bounds", action="store_true", help="skip sizing designs that energy balances prove to have a deficit")
+    PARSER.add_argument("--resume", dest="resume", action="store_true", help="resume sizing from the checkpoint of an interrupted run")
     PARSER.add_argument("--debug", dest="debug", action="store_true")
     MODEL_TYPE = PARSER.parse_args().model_type
     RUN_ID = PARSER.parse_args().compute_id
@@ -80,8 +91,19 @@ try:
         NUM_RUNS = int(PARSER.parse_args().num_runs)
         NUM_SHIFT_HOURS = int(PARSER.parse_args().num_shift_hours)
         METHOD = PARSER.parse_args().method
+    CI_TOLERANCE = PARSER.parse_args().ci_tolerance
     NUM_LEVELS = PARSER.parse_args().num_levels
     ALGORITHM = PARSER.parse_args().algorithm
+    ENGINE = PARSER.parse_args().engine
+    BATCH_SIZE = PARSER.parse_args().batch_size
+    NUM_WORKERS = PARSER.parse_args().num_workers
+    STOP_ON_DEFICIT = PARSER.parse_args().stop_on_deficit
+    RESUME = PARSER.parse_args().resume
+    SCREENING_DAYS = PARSER.parse_args().screening_days
+    COARSE_HOURS = PARSER.parse_args().coarse_hours
+    ENERGY_BOUNDS = PARSER.parse_args().energy_bounds
+    WEATHER_SAMPLE_METHOD = PARSER.parse_args().weather_sample_method
+    RNG_SEED = PARSER.parse_args().seed
     DEBUG = PARSER.parse_args().debug
 
     RUN_PARAMS = {
@@ -91,16 +113,26 @@ try:
         run_helpers.ENERGY_MANAGEMENT_SYSTEM_ID:ENERGY_MANAGEMENT_SYSTEM_ID,
         run_helpers.STARTDATETIME:STARTDATETIME,
         run_helpers.ENDDATETIME:ENDDATETIME,
-        run_helpers.WEATHER_SAMPLE_METHOD : "mean", # NEED TO UPDATE FOR RESILIENCE
+        run_helpers.WEATHER_SAMPLE_METHOD : WEATHER_SAMPLE_METHOD,
+        run_helpers.RNG_SEED : RNG_SEED,
         run_helpers.DISTURBANCE_ID:DISTURBANCE_ID, # only applies to resilience
         run_helpers.DISTURBANCE_STARTDATETIME:DISTURBANCE_STARTDATETIME, # only applies to resilience
         run_helpers.REPAIR_ID:REPAIR_ID, # only applies to resilience
         run_helpers.EXTEND_TIMEFRAME:EXTEND_TIMEFRAME, # only applies to resilience
         run_helpers.NUM_RUNS:NUM_RUNS, # only applies to resilience
+        run_helpers.CI_TOLERANCE:CI_TOLERANCE, # only applies to resilience
         run_helpers.NUM_SHIFT_HOURS:NUM_SHIFT_HOURS, # only applies to resilience
         run_helpers.METHOD:METHOD, # only applies to resilience
         run_helpers.NUM_LEVELS:NUM_LEVELS, # only applies to sizing
         run_helpers.ALGORITHM:ALGORITHM, # only applies to sizing
+        run_helpers.ENGINE:ENGINE,
+        run_helpers.BATCH_SIZE:BATCH_SIZE, # only applies to sizing
+        run_helpers.NUM_WORKERS:NUM_WORKERS, # only applies to sizing and resilience
+        run_helpers.STOP_ON_DEFICIT:STOP_ON_DEFICIT, # only applies to sizing
+        run_helpers.RESUME:RESUME, # only applies to sizing
+        run_helpers.SCREENING_DAYS:SCREENING_DAYS, # only applies to sizing
+        run_helpers.COARSE_HOURS:COARSE_HOURS, # only applies to sizing
+        run_helpers.ENERGY_BOUNDS:ENERGY_BOUNDS, # only applies to sizing
         run_helpers.DEBUG:DEBUG,
     }
     send_email = True
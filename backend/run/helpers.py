@@ -2,6 +2,7 @@ import os
 import sys
 import configparser
 import json
+import hashlib
 import pickle
 import smtplib
 import time
@@ -10,6 +11,8 @@ from email.mime.text import MIMEText
 from datetime import datetime
 from src.grid import Grid, Disturbance
 from src.models import CoreSimulation, Weather, Sizing, Simulate, Resilience
+from src.models.core_simulation import ENGINES, ENGINE_TIMESTEP
+from src.models.weather import SAMPLE_METHODS
 import src.data.mysql.users as database_users
 import src.data.mysql.grids as database_grids
 from src.data.mysql import simulate, sizing, resilience
@@ -38,13 +41,25 @@ EXTEND_TIMEFRAME = "extend_timeframe_proportion"
 REPAIR_ID = "repair_id"
 ENERGY_MANAGEMENT_SYSTEM_ID = "energy_management_system_id"
 NUM_RUNS = "num_runs"
+CI_TOLERANCE = "ci_tolerance"
 NUM_SHIFT_HOURS = "disturbance_shift_hours"
 NUM_LEVELS = "num_levels"
 ALGORITHM = "algorithm"
 DEBUG = "debug"
 WEATHER_SAMPLE_METHOD = "weather_sample_method"
+ENGINE = "engine"
+BATCH_SIZE = "batch_size"
+NUM_WORKERS = "num_workers"
+STOP_ON_DEFICIT = "stop_on_deficit"
+RESUME = "resume"
+SCREENING_DAYS = "screening_days"
+COARSE_HOURS = "coarse_hours"
+ENERGY_BOUNDS = "energy_bounds"
 PARAMS_JSON_FILENAME = "params.json"
 PARAMS_PICKLE_FILENAME = "params.pkl"
+WEATHER_CACHE_DIRNAME = "weather_cache"
+SIZING_CACHE_DIRNAME = "sizing_cache"
+SIZING_CHECKPOINT_DIRNAME = "sizing_checkpoints"
 
 def initialize_simulation_object(run_param_dict):
     """
@@ -58,7 +73,9 @@ def initialize_simulation_object(run_param_dict):
     if len(components) == 0:
         raise ValueError("Cannot initialize_simulation_object on a microgrid with no components")
     try:
-        weather = Weather(run_param_dict[LOCATION_ID], run_param_dict[WEATHER_SAMPLE_METHOD])
+        weather = Weather(run_param_dict[LOCATION_ID], run_param_dict[WEATHER_SAMPLE_METHOD],
+                          cache_dir=get_cache_dir(WEATHER_CACHE_DIRNAME),
+                          seed=run_param_dict[RNG_SEED] if RNG_SEED in run_param_dict else None)
     except Exception as error:
         raise Exception("Error in initialize_simulation_object retrieving weather data:\n"+str(error))
     grid.initialize_components(components)
@@ -89,6 +106,8 @@ def initialize_simulation_object(run_param_dict):
         extend_proportion= run_param_dict[EXTEND_TIMEFRAME] 
                             if EXTEND_TIMEFRAME in run_param_dict and run_param_dict[EXTEND_TIMEFRAME] is not None else 0,
         disturbance=disturbance,
+        engine=run_param_dict[ENGINE] 
+                if ENGINE in run_param_dict and run_param_dict[ENGINE] is not None else ENGINE_TIMESTEP,
     )
     return sim
 
@@ -120,6 +139,26 @@ def get_system_root_dir():
             raise IOError("Valid root directory for results must be specified in "+config_file+"\n")
     return root_dir
 
+def get_cache_dir(dirname):
+    """Get the input cache directory in the results root directory from config.ini
+    Returns None (no caching) if the results root directory does not exist"""
+    config = configparser.ConfigParser()
+    config.read("config.ini")
+    root_dir = config.get("DEFAULT", "RESULTS_ROOT_DIR", fallback=None)
+    if root_dir is None or not os.path.isdir(root_dir): return None
+    return os.path.join(root_dir, dirname)
+
+def get_checkpoint_path(table_name, id, params):
+    """Get the checkpoint file of the input run in the results root directory from config.ini,
+    named by database id (or by parameters if None) so a resumed run finds it
+    Returns None (no checkpoints) if the results root directory does not exist"""
+    checkpoint_dir = get_cache_dir(SIZING_CHECKPOINT_DIRNAME)
+    if checkpoint_dir is None: return None
+    if id is None:
+        params = { k:v for k,v in params.items() if k != RESUME }
+        id = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return os.path.join(checkpoint_dir, "{0}.{1}.pkl".format(table_name, id))
+
 def email(recipient_email, subject, message_body):
     """Send an email to recipient_email with subject and message_body"""
     if _CONFIG_INI_GLOBAL.getboolean("MAIL","MAIL_DISABLE_FOR_RUN_LOCAL",fallback=False): return
@@ -210,10 +249,23 @@ def run_analysis(table_name, id, params, results_relative_url, send_email=True):
             simulate = Simulate(core_sim)
             simulate.run(results_dir=results_dir, database_id=id)
         elif table_name == "sizing":
-            simulate = Sizing(core_sim, params[NUM_LEVELS])
-            simulate.run(algorithm=params[ALGORITHM], results_dir=results_dir, database_id=id, debug=params[DEBUG])
+            simulate = Sizing(core_sim, params[NUM_LEVELS],
+                              batch_size=params[BATCH_SIZE] if BATCH_SIZE in params else None,
+                              num_workers=params[NUM_WORKERS] if NUM_WORKERS in params else None,
+                              cache_dir=get_cache_dir(SIZING_CACHE_DIRNAME),
+                              stop_on_deficit=params[STOP_ON_DEFICIT] if STOP_ON_DEFICIT in params else False,
+                              checkpoint_path=get_checkpoint_path(table_name, id, params),
+                              screening_days=params[SCREENING_DAYS] if SCREENING_DAYS in params else None,
+                              coarse_hours=params[COARSE_HOURS] if COARSE_HOURS in params else None,
+                              energy_bounds=params[ENERGY_BOUNDS] if ENERGY_BOUNDS in params else False)
+            simulate.run(algorithm=params[ALGORITHM], results_dir=results_dir, database_id=id, debug=params[DEBUG],
+                         resume=params[RESUME] if RESUME in params else False)
         elif table_name == "resilience":
-            resilience = Resilience(core_sim)
+            resilience = Resilience(core_sim,
+                                    num_workers=params[NUM_WORKERS] if NUM_WORKERS in params else None,
+                                    seed=params[RNG_SEED] if RNG_SEED in params else None,
+                                    num_runs=params[NUM_RUNS] if NUM_RUNS in params else None,
+                                    tolerance=params[CI_TOLERANCE] if CI_TOLERANCE in params else None)
             resilience.run(hours=params[NUM_SHIFT_HOURS], results_dir=results_dir, database_id=id, debug=params[DEBUG])
         else:
             raise ValueError("run_analysis unknown type = "+table_name)
@@ -1 +1,2 @@
 from .generic_generator import Generator
+from .renewable_profile_cache import RenewableProfileCache
@@ -26,6 +26,7 @@ class DieselGenerator(Generator):
         self._epg_efficiency = epg_efficiency
         self._soft_min = soft_min
         self._fuel_level = fuel_level if fuel_level else 0.0
+        self._starting_fuel_level = self._fuel_level
         self._startup_delay = startup_delay
         self._economic_lifespan = economic_lifespan
         self._investment_cost = investment_cost
@@ -64,6 +65,7 @@ class DieselGenerator(Generator):
     def update(self, power_rating):
         self._power_rating = power_rating
         self._fuel_level = 0.0
+        self._starting_fuel_level = 0.0
         self._fuel_consumed = 0.0
 
     def startup_delay(self):
@@ -134,6 +136,11 @@ class DieselGenerator(Generator):
         """Reset fuel consumption tracker to 0.0"""
         self._fuel_consumed = 0.0
 
+    def reset_fuel(self):
+        """Reset fuel level to starting fuel level and fuel consumption tracker to 0.0"""
+        self._fuel_level = self._starting_fuel_level
+        self._fuel_consumed = 0.0
+
     def _fuel_cost(self, unit_cost, annual_use_factor):
         """Cost of total fuel consumed based on input unit cost and usage factor"""
         # return 1138800
@@ -1,6 +1,9 @@
 import PySAM.Pvwattsv8 as pvwatts
 from src.components import Generator, defaults
 
+class PVWattsException(Exception):
+    pass
+
 class SolarPhotovoltaicPanel(Generator):
 
     def __init__(self, id, power_rating, is_sun_tracking, temperature_coefficient, 
@@ -26,6 +29,7 @@ class SolarPhotovoltaicPanel(Generator):
         self._investment_cost = investment_cost
         self._om_cost = om_cost
         self._pvwatts_system_model = None
+        self._profile_horizon = None # horizon of the PVwatts run of the current profile (None for one run per timestep)
 
     @classmethod
     def init_from_database(cls, cls_dict):
@@ -51,10 +55,9 @@ class SolarPhotovoltaicPanel(Generator):
 
     def update(self, power_rating):
         self._power_rating = power_rating
-        self._pvwatts_system_model = None
     
     def _get_pvwatts_system_model(self):
-        """Return PVwatts system model"""
+        """Return PVwatts system model (1 kW system capacity, output scales with power rating)"""
 
         if self._pvwatts_system_model is not None:
             return self._pvwatts_system_model
@@ -67,7 +70,7 @@ class SolarPhotovoltaicPanel(Generator):
                 "inv_eff": 96.0,
                 "losses": 14.0,
                 "module_type": 0.0,
-                "system_capacity": self._power_rating,
+                "system_capacity": 1.0,
             },
             "SolarResource": {
             }
@@ -81,33 +84,78 @@ class SolarPhotovoltaicPanel(Generator):
         return self._pvwatts_system_model
 
     def _power_pvwatts(self):
-        """Run PVwatts to get power"""
-        weather = self._current_weather
-        date_time = self._timeperiod.mid()
+        """Run PVwatts to get power per unit of power rating"""
+        return self._run_pvwatts([self._current_weather], [self._timeperiod.mid()])[0]
+
+    def _run_pvwatts(self, samples, date_times):
+        """Run PVwatts once for input lists of weather samples and datetimes,
+        return list of power per unit of power rating"""
+        weather = samples[0]
         solar_resource_data = {
                 'tz': weather.timezone, # timezone
                 'elev': weather.elevation, # elevation
                 'lat': weather.latitude, # latitude
                 'lon': weather.longitude, # longitude
-                'year': (date_time.year,), # year
-                'month': (date_time.month,), # month
-                'day': (date_time.day,), # day
-                'hour': (date_time.hour,), # hour
-                'minute': (date_time.minute,), # minute
-                'dn': (weather.direct_normal_irradiance,), # direct normal irradiance
-                'df': (weather.diffuse_horizontal_irradiance,), # diffuse irradiance
-                'gh': (weather.global_horizontal_irradiance,), # global horizontal irradiance
-                'wspd': (weather.wind_speed,), # windspeed
-                'tdry': (weather.temperature,) # dry bulb temperature
+                'year': tuple(d.year for d in date_times), # year
+                'month': tuple(d.month for d in date_times), # month
+                'day': tuple(d.day for d in date_times), # day
+                'hour': tuple(d.hour for d in date_times), # hour
+                'minute': tuple(d.minute for d in date_times), # minute
+                'dn': tuple(s.direct_normal_irradiance for s in samples), # direct normal irradiance
+                'df': tuple(s.diffuse_horizontal_irradiance for s in samples), # diffuse irradiance
+                'gh': tuple(s.global_horizontal_irradiance for s in samples), # global horizontal irradiance
+                'wspd': tuple(s.wind_speed for s in samples), # windspeed
+                'tdry': tuple(s.temperature for s in samples) # dry bulb temperature
         }
         system_model = self._get_pvwatts_system_model()
         system_model.SolarResource.assign({'solar_resource_data': solar_resource_data})
-        system_model.execute()
-        power = system_model.Outputs.dc[0] / 1000.0
-        return power
-    
+        try:
+            system_model.execute()
+        except Exception as error: # PySAM raises Exception when the simulation fails
+            raise PVWattsException("PVwatts execution failed: "+str(error)) from error
+        return [dc / 1000.0 for dc in system_model.Outputs.dc]
+
+    def prepare_profile(self, timesteps, weather):
+        """Compute power per unit profile for all input timesteps with one PVwatts execution.
+        Requires contiguous timesteps of uniform duration, otherwise (or if PVwatts rejects the time series)
+        the profile is computed one timestep at a time when needed.
+        One run over the horizon is not the same as one run per timestep (PVwatts carries the module temperature
+        from one record to the next and infers the timestep from the records), so values of the run over this horizon
+        are kept apart from values of runs over other horizons or per timestep (see _profile_key)"""
+        self._profile_horizon = None
+        time_periods = [t.time_period() for t in timesteps]
+        if len(time_periods) < 2 or not _is_uniform(time_periods): return
+        weather.update(time_periods[0])
+        if weather.current_sample is None: return
+        self.update_current_conditions(timesteps[0], weather)
+        horizon = (time_periods[0].start(), time_periods[-1].end(), time_periods[0].duration())
+        profile_key = self._profile_key() + (horizon,)
+        if self._renewable_profiles.is_missing(profile_key, time_periods):
+            samples = []
+            for time_period in time_periods:
+                weather.update(time_period)
+                samples.append(weather.current_sample)
+            try:
+                values = self._run_pvwatts(samples, [t.mid() for t in time_periods])
+            except PVWattsException:
+                return
+            if len(values) != len(time_periods): return
+            self._renewable_profiles.update(profile_key, time_periods, values)
+        self._profile_horizon = horizon
+
+    def _profile_key(self):
+        """Key of power per unit profile (depends on location, tracking and tilt, not on power rating)"""
+        weather = self._current_weather
+        tilt = None if self._is_sun_tracking else abs(weather.latitude)
+        return (self.__class__.__name__, weather.latitude, weather.longitude, self._is_sun_tracking, tilt)
+
+    def _power_per_unit(self):
+        """Power generated per unit of power rating"""
+        return self._renewable_profiles.power_per_unit(
+            self._profile_key() + (self._profile_horizon,), self._timeperiod, self._power_pvwatts)
+
     def _power(self):
-        return self._power_pvwatts()
+        return self._power_rating * self._power_per_unit()
 
     def _energy_output(self, duration):
         """Energy generated over an input duration of time"""
@@ -117,3 +165,11 @@ class SolarPhotovoltaicPanel(Generator):
     def _release(self, energy):
         """Output energy to grid (no action required for photovoltaic panel)"""
         pass
+
+
+def _is_uniform(time_periods):
+    """True if input time periods are contiguous and have the same duration"""
+    for previous, current in zip(time_periods[:-1], time_periods[1:]):
+        if current.start() != previous.end(): return False
+        if abs(current.duration() - previous.duration()) > defaults.EPSILON: return False
+    return True
@@ -1,3 +1,4 @@
+import numpy
 from src.components import Generator, defaults
 
 class WindTurbine(Generator):
@@ -66,7 +67,52 @@ class WindTurbine(Generator):
             self._power_rating = power_rating
 
     def _power(self):
-        """Power generated
+        """Power generated (capped at peak power)"""
+        power = min(self._power_rating * self._power_per_unit(), self._power_peak)
+        return power
+
+    def _profile_key(self):
+        """Key of power per unit profile (depends on location and power curve, not on power rating)"""
+        weather = self._current_weather
+        return (self.__class__.__name__, weather.latitude, weather.longitude,
+                self._cutin_speed, self._cutout_speed, self._rated_speed, self._height)
+
+    def _power_per_unit(self):
+        """Power generated per unit of power rating (not capped at peak power)"""
+        return self._renewable_profiles.power_per_unit(
+            self._profile_key(), self._timeperiod, self._compute_power_per_unit)
+
+    def _compute_power_per_unit(self):
+        """Compute power generated per unit of power rating for current weather"""
+        weather = self._current_weather
+        return float(self._power_per_unit_array(
+            wind_speed=numpy.array([weather.wind_speed], dtype=float),
+            temperature=numpy.array([weather.temperature], dtype=float),
+            pressure=numpy.array([weather.pressure], dtype=float),
+        )[0])
+
+    def prepare_profile(self, timesteps, weather):
+        """Compute power per unit profile for all input timesteps in one pass over weather arrays"""
+        time_periods = [t.time_period() for t in timesteps]
+        if len(time_periods) == 0: return
+        weather.update(time_periods[0])
+        if weather.current_sample is None: return
+        self.update_current_conditions(timesteps[0], weather)
+        profile_key = self._profile_key()
+        if not self._renewable_profiles.is_missing(profile_key, time_periods): return
+        samples = []
+        for time_period in time_periods:
+            weather.update(time_period)
+            samples.append(weather.current_sample)
+        values = self._power_per_unit_array(
+            wind_speed=numpy.array([s.wind_speed for s in samples], dtype=float),
+            temperature=numpy.array([s.temperature for s in samples], dtype=float),
+            pressure=numpy.array([s.pressure for s in samples], dtype=float),
+        )
+        self._renewable_profiles.update(profile_key, time_periods, values.tolist())
+
+    def _power_per_unit_array(self, wind_speed, temperature, pressure):
+        """Power generated per unit of power rating (not capped at peak power) for input weather arrays
         Model references:
             Power Equation and Piecewise Function
                 "Review of power curve modelling for wind turbines"
@@ -84,24 +130,20 @@ class WindTurbine(Generator):
                 (https://cdn.standards.iteh.ai/samples/7472/c203e9121d4c40e5bdc98844b1a1e2f4/ISO-2533-1975.pdf)
                 (https://doi.org/10.5194/angeo-2019-88)
         """
-        weather = self._current_weather
-        if weather.wind_speed > self._cutin_speed and weather.wind_speed < self._cutout_speed:
-            k = 2 # lower exponent may be more accurate than cubic textbook model according to citations
-            fract_speed = ((weather.wind_speed**k - self._cutin_speed**k) \
-                           / (self._rated_speed**k - self._cutin_speed**k))
-        else:
-            return 0.0 # skip computations if wind speed is not within operational limits
+        k = 2 # lower exponent may be more accurate than cubic textbook model according to citations
+        is_operational = (wind_speed > self._cutin_speed) & (wind_speed < self._cutout_speed)
+        fract_speed = ((wind_speed**k - self._cutin_speed**k) \
+                       / (self._rated_speed**k - self._cutin_speed**k))
         pressure_o = 1013.25 # mbar
         temperature_o = 288.15 # kelvin
         celsius_to_kelvin = 273.15 # kelvin
-        temperature_kelvin = weather.temperature + celsius_to_kelvin
+        temperature_kelvin = temperature + celsius_to_kelvin
         temperature_adjusted = temperature_kelvin - (6.5 * self._height)/1000.0
-        pressure_adjusted = weather.pressure * ((1 - (0.0065 * self._height / temperature_kelvin))**5.255)
+        pressure_adjusted = pressure * ((1 - (0.0065 * self._height / temperature_kelvin))**5.255)
         fract_temp = temperature_adjusted / temperature_o
         fract_pressure = pressure_adjusted / pressure_o
         fract_density = (1 + fract_pressure) / (1 + fract_temp)
-        power = min(self._power_rating * fract_density * fract_speed, self._power_peak)
-        return power
+        return numpy.where(is_operational, fract_density * fract_speed, 0.0) # 0 outside operational limits
 
     def _energy_output(self, duration):
         """Energy generated over an input duration of time"""
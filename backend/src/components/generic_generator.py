@@ -13,9 +13,10 @@ class Generator(object):
            f'id={self._id!r})')
 
     def update_current_conditions(self, timestep, weather):
-        """Update datetime"""
+        """Update datetime, weather and renewable profiles"""
         self._timeperiod = timestep.time_period()
         self._current_weather = weather.current_sample
+        self._renewable_profiles = weather.renewable_profiles
 
     def startup_delay(self):
         """Time delay to become available when grid power is lost defaults to 0.0"""
@@ -0,0 +1,46 @@
+class RenewableProfileCache(object):
+
+    def __init__(self):
+        """RenewableProfileCache constructor __init__
+        Power output per unit of power rating of renewable generators by time period;
+        renewable output scales with power rating, so one profile serves every design
+        simulated with the same weather (sizing designs, resilience shifts)"""
+        self._profiles = dict()
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}('
+           f'num_profiles={len(self._profiles)!r})')
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def power_per_unit(self, profile_key, time_period, function):
+        """Power per unit of power rating for input profile key and time period,
+        calls input function (no arguments) to compute it on first request"""
+        profile = self._profiles.setdefault(profile_key, dict())
+        key = _time_period_key(time_period)
+        if key not in profile: profile[key] = function()
+        return profile[key]
+
+    def is_missing(self, profile_key, time_periods):
+        """True if power per unit is not cached for at least one of the input time periods"""
+        if profile_key not in self._profiles: return True
+        profile = self._profiles[profile_key]
+        for time_period in time_periods:
+            if _time_period_key(time_period) not in profile: return True
+        return False
+
+    def update(self, profile_key, time_periods, values):
+        """Store power per unit values for input time periods (same order)"""
+        profile = self._profiles.setdefault(profile_key, dict())
+        for time_period, value in zip(time_periods, values):
+            profile[_time_period_key(time_period)] = value
+
+    def clear(self):
+        """Remove all profiles (call when weather samples change)"""
+        self._profiles = dict()
+
+
+def _time_period_key(time_period):
+    """Time periods with equal start, mid and end share profile values"""
+    return (time_period.start(), time_period.mid(), time_period.end())
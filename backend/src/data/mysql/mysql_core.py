@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from mysql.connector import connect
 from sqlalchemy import create_engine
 from urllib.parse import quote_plus
@@ -6,6 +7,8 @@ import pandas
 class MySqlDatabaseException(Exception):
     pass
 
+_INSERT_ROWS_CHUNK_SIZE = 1000 # rows per multi-row insert statement (bounded by max_allowed_packet)
+
 class MySqlDatabase(object):
     
     def __init__(self, user, user_password, root_password, database_name, host, port):
@@ -191,6 +194,32 @@ class MySqlDatabase(object):
         allowing for inserting or updating multiple rows or a single row"""
         return self._insert_insert_update(table_name, data_dict, update=False)
 
+    @contextmanager
+    def transaction(self):
+        """Context manager yielding a cursor (as user) for commands committed together on exit,
+        or rolled back if any command fails"""
+        with self._get_connect() as connection:
+            try:
+                with connection.cursor() as cursor:
+                    yield cursor
+                connection.commit()
+            except Exception as error:
+                connection.rollback()
+                raise MySqlDatabaseException("Transaction failed:\n"+str(error)+"\n")
+
+    def insert_rows(self, cursor, table_name, fields, rows):
+        """Insert input rows (lists of values in the order of input fields) with multi-row insert statements
+        using input cursor (see transaction), returns the id of the first row inserted by the first statement"""
+        first_id = None
+        for i in range(0, len(rows), _INSERT_ROWS_CHUNK_SIZE):
+            chunk = rows[i:i+_INSERT_ROWS_CHUNK_SIZE]
+            sql = "INSERT INTO {0} ({1}) VALUES {2}".format(
+                table_name, ",".join(fields), ",".join(["("+",".join(["%s"]*len(fields))+")"]*len(chunk))
+            )
+            cursor.execute(sql, [value for row in chunk for value in row])
+            if first_id is None: first_id = cursor.lastrowid
+        return first_id
+
     def update(self, table_name, data_dict, where_dict):
         """Update row(s) in database table
         data_dict keys are field names in table
@@ -154,6 +154,58 @@ def grid_design_add(id, name, deficit_percentage, excess_percentage, dominated_b
                                     +str(id)+"\n"+str(error))
     return id
 
+def component_spec_meta_ids_get(parameter_names):
+    """Returns a dictionary component spec meta parameterName --> id for the input parameter names"""
+    parameter_names = list(parameter_names)
+    if len(parameter_names) == 0: return dict()
+    try:
+        rows = mysql_microgrid.DB.query(
+            """SELECT parameterName, id
+                FROM component_spec_meta
+                WHERE parameterName IN ({0})""".format(",".join(["%s"]*len(parameter_names))),
+            values=parameter_names)
+    except Exception as error:
+        raise mysql_microgrid.MicrogridDBException("component_spec_meta_ids_get read failed for parameterNames = " \
+                                    +str(parameter_names)+"\n"+str(error))
+    return { parameter_name:id for parameter_name, id in rows }
+
+def grid_designs_add(id, designs):
+    """Insert sizing grids with their components and component spec data in a single transaction
+    designs is a list of dictionaries with sizing_grid fields (except sizingId) and "components",
+    a list of dictionaries with sizing_grid_component fields (except sizingGridId) and "specs",
+    a dictionary component spec meta parameterName --> value"""
+    if len(designs) == 0: return
+    grid_fields = ["name", "deficitPercentage", "excessPercentage", "dominatedBy", "parent", "metricsSummaryStats"]
+    component_fields = ["componentTypeId", "unusedPercentage", "timeStepsPercentage"]
+    spec_meta_ids = component_spec_meta_ids_get(set(
+        parameter_name for d in designs for c in d["components"] for parameter_name in c["specs"]
+    ))
+    try:
+        with mysql_microgrid.DB.transaction() as cursor:
+            first_grid_id = mysql_microgrid.DB.insert_rows(cursor, "sizing_grid", ["sizingId"]+grid_fields,
+                [[id]+[d[f] for f in grid_fields] for d in designs])
+            cursor.execute("""SELECT name, id
+                FROM sizing_grid
+                WHERE sizingId = %s AND id >= %s""", [id, first_grid_id])
+            grid_ids = { name:grid_id for name, grid_id in cursor.fetchall() }
+            component_rows = [[grid_ids[d["name"]]]+[c[f] for f in component_fields] for d in designs for c in d["components"]]
+            if len(component_rows) == 0: return # no first component id to select from
+            first_component_id = mysql_microgrid.DB.insert_rows(cursor, "sizing_grid_component",
+                ["sizingGridId"]+component_fields, component_rows)
+            cursor.execute("""SELECT sizingGridId, componentTypeId, sizing_grid_component.id
+                FROM sizing_grid_component
+                JOIN sizing_grid
+                ON sizing_grid.id = sizingGridId
+                WHERE sizingId = %s AND sizing_grid_component.id >= %s""", [id, first_component_id])
+            component_ids = { (grid_id, type_id):component_id for grid_id, type_id, component_id in cursor.fetchall() }
+            mysql_microgrid.DB.insert_rows(cursor, "sizing_grid_component_spec_data",
+                ["sizingGridComponentId", "componentSpecMetaId", "value"],
+                [[component_ids[(grid_ids[d["name"]], c["componentTypeId"])], spec_meta_ids[parameter_name], value]
+                 for d in designs for c in d["components"] for parameter_name, value in c["specs"].items()])
+    except Exception as error:
+        raise mysql_microgrid.MicrogridDBException("sizing_grid_designs_add failed for sizing with id = " \
+                                    +str(id)+"\n"+str(error))
+
 def result_save_to_grids(user_id, sizing_grid_id):
     """Save sizing grid from sizing result to user's components and grid"""
     try:
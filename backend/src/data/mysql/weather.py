@@ -30,6 +30,10 @@ def csv_to_sql_col_map(colname):
 
 METRIC_COLS_SQL = [csv_to_sql_col_map(c) for c in METRIC_COLS_CSV]
 
+KEY_COLS_SQL = ["yearOrStat", "month", "day", "hour", "minute"]
+
+SIGNATURE_COLS_SQL = KEY_COLS_SQL + METRIC_COLS_SQL # columns covered by signature
+
 def add(dataframe, table_name):
     """Add a weather file records to the database"""
     try:
@@ -48,6 +52,22 @@ def read(location_id):
         raise mysql_weather.WeatherDBException("weather read failed: "+str(error))
     return dataframe
 
+def signature(location_id):
+    """Summary of weather records for input location id (used to validate local copies):
+    number of records, sum of each metric column and sum of a checksum of each record over SIGNATURE_COLS_SQL"""
+    sums = ", ".join("SUM({0})".format(col) for col in METRIC_COLS_SQL)
+    record = ", ".join("IFNULL({0}, '')".format(col) for col in SIGNATURE_COLS_SQL)
+    try:
+        result = mysql_weather.DB.query(
+            """SELECT COUNT(*), {0}, SUM(CRC32(CONCAT_WS(',', {1})))
+            FROM weather WHERE locationId = %s""".format(sums, record),
+            (location_id,),
+            output_format="item",
+        )
+    except Exception as error:
+        raise mysql_weather.WeatherDBException("weather signature failed: "+str(error))
+    return [str(value) for value in result]
+
 def generate_summary_records():
     """Generate summary statistics over years of available data
     Store summary statistics in database"""
@@ -0,0 +1,53 @@
+import os
+import json
+import numpy
+
+"""
+Local cache of dense weather arrays (see src.models.weather) stored as .npy files
+and memory-mapped on read, so concurrent jobs at the same location share pages
+"""
+
+_VERSION = 2
+_ARRAYS = ["sums", "counts"]
+
+def _path(cache_dir, location_id, name):
+    """Path of cache file for input location id"""
+    return os.path.join(cache_dir, "weather_{0}_{1}".format(location_id, name))
+
+def read(cache_dir, location_id, signature, signature_cols, metric_cols):
+    """Read cached arrays for input location id
+    Returns (stats, sums, counts) or None if the cache is missing or does not match the input signature
+    (over the input signature columns) or metric columns"""
+    try:
+        with open(_path(cache_dir, location_id, "meta.json"), "r") as f:
+            meta = json.load(f)
+        if meta["version"] != _VERSION or meta["signature"] != signature \
+            or meta["signature_cols"] != signature_cols or meta["metric_cols"] != metric_cols:
+            return None
+        arrays = [numpy.load(_path(cache_dir, location_id, a+".npy"), mmap_mode="r") for a in _ARRAYS]
+    except (OSError, ValueError, KeyError):
+        return None
+    if any(list(a.shape) != meta["shape"] for a in arrays): return None
+    return meta["stats"], arrays[0], arrays[1]
+
+def write(cache_dir, location_id, signature, signature_cols, metric_cols, stats, sums, counts):
+    """Write arrays for input location id (metadata written last marks the cache valid)"""
+    os.makedirs(cache_dir, exist_ok=True)
+    suffix = ".{0}.tmp".format(os.getpid())
+    meta_path = _path(cache_dir, location_id, "meta.json")
+    if os.path.exists(meta_path): os.remove(meta_path)
+    for name, array in zip(_ARRAYS, [sums, counts]):
+        with open(_path(cache_dir, location_id, name+".npy"+suffix), "wb") as f:
+            numpy.save(f, array)
+        os.replace(_path(cache_dir, location_id, name+".npy"+suffix), _path(cache_dir, location_id, name+".npy"))
+    meta = {
+        "version": _VERSION,
+        "signature": signature,
+        "signature_cols": signature_cols,
+        "metric_cols": metric_cols,
+        "stats": stats,
+        "shape": list(sums.shape),
+    }
+    with open(meta_path+suffix, "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path+suffix, meta_path)
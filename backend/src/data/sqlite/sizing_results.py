@@ -0,0 +1,64 @@
+import os
+import time
+import json
+import sqlite3
+
+"""
+Local store of sizing results shared across runs, one row per design keyed by a hash
+of the design and the simulation inputs (see src.models.sizing), least recently used rows
+are evicted once the store holds more than MAX_ENTRIES rows
+"""
+
+_VERSION = 1
+_FILENAME = "sizing_results_v{0}.sqlite".format(_VERSION)
+MAX_ENTRIES = 200000
+
+def _connect(cache_dir):
+    """Open the store in input directory, creating it if needed"""
+    os.makedirs(cache_dir, exist_ok=True)
+    connection = sqlite3.connect(os.path.join(cache_dir, _FILENAME), timeout=60.0)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)")
+    connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+    return connection
+
+def get(cache_dir, key):
+    """Return stored values of input key (marked as used) or None if missing"""
+    connection = _connect(cache_dir)
+    try:
+        with connection:
+            row = connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None: return None
+            connection.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+    finally:
+        connection.close()
+    return json.loads(row[0])
+
+def put(cache_dir, values_by_key):
+    """Store input dictionary of key --> values (json serializable)"""
+    if len(values_by_key) == 0: return
+    connection = _connect(cache_dir)
+    try:
+        with connection:
+            now = time.time()
+            connection.executemany(
+                "INSERT OR REPLACE INTO results (key, value, last_used) VALUES (?, ?, ?)",
+                [(k, json.dumps(v), now) for k, v in values_by_key.items()]
+            )
+    finally:
+        connection.close()
+
+def trim(cache_dir, max_entries=MAX_ENTRIES):
+    """Evict least recently used rows beyond input max number of entries"""
+    connection = _connect(cache_dir)
+    try:
+        with connection:
+            count = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if count <= max_entries: return
+            connection.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                (count - max_entries,)
+            )
+    finally:
+        connection.close()
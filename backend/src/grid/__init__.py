@@ -1,3 +1,4 @@
 from .grid import Grid
 from .grid_state import GridState
+from .grid_state_arrays import GridStateArrays
 from .disturbance import Disturbance
@@ -1,5 +1,6 @@
 import random
 import copy
+import numpy
 from datetime import timedelta
 from src.components import defaults as comp_defaults
 
@@ -24,6 +25,7 @@ class Disturbance(object):
         self._affected = {}
         self._affected_quantity = {}
         self._simulated_times_to_repair = {}
+        self._periods = None # time periods list and arrays sorted by start, see _period_arrays
         self._rand_num_generator = random.Random(random.uniform(0,20000))
         self._rand_state = self._rand_num_generator.getstate()
 
@@ -35,6 +37,19 @@ class Disturbance(object):
            f'affected={self._affected!r},'
            f'simulated_times_to_repair={self._simulated_times_to_repair!r})')
 
+    def signature(self):
+        """Return list of inputs that determine the disturbance (given a seed)"""
+        return [str(self.start_datetime), self._probabilities, self._quantities, self._repair_times, self._method]
+
+    def is_stochastic(self):
+        """Checks if affected generators and repair times are sampled (so runs differ with the seed)"""
+        return self._method == "stochastic"
+
+    def seed(self, seed):
+        """Reset random number generator used to sample affected generators and repair times"""
+        self._rand_num_generator.seed(seed)
+        self._rand_state = self._rand_num_generator.getstate()
+
     def simulate(self, grid):
         """Construct dictionary generator ID --> boolean operational status"""
         self._affected = {}
@@ -56,43 +71,43 @@ class Disturbance(object):
                 self._affected[generator] = True
                 self._simulated_times_to_repair[generator] = repair_time
 
+    def _period_arrays(self, time_periods):
+        """Return order of input time periods by start, and their starts, ends and durations (hours) in that order
+        (computed once for the same list of time periods)"""
+        if self._periods is None or self._periods[0] is not time_periods:
+            starts = numpy.array([p.start() for p in time_periods], dtype="datetime64[us]")
+            ends = numpy.array([p.end() for p in time_periods], dtype="datetime64[us]")
+            durations = numpy.array([p.duration() for p in time_periods], dtype=float)
+            order = numpy.argsort(starts, kind="stable")
+            self._periods = (time_periods, order, starts[order], ends[order], durations[order])
+        return self._periods[1:]
+
     def propogate(self, grid, time_periods):
-        """Construct dictionary generator ID --> boolean operational status"""
-        status = {}
+        """Return matrix of online ratios with a row per time period and a column per generator
+        (in the order of grid.get_generators()): one minus the part of the time period the generator is unavailable"""
+        generators = grid.get_generators()
+        order, starts, ends, durations = self._period_arrays(time_periods)
+        online_ratios = numpy.ones((len(time_periods), len(generators)))
         disturbance_end = self.start_datetime
-        for generator in grid.get_generators():
-            unavailable_start = None
-            if self._affected[generator]:
-                unavailable_start = self.start_datetime
-                unavailable_end = self.start_datetime + timedelta(
-                    hours=self._simulated_times_to_repair[generator]
-                )
-                if unavailable_end <= unavailable_start:
-                    unavailable_end = unavailable_start
-                elif unavailable_end > disturbance_end: 
-                    disturbance_end = unavailable_end
-            for time_period in time_periods:
-                if unavailable_start is None:
-                    online_ratio = 1.0
-                elif time_period.end() <= unavailable_start:
-                    online_ratio = 1.0
-                elif time_period.start() >= unavailable_end:
-                    online_ratio = 1.0
-                elif time_period.start() >= unavailable_start and \
-                        time_period.end() <= unavailable_end:
-                    online_ratio = 0.0
-                elif time_period.start() >= unavailable_start:
-                    time_on = (time_period.end() - unavailable_end).total_seconds()/3600.0
-                    online_ratio = time_on / time_period.duration()
-                elif time_period.end() <= unavailable_end:
-                    time_on = (unavailable_start - time_period.start()).total_seconds()/3600.0
-                    online_ratio = time_on / time_period.duration()
-                if time_period not in status: status[time_period] = {}
-                status[time_period][generator] = online_ratio
+        unavailable_start = numpy.datetime64(self.start_datetime, "us")
+        for column, generator in enumerate(generators):
+            if not self._affected[generator]: continue
+            end_datetime = self.start_datetime + timedelta(hours=self._simulated_times_to_repair[generator])
+            if end_datetime <= self.start_datetime: continue
+            if end_datetime > disturbance_end: disturbance_end = end_datetime
+            unavailable_end = numpy.datetime64(end_datetime, "us")
+            # time periods (which do not overlap, so ends are sorted too) ending after the start of the outage
+            # and starting before its end
+            first = numpy.searchsorted(ends, unavailable_start, side="right")
+            last = numpy.searchsorted(starts, unavailable_end, side="left")
+            overlap = numpy.minimum(ends[first:last], unavailable_end) \
+                - numpy.maximum(starts[first:last], unavailable_start)
+            hours = numpy.maximum(overlap, numpy.timedelta64(0, "us")) / numpy.timedelta64(1, "h")
+            online_ratios[order[first:last], column] = 1.0 - hours / durations[first:last]
         if disturbance_end > self.start_datetime + timedelta(hours=comp_defaults.EPSILON):
             self.end_datetime = disturbance_end
             self.duration = (self.end_datetime - self.start_datetime).total_seconds() / 3600.0
         else:
             self.end_datetime = self.start_datetime
             self.duration = 0.0
-        return status
+        return online_ratios
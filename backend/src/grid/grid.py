@@ -1,4 +1,3 @@
-import copy
 import src.utils as utils
 from .grid_state import GridState
 from src.components import defaults
@@ -40,11 +39,11 @@ class Grid(object):
 
     def reset_fuel(self, fuel):
         """Set grid diesel reserves to input volume of fuel and reset
-        diesel generator fuel consumption to 0.0"""
+        diesel generator fuel levels and fuel consumption"""
         if defaults.DIESEL_GENERATOR not in self._generators: return
         self._diesel_level = fuel
         for generator in self._generators[defaults.DIESEL_GENERATOR]:
-            generator.reset_fuel_consumed()
+            generator.reset_fuel()
 
     def reset_batteries(self):
         """Reset batteries to starting charge levels"""
@@ -52,6 +51,23 @@ class Grid(object):
         for battery in self._generators[defaults.BATTERY]:
             battery.reset_charge()
 
+    def get_state(self):
+        """Return state carried from one timestep to the next:
+        diesel reserves, fuel level of each diesel generator and charge level of each battery"""
+        return (
+            self._diesel_level,
+            tuple(g._fuel_level for g in self._generators.get(defaults.DIESEL_GENERATOR, [])),
+            tuple(b._charge_level for b in self._generators.get(defaults.BATTERY, [])),
+        )
+
+    def set_state(self, state):
+        """Set state carried from one timestep to the next (see get_state)"""
+        self._diesel_level = state[0]
+        for generator, fuel_level in zip(self._generators.get(defaults.DIESEL_GENERATOR, []), state[1]):
+            generator._fuel_level = fuel_level
+        for battery, charge_level in zip(self._generators.get(defaults.BATTERY, []), state[2]):
+            battery._charge_level = charge_level
+
     def initialize_components(self, components_list):
         """Construct grid components from args"""
         for component in components_list:
@@ -98,6 +114,13 @@ class Grid(object):
             for generator in self._generators[type]:
                 generator.update_current_conditions(timestep, weather)
 
+    def prepare_renewable_profiles(self, timesteps, weather):
+        """Compute renewable power per unit profiles for all input timesteps at once"""
+        for type in [defaults.PHOTOVOLTAIC_PANEL, defaults.WIND_TURBINE]:
+            if type not in self._generators: continue
+            for generator in self._generators[type]:
+                generator.prepare_profile(timesteps, weather)
+
     def _wet_stacking(self, power):
         """True if power will cause wet stacking
         SIMPLE HEURISTIC - COMPLICATED TO SOLVE FOR MULTIPLE GENERATORS
@@ -385,12 +408,23 @@ class Grid(object):
         Step 3         store battery power
         Step 4         return results
         """
+        return GridState(*self._dispatch(previous_case, load, duration, energy_management_system))
+
+    def operate_into(self, state_arrays, index, previous_case, load, duration, energy_management_system):
+        """Same as operate, but store results at input timestep index of input state_arrays
+        (see GridStateArrays.store) instead of building a GridState, return case"""
+        results = self._dispatch(previous_case, load, duration, energy_management_system)
+        state_arrays.store(index, *results)
+        return results[0]
+
+    def _dispatch(self, previous_case, load, duration, energy_management_system):
+        """Generate power from all generating components over an input duration (see operate),
+        return case, non-degraded power, available power, power generation, state of charge,
+        diesel consumption and diesel wet stacking flag"""
 
         # Identify available power
         self._fully_online_power(duration)
-        fully_online_power=dict()
-        for key, value in self._available_power.items():
-            fully_online_power[key] = copy.deepcopy(value)
+        fully_online_power = dict(self._available_power)
         self._available_power = {}
 
         # Identify energy available, including upper and lower bounds
@@ -494,15 +528,8 @@ class Grid(object):
                 raise ValueError("Power is negative for type: "+(type, powers))
 
         # Step 4: return results
-        return GridState(
-            case=case,
-            non_degraded_power=fully_online_power,
-            available_power=self._available_power,
-            power_generation=self._power_generation,
-            state_of_charge=self._state_of_charge(),
-            diesel_consumption = fuel_consumed,
-            diesel_is_wet_stacking = wet_stacking_flag,
-        )
+        return (case, fully_online_power, self._available_power, self._power_generation,
+                self._state_of_charge(), fuel_consumed, wet_stacking_flag)
 
     def _net_present_value(self, wacc, num_years, fuel_unit_cost, annual_use_factor):
         """Net present value of grid for an input weighted average cost of capital
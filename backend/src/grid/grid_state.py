@@ -47,54 +47,71 @@ class GridState(object):
 
     def non_degraded_power(self):
         """Non-degraded power to meet load (and charge BESS)"""
-        non_degraded_power = 0.0
-        for generator, power in self._non_degraded_power.items():
-            if generator.__class__.__name__ not in [
-                defaults.BATTERY,
-            ]:
-                non_degraded_power += power
-        return non_degraded_power
+        return non_degraded_power(self._non_degraded_power)
 
     def available_power_all(self):
         """Total power available to meet load, including BESS"""
-        available_power = 0.0
-        for generator, power in self._available_power.items():
-            if generator.__class__.__name__ in [
-                defaults.BATTERY,
-            ] and power < 0.0:
-                continue
-            available_power += power
-        return available_power
+        return available_power_all(self._available_power)
 
     def available_power(self):
         """Total power available to meet load (and charge BESS)"""
-        available_power = 0.0
-        for generator, power in self._available_power.items():
-            if generator.__class__.__name__ not in [
-                defaults.BATTERY,
-            ]:
-                available_power += power
-        return available_power
+        return available_power(self._available_power)
     
     def available_power_by_type(self, type):
         """Power available by DER type"""
-        power_available = 0.0
-        for generator, power in self._available_power.items():
-            if generator.__class__.__name__ == type:
-                power_available += power
-        return power_available
+        return power_by_type(self._available_power, type)
 
     def power_supply(self):
         """Total power supplied to meet load (and charge BESS)"""
-        power_supply = 0.0
-        for power in self._power_generation.values():
-            power_supply += power
-        return power_supply
+        return power_supply(self._power_generation)
 
     def power_supply_type(self, type):
         """Power supplied of input type to meet load (and charge BESS)"""
-        power_supply = 0.0
-        for generator, power in self._power_generation.items():
-            if generator.__class__.__name__ == type:
-                power_supply += power
-        return power_supply
+        return power_by_type(self._power_generation, type)
+
+
+def non_degraded_power(power_by_generator):
+    """Non-degraded power to meet load (and charge BESS)"""
+    non_degraded_power = 0.0
+    for generator, power in power_by_generator.items():
+        if generator.__class__.__name__ not in [
+            defaults.BATTERY,
+        ]:
+            non_degraded_power += power
+    return non_degraded_power
+
+def available_power_all(power_by_generator):
+    """Total power available to meet load, including BESS"""
+    available_power = 0.0
+    for generator, power in power_by_generator.items():
+        if generator.__class__.__name__ in [
+            defaults.BATTERY,
+        ] and power < 0.0:
+            continue
+        available_power += power
+    return available_power
+
+def available_power(power_by_generator):
+    """Total power available to meet load (and charge BESS)"""
+    available_power = 0.0
+    for generator, power in power_by_generator.items():
+        if generator.__class__.__name__ not in [
+            defaults.BATTERY,
+        ]:
+            available_power += power
+    return available_power
+
+def power_by_type(power_by_generator, type):
+    """Power of generators of input DER type"""
+    power = 0.0
+    for generator, value in power_by_generator.items():
+        if generator.__class__.__name__ == type:
+            power += value
+    return power
+
+def power_supply(power_by_generator):
+    """Total power supplied to meet load (and charge BESS)"""
+    power_supply = 0.0
+    for power in power_by_generator.values():
+        power_supply += power
+    return power_supply
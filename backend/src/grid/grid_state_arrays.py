@@ -0,0 +1,74 @@
+import numpy
+from . import grid_state
+
+class GridStateArrays(object):
+
+    _ARRAYS = ["case", "available_power", "power_generation", "non_degraded_power_total",
+               "available_power_total", "available_power_all", "power_supply", "state_of_charge",
+               "diesel_consumption", "diesel_is_wet_stacking"]
+
+    def __init__(self, num_timesteps, types, num_designs=None):
+        """GridStateArrays constructor __init__
+        Preallocated arrays indexed by timestep replace one GridState per timestep
+
+        Keyword arguments:
+        num_timesteps           number of timesteps in simulation horizon
+        types                   list of generator types, column order of per-type arrays
+        num_designs             if set, arrays get a leading design axis (see design)
+        """
+        self.types = list(types)
+        self._type_index = { t:i for i, t in enumerate(self.types) }
+        shape = (num_timesteps,) if num_designs is None else (num_designs, num_timesteps)
+        self.case = numpy.zeros(shape, dtype=numpy.int8)
+        self.available_power = numpy.zeros(shape + (len(self.types),))
+        self.power_generation = numpy.zeros(shape + (len(self.types),))
+        self.non_degraded_power_total = numpy.zeros(shape)
+        self.available_power_total = numpy.zeros(shape)
+        self.available_power_all = numpy.zeros(shape)
+        self.power_supply = numpy.zeros(shape)
+        self.state_of_charge = numpy.zeros(shape)
+        self.diesel_consumption = numpy.zeros(shape)
+        self.diesel_is_wet_stacking = numpy.zeros(shape, dtype=bool)
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}('
+           f'num_timesteps={len(self)!r},'
+           f'types={self.types!r})')
+
+    def __len__(self):
+        return self.case.shape[-1]
+
+    def record(self, index, state):
+        """Store input GridState at input timestep index"""
+        self.store(index, state.case(), state._non_degraded_power, state._available_power, state._power_generation,
+                   state.state_of_charge(), state.diesel_consumption(), state.diesel_is_wet_stacking())
+
+    def store(self, index, case, non_degraded_power, available_power, power_generation,
+              state_of_charge, diesel_consumption, diesel_is_wet_stacking):
+        """Store grid state at input timestep index from the same inputs as the GridState constructor
+        (see Grid.operate_into)"""
+        self.case[index] = case
+        for generator, power in available_power.items():
+            self.available_power[index, self._type_index[generator.__class__.__name__]] += power
+        for generator, power in power_generation.items():
+            self.power_generation[index, self._type_index[generator.__class__.__name__]] += power
+        self.non_degraded_power_total[index] = grid_state.non_degraded_power(non_degraded_power)
+        self.available_power_total[index] = grid_state.available_power(available_power)
+        self.available_power_all[index] = grid_state.available_power_all(available_power)
+        self.power_supply[index] = grid_state.power_supply(power_generation)
+        self.state_of_charge[index] = state_of_charge
+        self.diesel_consumption[index] = diesel_consumption
+        self.diesel_is_wet_stacking[index] = diesel_is_wet_stacking
+
+    def type_index(self, type):
+        """Column index of input generator type"""
+        return self._type_index[type]
+
+    def design(self, index):
+        """GridStateArrays view of input design index (arrays with a leading design axis only)"""
+        state_arrays = GridStateArrays.__new__(GridStateArrays)
+        state_arrays.types = self.types
+        state_arrays._type_index = self._type_index
+        for name in self._ARRAYS:
+            setattr(state_arrays, name, getattr(self, name)[index])
+        return state_arrays
@@ -0,0 +1,310 @@
+import numpy
+from src.components import defaults
+from src.grid import GridStateArrays
+from src.reports import ArrayMetrics
+
+class BatchSimulation(object):
+
+    def __init__(self, timesteps, weather, energy_management_system, energy_resources, types):
+        """BatchSimulation constructor __init__
+        Advance many designs of one grid through the same timesteps together.
+        Designs differ only in component ratings, so weather, load and online ratios are
+        shared and dispatch (Grid.operate) is vectorized over the design axis.
+
+        Keyword arguments:
+        timesteps                   list of TimeStep objects in chronological order (online ratio set)
+        weather                     weather object with distributions
+        energy_management_system    string name of Grid energy management system function
+        energy_resources            dictionary with generator types as key and lists (1 generator) as value
+        types                       list of generator types, column order of per-type arrays
+        """
+        if energy_management_system not in _ENERGY_MANAGEMENT_SYSTEMS:
+            raise ValueError("Energy management system undefined for batch simulation: "+str(energy_management_system))
+        for type, generators in energy_resources.items():
+            if len(generators) != 1:
+                raise ValueError("Exactly 1 "+type+" is required in grid")
+        self._timesteps = timesteps
+        self._weather = weather
+        self._energy_management_system = _ENERGY_MANAGEMENT_SYSTEMS[energy_management_system]
+        self._generators = { type:generators[0] for type, generators in energy_resources.items() }
+        self._types = list(types)
+        self._profiles = None
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}('
+           f'num_timesteps={len(self._timesteps)!r},'
+           f'types={self._types!r})')
+
+    def _renewable_profiles(self):
+        """Power per unit of power rating for each renewable type at each timestep
+        (wind turbine output is capped at peak power separately)"""
+        if self._profiles is not None: return self._profiles
+        profiles = { t:numpy.zeros(len(self._timesteps)) for t in
+                    [defaults.PHOTOVOLTAIC_PANEL, defaults.WIND_TURBINE] if t in self._generators }
+        for type in profiles:
+            self._generators[type].prepare_profile(self._timesteps, self._weather)
+        for index, timestep in enumerate(self._timesteps):
+            self._weather.update(timestep.time_period())
+            for type in profiles:
+                generator = self._generators[type]
+                generator.update_current_conditions(timestep, self._weather)
+                profiles[type][index] = generator._power_per_unit()
+        self._profiles = profiles
+        return profiles
+
+    def _online_ratios(self):
+        """Online ratio of each generator type at each timestep"""
+        online_ratios = {}
+        for type, generator in self._generators.items():
+            online_ratios[type] = numpy.array([t.online_ratio()[generator] for t in self._timesteps], dtype=float)
+        return online_ratios
+
+    def _ratings(self, designs, type):
+        """Power rating (energy rating for batteries) of input type for each design"""
+        return numpy.array([float(d[type]) if type in d else 0.0 for d in designs])
+
+    def run(self, designs):
+        """Simulate input list of designs (dictionaries with generator types as key and ratings as value),
+        return list of ArrayMetrics in the same order
+        Diesel reserves are assumed unlimited (as set by run helpers); batteries start fully charged"""
+        profiles = self._renewable_profiles()
+        online_ratios = self._online_ratios()
+        num_designs = len(designs)
+        num_timesteps = len(self._timesteps)
+        state_arrays = GridStateArrays(num_timesteps, self._types, num_designs=num_designs)
+        columns = { t:self._types.index(t) for t in self._generators if t in self._types }
+        zeros = numpy.zeros(num_designs)
+
+        photovoltaic_rating = self._ratings(designs, defaults.PHOTOVOLTAIC_PANEL)
+        wind_rating = self._ratings(designs, defaults.WIND_TURBINE)
+        diesel_rating = self._ratings(designs, defaults.DIESEL_GENERATOR)
+        battery_rating = self._ratings(designs, defaults.BATTERY)
+        if defaults.WIND_TURBINE in self._generators:
+            wind_peak = self._generators[defaults.WIND_TURBINE]._power_peak
+        if defaults.DIESEL_GENERATOR in self._generators:
+            dg = self._generators[defaults.DIESEL_GENERATOR]
+            load_factor = dg._load_factor
+            soft_min = dg._soft_min
+            kwh_per_gallon = 37.658 * dg._epg_efficiency
+            fuel_rate = diesel_rating * load_factor * load_factor / kwh_per_gallon
+            fuel_level = numpy.zeros(num_designs)
+            diesel_power = diesel_rating * load_factor
+            safe_diesel_power = numpy.where(diesel_rating > 0.0, diesel_power, 1.0)
+            fuel_rate_max = diesel_rating / kwh_per_gallon
+            safe_fuel_rate_max = numpy.where(diesel_rating > 0.0, fuel_rate_max, 1.0)
+        if defaults.BATTERY in self._generators:
+            b = self._generators[defaults.BATTERY]
+            discharge_power = battery_rating * (b._power_rating / b._energy_rating)
+            charge_power = battery_rating * (b._charge_power_rating / b._energy_rating)
+            charge_efficiency = b._charge_efficiency
+            discharge_efficiency = b._discharge_efficiency
+            min_charge = battery_rating * b._min_soc
+            max_charge = battery_rating * b._max_soc
+            charge_level = battery_rating.copy()
+            has_battery = battery_rating > 0.0
+            safe_discharge_power = numpy.where(has_battery, discharge_power, 1.0)
+            safe_charge_power = numpy.where(has_battery, charge_power, 1.0)
+            safe_battery_rating = numpy.where(has_battery, battery_rating, 1.0)
+
+        previous_case = numpy.full(num_designs, -1) # -1 for no previous case
+        for index, timestep in enumerate(self._timesteps):
+            duration = timestep.time_period().duration()
+            load = timestep.power_load()
+            energies = {}
+            available = {}
+            non_degraded = zeros
+
+            # Identify energy available, including upper and lower bounds
+            energies[defaults.LOAD] = -(load * duration)
+            online = {t:duration * online_ratios[t][index] for t in self._generators}
+            if defaults.PHOTOVOLTAIC_PANEL in self._generators:
+                power = photovoltaic_rating * profiles[defaults.PHOTOVOLTAIC_PANEL][index]
+                energies[defaults.PHOTOVOLTAIC_PANEL] = power * online[defaults.PHOTOVOLTAIC_PANEL]
+                non_degraded = non_degraded + power
+            else: energies[defaults.PHOTOVOLTAIC_PANEL] = zeros
+            if defaults.WIND_TURBINE in self._generators:
+                power = numpy.where(wind_rating > 0.0, numpy.minimum(
+                    wind_rating * profiles[defaults.WIND_TURBINE][index], wind_peak), 0.0)
+                energies[defaults.WIND_TURBINE] = power * online[defaults.WIND_TURBINE]
+                non_degraded = non_degraded + power
+            else: energies[defaults.WIND_TURBINE] = zeros
+            if defaults.DIESEL_GENERATOR in self._generators:
+                energies[_DIESEL_MIN] = diesel_rating * soft_min * online[defaults.DIESEL_GENERATOR]
+                energies[_DIESEL_MAX] = diesel_rating * online[defaults.DIESEL_GENERATOR]
+                non_degraded = non_degraded + diesel_rating
+            else: energies[_DIESEL_MIN] = energies[_DIESEL_MAX] = zeros
+            if defaults.BATTERY in self._generators:
+                online_duration = online[defaults.BATTERY]
+                discharge_time = numpy.maximum(0.0, charge_level - min_charge) / safe_discharge_power
+                energies[_BATTERY_DISCHARGE] = numpy.where(has_battery, discharge_power \
+                    * numpy.minimum(online_duration, discharge_time) * discharge_efficiency, 0.0)
+                energies[_BATTERY_CHARGE] = numpy.where(has_battery, -numpy.minimum(
+                    numpy.maximum(0.0, (max_charge - charge_level) / charge_efficiency),
+                    charge_power * online_duration), 0.0)
+            else: energies[_BATTERY_DISCHARGE] = energies[_BATTERY_CHARGE] = zeros
+            for t in [defaults.PHOTOVOLTAIC_PANEL, defaults.WIND_TURBINE]:
+                available[t] = energies[t] / duration
+            available[defaults.DIESEL_GENERATOR] = energies[_DIESEL_MAX] / duration
+            available[defaults.BATTERY] = energies[_BATTERY_DISCHARGE] / duration
+
+            # identify case for current timestep
+            powers = { k:v / duration for k, v in energies.items() }
+            wet_stacking = (diesel_rating > 0.0) & (powers[defaults.LOAD] - powers[defaults.PHOTOVOLTAIC_PANEL] \
+                            - powers[defaults.WIND_TURBINE] < diesel_rating * soft_min) \
+                            if defaults.DIESEL_GENERATOR in self._generators else numpy.zeros(num_designs, dtype=bool)
+            case = self._energy_management_system(powers, previous_case, wet_stacking)
+
+            # generation (do not allow excess from renewables)
+            energy = energies[defaults.LOAD] + numpy.where(
+                case >= 2, energies[defaults.PHOTOVOLTAIC_PANEL] + energies[defaults.WIND_TURBINE], 0.0)
+            energy_diesel = zeros
+            energy_battery = energies[_BATTERY_CHARGE] # case 0
+            # case 4
+            diesel = numpy.minimum(energies[_DIESEL_MAX], numpy.maximum(0.0, -energy))
+            battery = numpy.minimum(energies[_BATTERY_DISCHARGE], numpy.maximum(0.0, -(energy + diesel)))
+            energy_diesel = numpy.where(case == 4, diesel, energy_diesel)
+            energy_battery = numpy.where(case == 4, battery, energy_battery)
+            # case 3
+            diesel = numpy.minimum(energies[_DIESEL_MAX], numpy.maximum(0.0, -(energy + energies[_BATTERY_CHARGE])))
+            battery = numpy.minimum(-(energy + diesel), 0.0)
+            energy_diesel = numpy.where(case == 3, diesel, energy_diesel)
+            energy_battery = numpy.where(case == 3, battery, energy_battery)
+            # case 2
+            battery = numpy.minimum(energies[_BATTERY_DISCHARGE], numpy.maximum(0.0, -energy))
+            energy_battery = numpy.where(case == 2, battery, energy_battery)
+            # case 1
+            energy_1 = energy + energies[_BATTERY_CHARGE]
+            photovoltaic = numpy.minimum(energies[defaults.PHOTOVOLTAIC_PANEL], -energy_1)
+            energy_1 = energy_1 + photovoltaic
+            wind = numpy.where(energy_1 < 0.0, numpy.minimum(energies[defaults.WIND_TURBINE], -energy_1), 0.0)
+            energy_available_to_charge = energies[defaults.LOAD] + wind + photovoltaic
+            battery = numpy.where(energy_available_to_charge <= 0, 0.0,
+                                  numpy.maximum(energies[_BATTERY_CHARGE], -energy_available_to_charge))
+            energy_battery = numpy.where(case == 1, battery, energy_battery)
+            energy_photovoltaic = numpy.where(case == 1, photovoltaic, energies[defaults.PHOTOVOLTAIC_PANEL])
+            energy_wind = numpy.where(case == 1, wind, energies[defaults.WIND_TURBINE])
+
+            # generate power
+            generation = {}
+            for type, energy in [(defaults.PHOTOVOLTAIC_PANEL, energy_photovoltaic),
+                                 (defaults.WIND_TURBINE, energy_wind)]:
+                if type not in self._generators: continue
+                online_duration = online[type]
+                unmet_power = energy * _inverse(online_duration)
+                generation[type] = numpy.where(energy > 0.0, numpy.minimum(
+                    energies[type], unmet_power * online_duration), 0.0) / duration
+            fuel_consumed = zeros
+            wet_stacking = numpy.zeros(num_designs, dtype=bool)
+            if defaults.DIESEL_GENERATOR in self._generators:
+                online_duration = online[defaults.DIESEL_GENERATOR]
+                generating = energy_diesel > 0.0
+                unmet_power = energy_diesel * _inverse(online_duration)
+                unmet_energy = unmet_power * online_duration
+                fuel = numpy.minimum(fuel_rate * unmet_energy / safe_diesel_power, fuel_rate * online_duration)
+                refill = numpy.where(generating, numpy.maximum(0.0, fuel - fuel_level + defaults.EPSILON), 0.0)
+                fuel_level = fuel_level + refill
+                fuel_consumed = refill
+                wet_stacking = generating & (unmet_power < diesel_rating * soft_min)
+                energy_output = diesel_rating * numpy.minimum(fuel_level, fuel_rate_max * online_duration) \
+                                / safe_fuel_rate_max # max available energy at full load
+                energy = numpy.where(generating, numpy.minimum(energy_output, unmet_energy), 0.0)
+                fuel_level = fuel_level - fuel_rate * energy / safe_diesel_power
+                generation[defaults.DIESEL_GENERATOR] = energy / duration
+            if defaults.BATTERY in self._generators:
+                online_duration = online[defaults.BATTERY]
+                discharging = energy_battery > 0.0
+                charging = energy_battery < 0.0
+                unmet_power = energy_battery * _inverse(online_duration)
+                discharge_time = numpy.maximum(0.0, charge_level - min_charge) / safe_discharge_power
+                energy_output = discharge_power * numpy.minimum(online_duration, discharge_time) * discharge_efficiency
+                energy_discharged = numpy.where(discharging, numpy.minimum(energy_output, unmet_power * online_duration), 0.0)
+                charge_time = numpy.minimum(online_duration, numpy.minimum(
+                    -unmet_power * online_duration / safe_charge_power,
+                    numpy.maximum(0.0, (max_charge - charge_level) / charge_efficiency) / safe_charge_power))
+                energy_stored = numpy.where(charging, charge_power * charge_time, 0.0)
+                if numpy.any(charging & (-energy_battery - energy_stored > defaults.EPSILON)):
+                    raise ValueError("Unstored energy error: "+str(numpy.max(-energy_battery - energy_stored)))
+                charge_level = charge_level - energy_discharged / discharge_efficiency \
+                                + energy_stored * charge_efficiency
+                generation[defaults.BATTERY] = (energy_discharged - energy_stored) / duration
+                state_of_charge = numpy.where(has_battery, charge_level / safe_battery_rating, 0.0)
+            else: state_of_charge = zeros
+
+            # store results
+            state_arrays.case[:, index] = case
+            for type, column in columns.items():
+                state_arrays.available_power[:, index, column] = available[type]
+                if type in generation: state_arrays.power_generation[:, index, column] = generation[type]
+            state_arrays.non_degraded_power_total[:, index] = non_degraded
+            state_arrays.available_power_total[:, index] = available[defaults.PHOTOVOLTAIC_PANEL] \
+                + available[defaults.WIND_TURBINE] + available[defaults.DIESEL_GENERATOR]
+            state_arrays.available_power_all[:, index] = state_arrays.available_power_total[:, index] \
+                + available[defaults.BATTERY]
+            state_arrays.power_supply[:, index] = sum(generation.values()) if len(generation) > 0 else zeros
+            state_arrays.state_of_charge[:, index] = state_of_charge
+            state_arrays.diesel_consumption[:, index] = fuel_consumed
+            state_arrays.diesel_is_wet_stacking[:, index] = wet_stacking
+            previous_case = case
+        return [ArrayMetrics(self._timesteps, state_arrays.design(k)) for k in range(num_designs)]
+
+
+def _inverse(duration):
+    """Inverse of an online duration (0 if offline, matching utils.average_power)"""
+    return 1.0 / duration if duration > 0.0 else 0.0
+
+_DIESEL_MIN = "diesel_min"
+_DIESEL_MAX = "diesel_max"
+_BATTERY_DISCHARGE = "battery_discharge"
+_BATTERY_CHARGE = "battery_charge"
+
+def _energy_management_system_1(powers, previous_case, wet_stacking):
+    """Vectorized Grid._energy_management_system_1"""
+    load = powers[defaults.LOAD]
+    renewables = powers[defaults.PHOTOVOLTAIC_PANEL] + powers[defaults.WIND_TURBINE]
+    case = numpy.full(len(previous_case), 4)
+    case = numpy.where(renewables + powers[_DIESEL_MAX] + load >= 0, 3, case)
+    case = numpy.where(renewables + load >= 0, 1, case)
+    case = numpy.where(load > 0, 0, case)
+    return case
+
+def _energy_management_system_2(powers, previous_case, wet_stacking):
+    """Vectorized Grid._energy_management_system_2"""
+    load = powers[defaults.LOAD]
+    renewables = powers[defaults.PHOTOVOLTAIC_PANEL] + powers[defaults.WIND_TURBINE]
+    battery_discharge = powers[_BATTERY_DISCHARGE]
+    battery_charge = powers[_BATTERY_CHARGE]
+    battery_full = numpy.abs(battery_charge) < defaults.EPSILON
+    battery_meets_load = renewables + battery_discharge + load >= 0
+    case = numpy.full(len(previous_case), 4)
+    case = numpy.where(renewables + powers[_DIESEL_MAX] + load >= 0, 3, case)
+    case = numpy.where(battery_meets_load & (battery_full | numpy.isin(previous_case, [1,2,4])), 2, case)
+    case = numpy.where((case == 3) & battery_meets_load & battery_full & wet_stacking, 2, case)
+    case_1 = numpy.where((renewables + load + battery_charge <= 0) & (previous_case == 3), 3, 1)
+    case = numpy.where(renewables + load >= 0, case_1, case)
+    case = numpy.where(load > 0, 0, case)
+    return case
+
+def _energy_management_system_3(powers, previous_case, wet_stacking):
+    """Vectorized Grid._energy_management_system_3"""
+    load = powers[defaults.LOAD]
+    renewables = powers[defaults.PHOTOVOLTAIC_PANEL] + powers[defaults.WIND_TURBINE]
+    battery_charge = powers[_BATTERY_CHARGE]
+    battery_meets_load = renewables + powers[_BATTERY_DISCHARGE] + load >= 0
+    case = numpy.full(len(previous_case), 4)
+    case = numpy.where(battery_meets_load, 2, case)
+    case = numpy.where(renewables + powers[_DIESEL_MAX] + load >= 0, 3, case)
+    continue_battery = (previous_case >= 1) & (previous_case <= 2) & battery_meets_load
+    continue_diesel = (previous_case >= 3) & battery_meets_load \
+        & (numpy.abs(battery_charge) < defaults.EPSILON) & wet_stacking
+    case = numpy.where((case == 3) & (continue_battery | continue_diesel), 2, case)
+    case_1 = numpy.where((renewables + load + battery_charge <= 0) & numpy.isin(previous_case, [3,5]), 3, 1)
+    case = numpy.where(renewables + load >= 0, case_1, case)
+    case = numpy.where(load > 0, 0, case)
+    return case
+
+_ENERGY_MANAGEMENT_SYSTEMS = {
+    "_energy_management_system_1": _energy_management_system_1,
+    "_energy_management_system_2": _energy_management_system_2,
+    "_energy_management_system_3": _energy_management_system_3,
+    "_energy_management_system_4": _energy_management_system_1, # same case logic as 1
+}
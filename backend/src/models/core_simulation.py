@@ -1,14 +1,26 @@
+import random
+import math
+import numpy
 from datetime import timedelta
 from src.utils import TimePeriod, TimeStep
-from src.reports import Metrics
+from src.grid import GridStateArrays
+from src.reports import Metrics, ArrayMetrics, StreamingMetrics
+from .batch_simulation import BatchSimulation
+from .representative_days import representative_days
+from src.components import defaults
 import src.data.mysql.energy_management_systems as database_energy_management_systems
 import src.data.mysql.powerloads as database_powerloads
 
+ENGINE_TIMESTEP = "timestep" # GridState stored on every TimeStep
+ENGINE_ARRAY = "array" # grid state stored in preallocated arrays indexed by timestep
+ENGINES = [ENGINE_TIMESTEP, ENGINE_ARRAY]
+_STATE_TOLERANCE = 10**-9 # grid states carried to the next timestep closer than this are the same (see _same_state)
+
 class CoreSimulation(object):
 
     def __init__(self, grid, energy_management_system_id, powerload_id, weather, 
                  start_datetime=None, end_datetime=None, 
-                 extend_proportion=0.0, disturbance=None):
+                 extend_proportion=0.0, disturbance=None, engine=ENGINE_TIMESTEP):
         """Simulation constructor __init__
 
         Keyword arguments:
@@ -20,7 +32,10 @@ class CoreSimulation(object):
         weather                         weather object with distributions
         extend_proportion               extend the timeframe by the specified proportion
         disturbance                     object with disturbance event information
+        engine                          "timestep" or "array"
         """
+        if engine not in ENGINES:
+            raise ValueError("Simulation engine undefined: "+str(engine))
         self.grid = grid
         self._energy_management_system = database_energy_management_systems.get_parameter_name(energy_management_system_id)
         self._powerload_id = powerload_id
@@ -29,7 +44,16 @@ class CoreSimulation(object):
         self.end_datetime = end_datetime
         self._extend_proportion = extend_proportion
         self.disturbance = disturbance
+        self.engine = engine
         self.timesteps = None
+        self._all_timesteps = None # all timesteps while timesteps are representative days
+        self._representative_days = None # start and weight of each representative day
+        self._fine_timesteps = None # timesteps before aggregation while timesteps are aggregated
+        self._resolution = None # max duration (hours) of aggregated timesteps
+        self._batch_simulation = None
+        self._baseline = None # grid states, grid state carried to each timestep and cases of a run without disturbance
+        self._time_periods = None # timesteps list and their time periods, see _get_time_periods
+        self._online_ratios = None # online ratio of each generator (column) at each timestep (row) with a disturbance
         self._load()
 
     def _load(self):
@@ -99,26 +123,30 @@ class CoreSimulation(object):
             timestep.set_online_ratio(online_ratio)
 
     def _get_time_periods(self):
-        """Return list of time periods"""
-        time_periods = []
-        for timestep in self.timesteps:
-            time_periods.append(timestep.time_period())
-        return time_periods
+        """Return list of time periods (the same list while timesteps are the same list)"""
+        if self._time_periods is None or self._time_periods[0] is not self.timesteps:
+            self._time_periods = (self.timesteps, [timestep.time_period() for timestep in self.timesteps])
+        return self._time_periods[1]
 
     def _simulate_disturbance(self):
-        """Disturbance sets grid status at each time period"""
+        """Disturbance sets grid status at each time period
+        (timesteps with all generators online share the same online ratio dictionary)"""
         if self.disturbance is None: return
         self.disturbance.simulate(self.grid)
-        online_ratio = self.disturbance.propogate(
+        self._online_ratios = self.disturbance.propogate(
             grid=self.grid,
             time_periods=self._get_time_periods(),
         )
-        for timestep in self.timesteps:
-            timestep.set_online_ratio(online_ratio[timestep.time_period()])
+        generators = self.grid.get_generators()
+        online = { generator:1.0 for generator in generators }
+        disturbed = (self._online_ratios < 1.0).any(axis=1)
+        for timestep, online_ratio, is_disturbed in zip(self.timesteps, self._online_ratios.tolist(), disturbed):
+            timestep.set_online_ratio(dict(zip(generators, online_ratio)) if is_disturbed else online)
 
     def _clear_disturbance(self):
         """Reset online ratio at each time period to 'None'"""
         if self.disturbance is None: return
+        self._online_ratios = None
         for timestep in self.timesteps:
             timestep.set_online_ratio(None)
 
@@ -146,6 +174,27 @@ class CoreSimulation(object):
             )
             case = timestep.grid_state().case()
 
+    def _run_arrays(self, state_arrays=None, stop=None):
+        """Iterate through timesteps, operate grid and store info in arrays without a GridState per timestep
+        (or in any input object with the store method of GridStateArrays, see Grid.operate_into)
+        Stop after the first timestep for which the input stop function of state_arrays returns True"""
+        if state_arrays is None:
+            state_arrays = GridStateArrays(len(self.timesteps), self.generator_types())
+        case = None
+        for index, timestep in enumerate(self.timesteps):
+            self._weather.update(timestep.time_period())
+            self.grid.update_current_conditions(timestep, self._weather)
+            case = self.grid.operate_into(
+                state_arrays = state_arrays,
+                index = index,
+                energy_management_system = self._energy_management_system,
+                previous_case = case,
+                load = timestep.power_load(),
+                duration = timestep.time_period().duration(),
+            )
+            if stop is not None and stop(state_arrays): break
+        return state_arrays
+
     def _clear_run(self, diesel_level):
         """Reset grid state at each time period to 'None'
         Reset batteries to starting charge levels"""
@@ -154,16 +203,168 @@ class CoreSimulation(object):
             timestep.set_grid_state(None)
         self.grid.reset_fuel(diesel_level)
 
-    def run(self):
-        """Run simulation"""    
+    def run(self, streaming=False, stop=None):
+        """Run simulation
+        If streaming, return StreamingMetrics (summary outputs only) whatever the engine,
+        stopped early if the input stop function of the metrics so far returns True (see StreamingMetrics.is_complete)
+        If incremental (see set_incremental), only timesteps that may differ from the baseline are simulated"""
+        if stop is not None and not streaming:
+            raise ValueError("Simulation run can only stop early with streaming metrics")
         diesel_level = self.grid.get_diesel_level()
+        self.grid.prepare_renewable_profiles(self.timesteps, self._weather)
         self._simulate_disturbance()
-        self._run()
-        metrics = Metrics(self.timesteps)
+        if streaming:
+            metrics = self._run_arrays(StreamingMetrics(self.timesteps, self.generator_types()), stop)
+        elif self._baseline is not None:
+            grid_states = self._run_incremental()
+            if self.engine == ENGINE_ARRAY:
+                state_arrays = GridStateArrays(len(self.timesteps), self.generator_types())
+                for index, grid_state in enumerate(grid_states): state_arrays.record(index, grid_state)
+                metrics = ArrayMetrics(self.timesteps, state_arrays)
+            else:
+                for timestep, grid_state in zip(self.timesteps, grid_states): timestep.set_grid_state(grid_state)
+                metrics = Metrics(self.timesteps)
+        elif self.engine == ENGINE_ARRAY:
+            metrics = ArrayMetrics(self.timesteps, self._run_arrays())
+        else:
+            self._run()
+            metrics = Metrics(self.timesteps)
         self._clear_disturbance()
         self._clear_run(diesel_level)
         return metrics
 
+    def set_incremental(self, incremental):
+        """Run the simulation once without disturbance as a baseline, keeping the grid state at every timestep,
+        so that later runs only simulate timesteps from the first one with a generator offline until the grid state
+        is back to the baseline state (see _run_incremental), or simulate all timesteps again if not incremental
+        (components and timesteps are taken as they are when called)"""
+        self._baseline = None
+        if not incremental: return
+        diesel_level = self.grid.get_diesel_level()
+        self.grid.prepare_renewable_profiles(self.timesteps, self._weather)
+        online_ratio = { generator:1.0 for generator in self.grid.get_generators() }
+        grid_states, states, cases = [], [self.grid.get_state()], []
+        case = None
+        for timestep in self.timesteps:
+            timestep.set_online_ratio(online_ratio)
+            grid_state = self._operate_grid(timestep=timestep, previous_case=case)
+            case = grid_state.case()
+            grid_states.append(grid_state)
+            states.append(self.grid.get_state())
+            cases.append(case)
+        self._clear_disturbance()
+        self._clear_run(diesel_level)
+        self._baseline = (grid_states, states, cases)
+
+    def _run_incremental(self):
+        """Return grid state at each timestep, simulated from the first timestep with a generator offline
+        until the grid state carried to the next timestep and the case are those of the baseline,
+        after the last timestep with a generator offline: operating the grid only depends on them,
+        so grid states of all other timesteps are those of the baseline (up to rounding, see _same_state)"""
+        grid_states, states, cases = self._baseline
+        disturbed = []
+        if self._online_ratios is not None:
+            disturbed = numpy.flatnonzero((self._online_ratios < 1.0).any(axis=1)).tolist()
+        if len(disturbed) == 0:
+            self.grid.set_state(states[-1])
+            return list(grid_states)
+        first, last = disturbed[0], disturbed[-1]
+        self.grid.set_state(states[first])
+        case = cases[first-1] if first > 0 else None
+        run_states = grid_states[:first]
+        for index in range(first, len(self.timesteps)):
+            grid_state = self._operate_grid(timestep=self.timesteps[index], previous_case=case)
+            case = grid_state.case()
+            run_states.append(grid_state)
+            if index >= last and case == cases[index] and _same_state(self.grid.get_state(), states[index+1]):
+                self.grid.set_state(states[-1])
+                return run_states + grid_states[index+1:]
+        return run_states
+
+    def seed(self, seed):
+        """Seed random number generators used in a run (module random and disturbance sampling),
+        so that a run does not depend on the runs before it"""
+        random.seed(seed)
+        if self.disturbance is not None: self.disturbance.seed(seed)
+
+    def signature(self):
+        """Return list of simulation inputs that determine run outputs, except component ratings
+        (component specs are taken as they are when called, before any design is loaded)"""
+        signature = [
+            [[g.__class__.__name__, _specs(g)] for g in self.grid.get_generators()],
+            self.grid.get_diesel_level(),
+            self._energy_management_system,
+            self._powerload_id,
+            str(self.timesteps[0].time_period().start()),
+            str(self.timesteps[-1].time_period().end()),
+            len(self.timesteps),
+            self._weather.signature(),
+            None if self.disturbance is None else self.disturbance.signature(),
+        ]
+        if self._representative_days is not None: signature.append(self._representative_days)
+        if self._resolution is not None: signature.append(["resolution", self._resolution])
+        return signature
+
+    def set_representative_days(self, num_days):
+        """Simulate input number of weighted representative days (see representative_days) instead of all timesteps,
+        or all timesteps again if None"""
+        if self._fine_timesteps is not None:
+            raise ValueError("Representative days are set on timesteps that are not aggregated")
+        if self._all_timesteps is not None: self.timesteps = self._all_timesteps
+        self._all_timesteps = None
+        self._representative_days = None
+        self._batch_simulation = None
+        self._baseline = None
+        if num_days is None: return
+        days = representative_days(self.timesteps, list(self.renewable_profiles().values()), num_days)
+        self._all_timesteps = self.timesteps
+        self.timesteps = []
+        for day, weight in days:
+            for index in day:
+                timestep = self._all_timesteps[index]
+                self.timesteps.append(TimeStep(
+                    time_period=timestep.time_period(),
+                    power_load=timestep.power_load(),
+                    sun_weight=timestep.sun_weight(),
+                    weight=weight,
+                ))
+                self.timesteps[-1].set_online_ratio(timestep.online_ratio())
+        self._representative_days = [[str(self._all_timesteps[day[0]].time_period().start()), weight] for day, weight in days]
+
+    def set_resolution(self, hours):
+        """Simulate the current timesteps aggregated into timesteps of up to input number of hours
+        (mean load, weather averaged over each aggregated time period), or not aggregated again if None"""
+        if self._fine_timesteps is not None: self.timesteps = self._fine_timesteps
+        self._fine_timesteps = None
+        self._resolution = None
+        self._batch_simulation = None
+        self._baseline = None
+        if hours is None: return
+        self._fine_timesteps = self.timesteps
+        self.timesteps = _aggregate(self.timesteps, hours)
+        self._resolution = hours
+
+    def renewable_profiles(self):
+        """Return dictionary with renewable generators as key and arrays of power per unit of power rating
+        at each timestep as value"""
+        self.grid.prepare_renewable_profiles(self.timesteps, self._weather)
+        generators = [g for g in self.grid.get_generators()
+                      if g.__class__.__name__ in [defaults.PHOTOVOLTAIC_PANEL, defaults.WIND_TURBINE]]
+        profiles = [numpy.zeros(len(self.timesteps)) for _ in generators]
+        for index, timestep in enumerate(self.timesteps):
+            self._weather.update(timestep.time_period())
+            for generator, profile in zip(generators, profiles):
+                generator.update_current_conditions(timestep, self._weather)
+                profile[index] = generator._power_per_unit()
+        return dict(zip(generators, profiles))
+
+    def generator_types(self):
+        """Return sorted list of generator types with an online ratio at each timestep"""
+        types = set()
+        for generator in self.timesteps[0].online_ratio():
+            types.add(generator.__class__.__name__)
+        return sorted(list(types))
+
     def peak_load(self):
         """Return peak load"""
         peak_load = 0.0
@@ -182,3 +383,59 @@ class CoreSimulation(object):
         design specs can currently only accomodate component ratings"""
         component_ratings = design_specs
         self.grid.update_components(initial_energy_resources, component_ratings)
+        self._baseline = None
+
+    def der_sizing_run_batch(self, initial_energy_resources, designs):
+        """Run input list of designs in lockstep, return list of metrics in the same order
+        (each design is equivalent to der_sizing_load_design followed by run,
+        except that a disturbance is sampled once for all generators and shared by all designs)"""
+        self.grid.update_components(initial_energy_resources, {})
+        self._simulate_disturbance()
+        if self._batch_simulation is None:
+            self._batch_simulation = BatchSimulation(
+                timesteps=self.timesteps,
+                weather=self._weather,
+                energy_management_system=self._energy_management_system,
+                energy_resources=initial_energy_resources,
+                types=self.generator_types(),
+            )
+        metrics = self._batch_simulation.run(designs)
+        self._clear_disturbance()
+        return metrics
+
+
+def _aggregate(timesteps, hours):
+    """List of timesteps aggregating consecutive input timesteps with the same weight into time periods
+    of up to input number of hours, with duration-weighted mean power load and sun weight"""
+    blocks = []
+    for timestep in timesteps:
+        if len(blocks) > 0:
+            block = blocks[-1]
+            if timestep.time_period().start() == block[-1].time_period().end() and timestep.weight() == block[0].weight() \
+                and (timestep.time_period().end() - block[0].time_period().start()).total_seconds()/3600.0 <= hours:
+                block.append(timestep)
+                continue
+        blocks.append([timestep])
+    aggregated = []
+    for block in blocks:
+        start = block[0].time_period().start()
+        end = block[-1].time_period().end()
+        duration = sum(t.time_period().duration() for t in block)
+        aggregated.append(TimeStep(
+            time_period=TimePeriod(start=start, mid=start + (end - start)/2, end=end),
+            power_load=sum(t.power_load() * t.time_period().duration() for t in block) / duration,
+            sun_weight=sum(t.sun_weight() * t.time_period().duration() for t in block) / duration,
+            weight=block[0].weight(),
+        ))
+        aggregated[-1].set_online_ratio(block[0].online_ratio())
+    return aggregated
+
+def _same_state(state, other):
+    """Checks if input grid states carried to the next timestep (see Grid.get_state) are equal up to rounding"""
+    values = [state[0]] + list(state[1]) + list(state[2])
+    other_values = [other[0]] + list(other[1]) + list(other[2])
+    return all(math.isclose(a, b, rel_tol=_STATE_TOLERANCE, abs_tol=_STATE_TOLERANCE) for a, b in zip(values, other_values))
+
+def _specs(component):
+    """Dictionary of scalar attributes of input component"""
+    return { k:v for k, v in vars(component).items() if v is None or isinstance(v, (bool, int, float, str)) }
@@ -0,0 +1,68 @@
+import numpy
+
+_MAX_ITERATIONS = 100
+
+def representative_days(timesteps, profiles, num_days):
+    """Return (indices of timesteps, weight) of each day chosen to stand for all days, in chronological order
+    Timesteps are grouped into days by start date. The days with the highest peak load, the highest load energy
+    and the lowest energy of each input profile are always chosen, other days are the medoids of num_days
+    clusters (k-medoids) of daily load and input profiles (power per unit of rating at each timestep),
+    weighted by the number of days in their cluster.
+    Days with fewer timesteps than most days (e.g. first and last days of the horizon) are chosen with weight 1
+
+    Keyword arguments:
+    timesteps       list of TimeStep objects in chronological order
+    profiles        list of arrays of renewable power per unit of rating at each timestep
+    num_days        number of days to choose (all days if at least the number of days)
+    """
+    days = dict()
+    for index, timestep in enumerate(timesteps):
+        days.setdefault(timestep.time_period().start().date(), []).append(index)
+    days = list(days.values())
+    if num_days >= len(days): return [(day, 1) for day in days]
+    lengths = [len(day) for day in days]
+    day_length = max(set(lengths), key=lengths.count)
+    full_days = [day for day in days if len(day) == day_length]
+    chosen = { tuple(day):1 for day in days if len(day) != day_length }
+
+    load = numpy.array([t.power_load() for t in timesteps], dtype=float)
+    series = [_normalize(load)] + [_normalize(numpy.asarray(profile, dtype=float)) for profile in profiles]
+    extremes = { max(range(len(full_days)), key=lambda i: load[full_days[i]].max()),
+                 max(range(len(full_days)), key=lambda i: load[full_days[i]].sum()) }
+    for profile in series[1:]:
+        extremes.add(min(range(len(full_days)), key=lambda i: profile[full_days[i]].sum()))
+    for i in extremes: chosen[tuple(full_days[i])] = 1
+
+    others = [day for i, day in enumerate(full_days) if i not in extremes]
+    num_clusters = min(len(others), max(1, num_days - len(chosen)))
+    if num_clusters > 0:
+        features = numpy.array([numpy.concatenate([s[day] for s in series]) for day in others])
+        for medoid, weight in _k_medoids(features, num_clusters):
+            if weight > 0: chosen[tuple(others[medoid])] = chosen.get(tuple(others[medoid]), 0) + weight
+    return sorted([(list(day), weight) for day, weight in chosen.items()], key=lambda d: d[0][0])
+
+def _normalize(values):
+    """Input values divided by their maximum (unchanged if not positive)"""
+    peak = values.max() if len(values) > 0 else 0.0
+    return values / peak if peak > 0.0 else values
+
+def _k_medoids(features, num_clusters):
+    """Return (index, cluster size) of the medoid of each of num_clusters clusters of input rows
+    (deterministic: starts from the most central row and the farthest rows, then alternates assignment and update)"""
+    distances = numpy.sqrt(((features[:, None, :] - features[None, :, :])**2).sum(axis=2))
+    medoids = [int(numpy.argmin(distances.sum(axis=1)))]
+    while len(medoids) < num_clusters:
+        medoids.append(int(numpy.argmax(distances[:, medoids].min(axis=1))))
+    for _ in range(_MAX_ITERATIONS):
+        assignment = numpy.argmin(distances[:, medoids], axis=1)
+        updated = []
+        for cluster in range(num_clusters):
+            members = numpy.flatnonzero(assignment == cluster)
+            if len(members) == 0: # medoid equal to an earlier medoid
+                updated.append(medoids[cluster])
+                continue
+            updated.append(int(members[numpy.argmin(distances[numpy.ix_(members, members)].sum(axis=1))]))
+        if updated == medoids: break
+        medoids = updated
+    assignment = numpy.argmin(distances[:, medoids], axis=1)
+    return [(medoid, int(numpy.count_nonzero(assignment == cluster))) for cluster, medoid in enumerate(medoids)]
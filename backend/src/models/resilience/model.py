@@ -1,15 +1,72 @@
 import statistics
 import math
+import random
+import contextlib
 from datetime import timedelta
 import src.data.mysql.resilience as database_resilience
+import src.utils.parallel as parallel
+from src.models.resilience.window_metrics import WindowMetrics
+
+_MIN_RUNS = 10 # Monte Carlo runs before confidence intervals can stop the runs early
+_MONTE_CARLO = "Monte Carlo" # prefix of the keys of Monte Carlo results
 
 class Resilience(object):
 
-    def __init__(self, core_sim):
+    def __init__(self, core_sim, incremental=True, num_workers=None, seed=None, num_runs=None, tolerance=None,
+                 confidence=0.95):
+        """Resilience constructor __init__
+        Results are averaged over num_runs realizations of a stochastic disturbance (Monte Carlo).
+        Each realization and disturbance start time is simulated from its own random number generator stream
+        (derived from seed, the realization and the start time), so results do not depend on the order
+        or process of the runs
+
+        Keyword arguments:
+        core_sim        CoreSimulation of the grid with a disturbance
+        incremental     simulate each disturbance only until the grid is back to the state of a run without
+                        disturbance, taking the other timesteps from that run (see CoreSimulation.set_incremental)
+        num_workers     number of worker processes for the runs (None for none, 0 for all available cpus)
+        seed            random number generator seed of disturbance sampling (None for a random one)
+        num_runs        maximum number of realizations of the disturbance (None for 1; 1 if it is not stochastic)
+        tolerance       stop once the confidence interval half-width of every result is at most tolerance,
+                        after at least _MIN_RUNS realizations (None to run all of them)
+        confidence      confidence level of the intervals (normal approximation)
+        """
         self._core_sim = core_sim
-    
-    def _local_shift_method(self, timesteps, start_specified, duration, num_hours=None, max_num_shifts=100):
-        """Compute resilience using the local shift method"""
+        self._incremental = incremental
+        self.num_workers = 1 if num_workers is None else parallel.get_num_workers(num_workers)
+        self._seed = random.randrange(2**32) if seed is None else seed
+        self.num_runs = 1
+        if num_runs is not None and core_sim.disturbance.is_stochastic(): self.num_runs = max(1, int(num_runs))
+        self._tolerance = tolerance
+        self._confidence = confidence
+
+    def _run_from(self, run, start):
+        """Run realization run of the disturbance starting at input datetime, from the stream of both"""
+        self._core_sim.disturbance.start_datetime = start
+        self._core_sim.seed(f"{self._seed}-{run}-{start.isoformat()}")
+        return self._core_sim.run()
+
+    def _window_results(self, run, start, duration=None):
+        """Compute all fixed window results of realization run of the disturbance starting at input datetime,
+        over the duration (hours) or the sampled disturbance if None; returns results and duration"""
+        metrics = self._run_from(run, start)
+        if duration is None:
+            end = self._core_sim.disturbance.end_datetime
+            duration = self._core_sim.disturbance.duration
+        else:
+            end = start + timedelta(hours=duration)
+        return WindowMetrics(metrics).results(start, end), duration
+
+    def _all_window_results(self, executor, tasks):
+        """Compute window results of each input (run, start, duration) in the same order,
+        with input pool of worker processes if not None"""
+        if executor is None:
+            return [self._window_results(*task) for task in tasks]
+        futures = [executor.submit(_window_results, *task) for task in tasks]
+        return [future.result() for future in futures]
+
+    def _local_shift_start_times(self, timesteps, start_specified, duration, num_hours=None, max_num_shifts=100):
+        """Return disturbance start times of the local shift method"""
         start, end = _local_shift_method_range(timesteps, start_specified, duration, num_hours=num_hours)
         if num_hours is not None and num_hours < max_num_shifts:
             max_num_shifts = int(num_hours)+1
@@ -21,46 +78,93 @@ class Resilience(object):
                                     if i % modulo_divisor == 0]
             if len(all_start_times)-1 not in selected_start_time_indices:
                 selected_start_time_indices.append(len(all_start_times)-1)
-        average_performance = {}
-        for i in selected_start_time_indices:
-            ts = all_start_times[i].time_period().start()
-            self._core_sim.disturbance.start_datetime = ts
-            metrics = self._core_sim.run()
-            time_window = _time_window(timesteps, ts, ts + timedelta(hours=duration))
-            results = _fixed_window_wrapper(metrics, time_window)
-            for key, value in results.items():
-                if key not in average_performance:
-                    average_performance[key] = value
-                else:
-                    average_performance[key] += value
-        results = {}
-        prefix = (f"Local ({num_hours})" if num_hours else "Global")+" Shift Method - "
-        for key in average_performance:
-            results[prefix+key] = average_performance[key] / len(selected_start_time_indices)
-        self._core_sim.disturbance.start_datetime = start_specified
-        return results
+        return [all_start_times[i].time_period().start() for i in selected_start_time_indices]
 
-    def _global_shift_method(self, timesteps, duration, max_num_shifts=100):
-        """Compute resilience using the global shift method"""
+    def _global_shift_start_times(self, timesteps, duration, max_num_shifts=100):
+        """Return disturbance start times of the global shift method"""
         start = timesteps[0].time_period().start()
-        return self._local_shift_method(timesteps, start, duration, max_num_shifts=max_num_shifts)
+        return self._local_shift_start_times(timesteps, start, duration, max_num_shifts=max_num_shifts)
 
-    def run(self, hours=None, results_dir=None, database_id=None, debug=False):
-        metrics = self._core_sim.run()
-        start = self._core_sim.disturbance.start_datetime
-        end = self._core_sim.disturbance.end_datetime
-        duration = self._core_sim.disturbance.duration
-        time_window = _time_window(metrics.timesteps, start, end)
-        fixed_window = _fixed_window_method(metrics, time_window)
+    def _shift_start_times(self, timesteps, start, duration, hours=None):
+        """Return dictionary with the results prefix of each shift method as key and its start times as value"""
         default_num_hours = 24
-        local_shift = self._local_shift_method(metrics.timesteps, start, duration, num_hours=default_num_hours)
+        start_times = { f"Local ({default_num_hours}) Shift Method - ":
+            self._local_shift_start_times(timesteps, start, duration, num_hours=default_num_hours) }
         if hours is not None and hours > 0 and hours != default_num_hours:
-            local_shift_requested = self._local_shift_method(metrics.timesteps, start, duration, num_hours=hours)
-            local_shift = {**local_shift, **local_shift_requested}
-        global_shift = self._global_shift_method(metrics.timesteps, duration)
-        results = {**fixed_window, **local_shift, **global_shift}
+            start_times[f"Local ({hours}) Shift Method - "] = \
+                self._local_shift_start_times(timesteps, start, duration, num_hours=hours)
+        start_times["Global Shift Method - "] = self._global_shift_start_times(timesteps, duration)
+        return start_times
+
+    def _realizations(self, executor, runs, start, hours=None):
+        """Compute results of the fixed window and shift methods of each input realization
+        of the disturbance starting at input datetime, in the same order"""
+        timesteps = self._core_sim.timesteps
+        fixed_window = self._all_window_results(executor, [(run, start, None) for run in runs])
+        results = [{ "Fixed Window Method - "+key:value for key, value in window_results.items() }
+                   for window_results, _ in fixed_window]
+        tasks = []
+        methods = []
+        for i, run in enumerate(runs):
+            duration = fixed_window[i][1]
+            for prefix, start_times in self._shift_start_times(timesteps, start, duration, hours).items():
+                tasks += [(run, t, duration) for t in start_times]
+                methods.append((i, prefix, len(start_times)))
+        shift_results = iter(self._all_window_results(executor, tasks))
+        for i, prefix, num_shifts in methods:
+            average_performance = _average([next(shift_results)[0] for _ in range(num_shifts)])
+            results[i].update({ prefix+key:value for key, value in average_performance.items() })
+        return results
+
+    def _is_converged(self, runs):
+        """Checks if the confidence interval half-width of every result over input runs is within tolerance"""
+        if self._tolerance is None or len(runs) < _MIN_RUNS: return False
+        return max(_half_widths(runs, self._confidence).values()) <= self._tolerance
+
+    def run(self, hours=None, results_dir=None, database_id=None, debug=False):
+        self._core_sim.set_incremental(self._incremental)
+        start = self._core_sim.disturbance.start_datetime
+        runs = []
+        # runs are simulated in batches of one per worker, forked after the run without disturbance
+        # (see CoreSimulation.set_incremental); stopping is checked in order, so extra runs of a batch are dropped
+        batch_size = self.num_workers if self.num_workers > 1 else 1
+        pool = parallel.pool(self.num_workers, self) if self.num_workers > 1 else contextlib.nullcontext()
+        with pool as executor:
+            while len(runs) < self.num_runs and not self._is_converged(runs):
+                batch = range(len(runs), min(self.num_runs, len(runs) + batch_size))
+                for results in self._realizations(executor, batch, start, hours=hours):
+                    if self._is_converged(runs): break
+                    runs.append(results)
+        results = _average(runs)
+        if len(runs) > 1: # scalar values only, results are listed as a table of key and value
+            half_widths = _half_widths(runs, self._confidence)
+            results.update({ key+" CI Half-Width":half_widths[key] for key in half_widths })
+            results[_MONTE_CARLO+" Runs"] = len(runs)
+            results[_MONTE_CARLO+" Stopped Early"] = len(runs) < self.num_runs
+            results[_MONTE_CARLO+" Confidence Level"] = self._confidence
+        self._core_sim.disturbance.start_datetime = start
+        self._core_sim.set_incremental(False)
         if database_id is not None:
             _results_to_database(database_id, results)
+        return results
+
+def _window_results(run, start, duration=None):
+    """Compute fixed window results of realization run of the disturbance starting at input datetime
+    with the Resilience object of a worker process pool"""
+    return parallel.get_state()._window_results(run, start, duration)
+
+def _average(results):
+    """Average each value of a list of results dictionaries (summed in order)"""
+    average = dict(results[0])
+    for other in results[1:]:
+        for key, value in other.items():
+            average[key] += value
+    return { key:value / len(results) for key, value in average.items() }
+
+def _half_widths(runs, confidence):
+    """Half-width of the confidence interval of the mean of each result over input runs (normal approximation)"""
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    return { key:z * statistics.stdev([r[key] for r in runs]) / math.sqrt(len(runs)) for key in runs[0] }
 
 def _results_to_database(id, results):
     """write the resilience analysis results to database"""
@@ -81,95 +185,6 @@ def _time_window(timesteps, start, end):
                 time_window = [t]
     return time_window
 
-def _time_window_duration(window):
-    """Compute the duration in hours of a time window"""
-    time_difference = window[len(window)-1].time_period().end()-window[0].time_period().start()
-    return time_difference.total_seconds() / 3600.0
-
-def _fixed_time_window_giachetti_2022(metrics, time_window):
-    """Compute resilience using the fixed time window method
-    of Giachetti et. al. (2022)"""
-    omega = 0.5
-    if len(time_window) == 0:
-        return 1.0
-    invulnerability = metrics.load_satisfaction_ratio[time_window[0]]
-    energy_supply = 0.0
-    enery_load = 0.0
-    for t in time_window:
-        energy_supply += min(metrics.supply[t], metrics.load[t]) * t.time_period().duration()
-        enery_load += metrics.load[t] * t.time_period().duration()
-    recovery = energy_supply/enery_load if enery_load > 0.0 else 1.0
-    return omega * invulnerability + (1-omega) * recovery
-
-def _performance(metrics, t, denominator):
-    """Generic performance function"""
-    return min(1.0,metrics.supply[t]/denominator) if denominator > 0.0 else 1.0
-
-def _peak_demand_performance_method(metrics, t):
-    """Compute resilience at a given time t using the average demand method"""
-    return _performance(metrics, t, metrics.load_peak)
-
-def _demand_performance_method(metrics, t):
-    """Compute resilience at a given time t using the average demand method"""
-    return _performance(metrics, t, metrics.load[t])
-
-def _fixed_time_window_average_performance_method(metrics, time_window, performance_method):
-    """Compute resilience using a fixed time window
-    average performance method"""
-    if len(time_window) == 0:
-        return 1.0
-    time_window_duration = _time_window_duration(time_window)
-    if time_window_duration == 0.0:
-        return 1.0
-    average_performance = 0.0
-    for t in time_window:
-        performance = performance_method(metrics, t)
-        average_performance += performance * t.time_period().duration()
-    average_performance /= time_window_duration
-    return average_performance
-
-def _fixed_time_window_average_performance_median(metrics, time_window):
-    """Compute resilience using the fixed time window
-    average performance median demand method"""
-    if len(time_window) == 0:
-        return 1.0
-    time_window_duration = _time_window_duration(time_window)
-    if time_window_duration == 0.0:
-        return 1.0
-    times_above_load_median = [t for t in time_window if metrics.load[t] > metrics.load_median]
-    if len(times_above_load_median) == 0:
-        time_window_load_median = statistics.median([metrics.load[t] for t in time_window])
-        times_above_load_median = [t for t in time_window if metrics.load[t] >= time_window_load_median]
-    average_performance = sum(_demand_performance_method(metrics, t) * t.time_period().duration()
-                   for t in times_above_load_median)
-    duration_measured = sum(t.time_period().duration() for t in times_above_load_median)
-    average_performance /= duration_measured
-    return average_performance
-
-def _fixed_window_wrapper(metrics, time_window):
-        """Wrapper to run all fixed window methods"""
-        invulnerability_recovery = _fixed_time_window_giachetti_2022(metrics, time_window)
-        average_performance_demand = _fixed_time_window_average_performance_method(
-            metrics, time_window, _demand_performance_method
-        )
-        average_performance_peak_demand = _fixed_time_window_average_performance_method(
-            metrics, time_window, _peak_demand_performance_method
-        )
-        average_performance_median_demand = _fixed_time_window_average_performance_median(
-            metrics, time_window
-        )
-        return { 
-            "Invulnerability-Recovery":invulnerability_recovery,
-            "Average Performance Demand":average_performance_demand,
-            "Average Performance Peak Demand":average_performance_peak_demand,
-            "Average Performance Median Demand":average_performance_median_demand,
-        }
-
-def _fixed_window_method(metrics, time_window):
-    """Compute resilience using the fixed window method"""
-    results = _fixed_window_wrapper(metrics, time_window)
-    return { "Fixed Window Method - "+key:results[key] for key in results }
-
 def _local_shift_method_range(timesteps, start_specified, duration, num_hours=None):
     """Generate earliest and latest disturbance start times for local shift method"""
     horizon_start = timesteps[0].time_period().start()
@@ -0,0 +1,118 @@
+import bisect
+import numpy
+
+class WindowMetrics(object):
+
+    _OMEGA = 0.5 # weight of invulnerability in the Giachetti et. al. (2022) method
+
+    def __init__(self, metrics):
+        """WindowMetrics constructor __init__
+        Resilience metrics of a run over any time window from cumulative sums over its timesteps,
+        so that a window costs two binary searches on timestep mid times and a few differences of sums
+        (except the median demand method when no timestep of the window is above the median load)
+
+        Keyword arguments:
+        metrics            Metrics or ArrayMetrics of a run
+        """
+        timesteps = metrics.timesteps
+        self._mids = [t.time_period().mid() for t in timesteps]
+        self._starts = [t.time_period().start() for t in timesteps]
+        self._ends = [t.time_period().end() for t in timesteps]
+        duration = numpy.array([t.time_period().duration() for t in timesteps], dtype=float)
+        load = _per_timestep(metrics.load, timesteps)
+        supply = _per_timestep(metrics.supply, timesteps)
+        self._load = load
+        self._load_median = metrics.load_median
+        self._duration = duration
+        self._load_satisfaction_ratio = _per_timestep(metrics.load_satisfaction_ratio, timesteps)
+        self._demand_performance = numpy.ones(len(timesteps))
+        mask = load > 0.0
+        self._demand_performance[mask] = numpy.minimum(1.0, supply[mask] / load[mask])
+        peak_demand_performance = numpy.ones(len(timesteps))
+        if metrics.load_peak > 0.0: peak_demand_performance = numpy.minimum(1.0, supply / metrics.load_peak)
+        above_median = load > metrics.load_median
+        self._energy_supply = _cumulative(numpy.minimum(supply, load) * duration)
+        self._energy_load = _cumulative(load * duration)
+        self._demand = _cumulative(self._demand_performance * duration)
+        self._peak_demand = _cumulative(peak_demand_performance * duration)
+        self._median_demand = _cumulative(self._demand_performance * duration * above_median)
+        self._median_duration = _cumulative(duration * above_median)
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}('
+           f'num_timesteps={len(self._mids)!r})')
+
+    def window(self, start, end):
+        """Return index range of timesteps with mid time between input start and end datetimes
+        (the first timestep if there are none)"""
+        first = bisect.bisect_left(self._mids, start)
+        last = bisect.bisect_right(self._mids, end)
+        if first >= last: return 0, min(1, len(self._mids))
+        return first, last
+
+    def _window_duration(self, first, last):
+        """Duration in hours from the start of the first to the end of the last timestep of a window"""
+        return (self._ends[last-1] - self._starts[first]).total_seconds() / 3600.0
+
+    def giachetti_2022(self, first, last):
+        """Compute resilience using the fixed time window method
+        of Giachetti et. al. (2022)"""
+        if first >= last:
+            return 1.0
+        invulnerability = float(self._load_satisfaction_ratio[first])
+        energy_supply = self._energy_supply[last] - self._energy_supply[first]
+        energy_load = self._energy_load[last] - self._energy_load[first]
+        recovery = energy_supply/energy_load if energy_load > 0.0 else 1.0
+        return self._OMEGA * invulnerability + (1-self._OMEGA) * recovery
+
+    def _average_performance(self, cumulative, first, last):
+        """Compute resilience using a fixed time window average performance method
+        from input cumulative sums of performance times duration"""
+        if first >= last:
+            return 1.0
+        window_duration = self._window_duration(first, last)
+        if window_duration == 0.0:
+            return 1.0
+        return (cumulative[last] - cumulative[first]) / window_duration
+
+    def average_performance_demand(self, first, last):
+        """Compute resilience using the fixed time window average performance demand method"""
+        return self._average_performance(self._demand, first, last)
+
+    def average_performance_peak_demand(self, first, last):
+        """Compute resilience using the fixed time window average performance peak demand method"""
+        return self._average_performance(self._peak_demand, first, last)
+
+    def average_performance_median_demand(self, first, last):
+        """Compute resilience using the fixed time window
+        average performance median demand method"""
+        if first >= last:
+            return 1.0
+        if self._window_duration(first, last) == 0.0:
+            return 1.0
+        duration_measured = self._median_duration[last] - self._median_duration[first]
+        if duration_measured > 0.0:
+            return (self._median_demand[last] - self._median_demand[first]) / duration_measured
+        load = self._load[first:last]
+        measured = load >= numpy.median(load)
+        duration = self._duration[first:last][measured]
+        return float(numpy.dot(self._demand_performance[first:last][measured], duration) / duration.sum())
+
+    def results(self, start, end):
+        """Compute all fixed window methods over the time window between input start and end datetimes"""
+        first, last = self.window(start, end)
+        return {
+            "Invulnerability-Recovery":self.giachetti_2022(first, last),
+            "Average Performance Demand":self.average_performance_demand(first, last),
+            "Average Performance Peak Demand":self.average_performance_peak_demand(first, last),
+            "Average Performance Median Demand":self.average_performance_median_demand(first, last),
+        }
+
+def _per_timestep(values, timesteps):
+    """Return array of input values by timestep (array or dictionary keyed by timestep)"""
+    if isinstance(values, dict): return numpy.array([values[t] for t in timesteps], dtype=float)
+    return numpy.asarray(values, dtype=float)
+
+def _cumulative(values):
+    """Return cumulative sums of input values, starting with 0 (so sums over index range i:j are c[j]-c[i])"""
+    return numpy.concatenate([[0.0], numpy.cumsum(values)])
@@ -0,0 +1,63 @@
+import numpy
+import src.components.defaults as component_defaults
+
+_TOLERANCE = 10**-6 # violations smaller than this ratio of the peak load (or total load energy) are not proof
+
+class EnergyBounds(object):
+
+    def __init__(self, timesteps, profiles, energy_resources):
+        """EnergyBounds constructor __init__
+        Necessary conditions for a design to have no deficit, from energy balances that hold
+        whatever the energy management system dispatches: generators are taken as always online,
+        renewables at their profile (up to the peak power of wind turbines) and diesel without fuel limit,
+        so the bounds also hold with disturbances. A design violating them has a deficit without being simulated
+
+        Keyword arguments:
+        timesteps           list of TimeStep objects in chronological order
+        profiles            dictionary with renewable types as key and arrays of power per unit of rating
+                            at each timestep as value
+        energy_resources    dictionary with generator types as key and lists (1 generator) as value
+        """
+        self._load = numpy.array([t.power_load() for t in timesteps], dtype=float)
+        self._durations = numpy.array([t.time_period().duration() for t in timesteps], dtype=float)
+        self._profiles = profiles
+        self._power_tolerance = _TOLERANCE * self._load.max()
+        self._energy_tolerance = _TOLERANCE * float(numpy.dot(self._load, self._durations))
+        self._peaks = { t:energy_resources[t][0]._power_peak for t in profiles if t == component_defaults.WIND_TURBINE }
+        self._battery = None
+        if component_defaults.BATTERY in energy_resources:
+            self._battery = energy_resources[component_defaults.BATTERY][0]
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}('
+           f'num_timesteps={len(self._load)!r},'
+           f'types={list(self._profiles.keys())!r})')
+
+    def _generation(self, design):
+        """Upper bound of power generated by all generators but batteries at each timestep for input design"""
+        generation = numpy.full(len(self._load), float(design.get(component_defaults.DIESEL_GENERATOR, 0.0)))
+        for type, profile in self._profiles.items():
+            power = float(design.get(type, 0.0)) * profile
+            if type in self._peaks: power = numpy.minimum(power, self._peaks[type])
+            generation = generation + power
+        return generation
+
+    def has_deficit(self, design):
+        """Checks if the input design has a deficit at some timestep whatever the dispatch:
+        load above generation and battery discharge power at a timestep, or load not met by generation
+        over a time window above the energy stored at its start and charged from its surplus generation"""
+        generation = self._generation(design)
+        shortfall = numpy.maximum(0.0, self._load - generation)
+        if self._battery is None or design.get(component_defaults.BATTERY, 0.0) <= 0.0:
+            return bool(shortfall.max() > self._power_tolerance)
+        b = self._battery
+        rating = float(design[component_defaults.BATTERY])
+        discharge_power = rating * (b._power_rating / b._energy_rating) * b._discharge_efficiency
+        if shortfall.max() > discharge_power + self._power_tolerance: return True
+        charge_power = rating * (b._charge_power_rating / b._energy_rating)
+        charged = numpy.minimum(numpy.maximum(0.0, generation - self._load), charge_power) \
+            * b._charge_efficiency * b._discharge_efficiency # energy stored per hour, as energy out
+        # max over windows of net energy out of the battery (max subarray sum with prefix sums)
+        net = numpy.concatenate([[0.0], numpy.cumsum((shortfall - charged) * self._durations)])
+        window = (net - numpy.minimum.accumulate(net)).max()
+        return bool(window > rating * (1.0 - b._min_soc) * b._discharge_efficiency + self._energy_tolerance)
@@ -0,0 +1,115 @@
+import itertools
+from operator import le
+
+_LEAF_SIZE = 16
+
+class DominanceIndex(object):
+
+    def __init__(self, der_types):
+        """DominanceIndex constructor __init__
+        Index of sizing results by design ratings and deficit percentage answering dominance queries
+        without scanning every result: results are kept in static k-d trees of sizes 2^i,
+        merged like a binary counter as results are added (amortized O(log^2 n) per insert)
+
+        Keyword arguments:
+        der_types       list of DER types (order of design ratings in points)
+        """
+        self.der_types = list(der_types)
+        self._trees = []
+        self._size = 0
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}('
+           f'der_types={self.der_types!r},'
+           f'size={self._size!r})')
+
+    def __len__(self):
+        return self._size
+
+    def _point(self, design, deficit_percentage):
+        """Point of input design ratings followed by input deficit percentage"""
+        return tuple(design[t] for t in self.der_types) + (deficit_percentage,)
+
+    def insert(self, result):
+        """Add input result after all results already in the index"""
+        entries = [(self._size, self._point(result.design, result.deficit_percentage), result.get_name())]
+        self._size += 1
+        i = 0
+        while i < len(self._trees) and self._trees[i] is not None:
+            entries += self._trees[i].entries
+            self._trees[i] = None
+            i += 1
+        if i == len(self._trees): self._trees.append(None)
+        self._trees[i] = _Tree(entries, len(self.der_types) + 1)
+
+    def sync(self, results):
+        """Add results of input dictionary not yet in the index (results are only ever appended)"""
+        if self._size > len(results):
+            self._trees = []
+            self._size = 0
+        for result in itertools.islice(results.values(), self._size, None):
+            self.insert(result)
+
+    def first_dominating(self, result):
+        """Return name of the first result (in insertion order) dominating the input result, or None:
+        design ratings no larger (and not equal) and deficit percentage no larger"""
+        return self._query(self._point(result.design, result.deficit_percentage), first=True)
+
+    def dominates_design(self, design):
+        """Checks if any result with no deficit dominates the input design"""
+        return self._query(self._point(design, 0.0), first=False) is not None
+
+    def _query(self, point, first):
+        """Name of the first result (or any result if not first) with a point no larger than the input point
+        and design ratings not equal to those of the input point"""
+        best = (self._size, None)
+        for tree in self._trees:
+            if tree is None: continue
+            best = tree.query(point, best, first)
+            if not first and best[1] is not None: break
+        return best[1]
+
+
+class _Tree(object):
+
+    def __init__(self, entries, num_dims):
+        """_Tree constructor __init__
+        Static k-d tree of entries (order, point, name) with the min corner and min order of each subtree
+
+        Keyword arguments:
+        entries         list of (order, point, name)
+        num_dims        number of coordinates of points
+        """
+        self.entries = entries
+        self._num_dims = num_dims
+        self._root = self._build(list(entries), 0)
+
+    def _build(self, entries, depth):
+        """Node [min corner, min order, entries of leaf or None, left node, right node]"""
+        low = [min(e[1][i] for e in entries) for i in range(self._num_dims)]
+        min_order = min(e[0] for e in entries)
+        if len(entries) <= _LEAF_SIZE:
+            return [low, min_order, entries, None, None]
+        dim = depth % self._num_dims
+        entries.sort(key=lambda e: e[1][dim])
+        median = len(entries) // 2
+        return [low, min_order, None,
+                self._build(entries[:median], depth+1), self._build(entries[median:], depth+1)]
+
+    def query(self, point, best, first):
+        """Input best (order, name) updated with entries of this tree (see DominanceIndex._query)"""
+        design = point[:-1]
+        stack = [self._root]
+        while len(stack) > 0:
+            low, min_order, entries, left, right = stack.pop()
+            if min_order >= best[0]: continue
+            if not all(map(le, low, point)): continue
+            if entries is None:
+                stack.append(right)
+                stack.append(left)
+                continue
+            for order, p, name in entries:
+                if order < best[0] and all(map(le, p, point)) and p[:-1] != design:
+                    best = (order, name)
+                    if not first: return best
+        return best
@@ -2,11 +2,20 @@ import math
 import os
 import random
 import json
+import hashlib
+import pickle
+import time
 import src.components.defaults as component_defaults
 import src.data.mysql.sizing as database_sizing
 import src.data.mysql.components as database_components
+import src.data.sqlite.sizing_results as store_sizing_results
+import src.utils.parallel as parallel
+from src.reports import StreamingMetrics
 import datetime
 from itertools import product
+from concurrent.futures import wait, FIRST_COMPLETED
+from .dominance_index import DominanceIndex
+from .bounds import EnergyBounds
 
 """ dictionary keyed by database component_type parameterName = python class name
 with values from component_spec_meta parameterName"""
@@ -23,6 +32,9 @@ _MAX_MULTIPLIER = {
     component_defaults.DIESEL_GENERATOR:1.0,
     component_defaults.BATTERY:10.0
 }
+_SEED = 0 # every design is simulated from the same seed, whatever the order or process
+_CHECKPOINT_VERSION = 1
+_RESULT_VALUES = ["deficit_percentage", "excess_percentage", "unused_percentage", "time_used_ratio", "metrics_summary_stats", "complete"]
 
 class Design(dict):
 
@@ -39,18 +51,11 @@ class Design(dict):
             if design[der_type] < self[der_type]:
                 flag = True
         return flag
-    
-    def is_dominated(self, results):
-        """Checks if the design is dominated by any of the input results"""
-        for r in results.values():
-            if r.dominates_design(self):
-                return True
-        return False
 
 
 class Result(object):
 
-    def __init__(self, sizing, design, deficit_percentage, excess_percentage, unused_percentage, time_used_ratio, metrics_summary_stats, parent):
+    def __init__(self, sizing, design, deficit_percentage, excess_percentage, unused_percentage, time_used_ratio, metrics_summary_stats, parent, complete=True):
         self.sizing = sizing
         self.design = design
         self.deficit_percentage = deficit_percentage
@@ -59,6 +64,7 @@ class Result(object):
         self.time_used_ratio = time_used_ratio
         self.metrics_summary_stats = metrics_summary_stats
         self.parent = parent
+        self.complete = complete # False if the simulation stopped at the first deficit or ran on a screening horizon
         self.dominated_by = None
 
     def get_name(self):
@@ -74,19 +80,6 @@ class Result(object):
         if not self.design.may_be_dominated_by(result.design):
             return False
         return result.deficit_percentage <= self.deficit_percentage
-    
-    def dominates_design(self, design):
-        """Checks if the result dominates the input design"""
-        return design.may_be_dominated_by(self.design) and self.deficit_percentage == 0.0
-
-    def set_dominated_by(self, results):
-        """Sets the result that dominates the current result from the input results"""
-        results_not_self = { k:v for k,v in results.items() }
-        if self.get_name() in results_not_self: results_not_self.pop(self.get_name())
-        for v in results_not_self.values():
-            if self.is_dominated_by(v):
-                self.dominated_by = v
-                return
 
     def generate_alternative_design(self, down_flag, der_type, step_size):
         """Generates an alternative design 
@@ -117,43 +110,88 @@ class Result(object):
     
     def to_database(self, id):
         """Writes the result to the database"""
-        record_id = database_sizing.grid_design_add(
-            id=id,
-            name=self.get_name(),
-            deficit_percentage=self.deficit_percentage,
-            excess_percentage=self.excess_percentage,
-            dominated_by=self.dominated_by.get_name() if self.dominated_by is not None else "",
-            parent=self.parent.get_name() if self.parent is not None else "none",
-            metrics_summary_stats = json.dumps(self.metrics_summary_stats)
-        )
+        database_sizing.grid_designs_add(id, [self.to_database_record()])
+
+    def to_database_record(self):
+        """Returns the sizing grid, components and component spec data of the result (see database_sizing.grid_designs_add)"""
+        components = []
         for der_type in self.sizing.der_types:
-            component_type_id = database_components.types_id_get(der_type)
-            component_id = database_sizing.grid_component_add(
-                id = record_id,
-                component_type_id=component_type_id,
-                unused_percentage = self.unused_percentage[der_type],
-                time_steps_percentage = self.time_used_ratio[der_type],
-            )
-            for i in range(0, len(_COMPONENT_SPEC_BY_TYPE_INCLUDED_IN_SIZING[der_type])):
-                component_spec_meta_parameter_name = _COMPONENT_SPEC_BY_TYPE_INCLUDED_IN_SIZING[der_type][i]
+            specs = dict()
+            for component_spec_meta_parameter_name in _COMPONENT_SPEC_BY_TYPE_INCLUDED_IN_SIZING[der_type]:
                 multiplier = _MULTIPLIER[component_spec_meta_parameter_name] if component_spec_meta_parameter_name in _MULTIPLIER else 1.0
-                database_sizing.grid_component_spec_data_add(
-                    sizing_grid_component_id=component_id,
-                    component_spec_meta_parameter_name=component_spec_meta_parameter_name,
-                    value = self.design[der_type] * multiplier,
-                )
+                specs[component_spec_meta_parameter_name] = self.design[der_type] * multiplier
+            components.append({
+                "componentTypeId":database_components.types_id_get(der_type),
+                "unusedPercentage":self.unused_percentage[der_type],
+                "timeStepsPercentage":self.time_used_ratio[der_type],
+                "specs":specs,
+            })
+        return {
+            "name":self.get_name(),
+            "deficitPercentage":self.deficit_percentage,
+            "excessPercentage":self.excess_percentage,
+            "dominatedBy":self.dominated_by.get_name() if self.dominated_by is not None else "",
+            "parent":self.parent.get_name() if self.parent is not None else "none",
+            "metricsSummaryStats":json.dumps(self.metrics_summary_stats),
+            "components":components,
+        }
 
 class Sizing(object):
 
-    def __init__(self, core_sim, num_levels):
+    def __init__(self, core_sim, num_levels, batch_size=None, num_workers=None, cache_dir=None, stop_on_deficit=False,
+                 checkpoint_path=None, checkpoint_interval=600, screening_days=None,
+                 coarse_hours=None, energy_bounds=False):
+        """Sizing constructor __init__
+
+        Keyword arguments:
+        core_sim        CoreSimulation of the grid to size
+        num_levels      number of levels (ratings) per DER type
+        batch_size      max number of designs simulated in lockstep (None to simulate one at a time)
+        num_workers     number of worker processes for the exact search (None for none, 0 for all available cpus)
+        cache_dir       directory of results stored across runs (None to simulate every design of a run)
+        stop_on_deficit stop simulating a design at its first deficit where only feasibility is needed
+                        (exact, frontier and linear searches, full results are simulated later for designs kept,
+                        designs that stopped at their first deficit are not in the results written)
+        checkpoint_path     file of results simulated so far, to resume an interrupted run (None for no checkpoints)
+        checkpoint_interval min number of seconds between checkpoint writes
+        screening_days      number of representative days to search designs on, before the designs not dominated
+                            are verified on all timesteps (None to search on all timesteps, only verified designs
+                            are in the results written, see _screen)
+        coarse_hours        duration of aggregated timesteps to search designs on, before the designs not dominated
+                            are verified at the resolution of the powerload (None to search at that resolution,
+                            only verified designs are in the results written, see _screen)
+                            Screening does not cut the number of timesteps simulated by an order of magnitude,
+                            it may not cut it at all: with the designs near the boundary verified, the frontier
+                            search of a 40-day half-hourly powerload with 6 levels simulated 542k timesteps with
+                            2-hour timesteps and 557k with 12 representative days, against 405k without screening
+        energy_bounds       skip designs that energy balances over all timesteps prove to have a deficit
+                            (exact, frontier and linear searches, skipped designs are not in the results)
+        """
         self.core_sim = core_sim
         self.num_levels = num_levels
+        self.batch_size = batch_size
+        self.num_workers = 1 if num_workers is None else parallel.get_num_workers(num_workers)
+        self.cache_dir = cache_dir
+        self.stop_on_deficit = stop_on_deficit
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.screening_days = screening_days
+        self.coarse_hours = coarse_hours
+        self.energy_bounds = energy_bounds
         self.levels = None
         self.info = { "min":{}, "max":{}, "decimals":{}}
         self.der_types = []
         self.peak_load = None
         self.energy_resources = None
         self.results = dict() # use as ordered set with None values
+        self._batch_results = dict() # results simulated in a batch ahead of use
+        self._signature = None
+        self._indexes = dict() # id of results dictionary --> (results, DominanceIndex)
+        self._phase = None
+        self._checkpoint_values = dict() # store key --> values of result simulated by this run or the one resumed
+        self._checkpoint_key = None
+        self._checkpoint_time = time.time()
+        self._bounds = None
         self._initialize()
 
     def closest_level(self, value, resource_type):
@@ -162,8 +200,10 @@ class Sizing(object):
 
     def _initialize(self):
         """Initializes the sizing object"""                
-        random.seed(0)
+        self.core_sim.seed(_SEED)
         self.peak_load, self.energy_resources = self.core_sim.der_sizing_initialize()
+        self._signature = self.core_sim.signature()
+        self._checkpoint_key = [_SEED, self._signature]
         self.energy_resources = { k:v for k,v in self.energy_resources.items() }
         for der_type, resource in self.energy_resources.items():
             if der_type == "Battery":
@@ -175,6 +215,9 @@ class Sizing(object):
             self.info["min"][der_type] = 0
             self.info["max"][der_type] = self.peak_load * _MAX_MULTIPLIER[der_type]
             self.info["decimals"][der_type] = 0
+        if self.energy_bounds:
+            profiles = { g.__class__.__name__:p for g, p in self.core_sim.renewable_profiles().items() }
+            self._bounds = EnergyBounds(self.core_sim.timesteps, profiles, self.energy_resources)
 
     def _generate_levels(self, num_levels):
         """Generates levels for each DER type"""
@@ -186,11 +229,186 @@ class Sizing(object):
                 round_up=i==num_levels-1
             ) for i in range(0,num_levels) ]
 
-    def _simulate(self, design, parent):
-        """Simulates the input design and returns the result"""
-        random.seed(0)
+    def _simulate(self, design, parent, stop_on_deficit=False):
+        """Simulates the input design and returns the result
+        (incomplete if stop_on_deficit and the design has a deficit, see _complete)"""
+        if design.get_name() in self._batch_results:
+            result = self._batch_results.pop(design.get_name())
+            result.parent = parent
+            return result
+        self.core_sim.seed(_SEED) # also when stored, so the random state after this call is the same
+        stored = self._stored_result(design, parent)
+        if stored is not None: return stored
         self.core_sim.der_sizing_load_design(self.energy_resources, design)
-        metrics = self.core_sim.run()
+        metrics = self.core_sim.run(streaming=True, stop=StreamingMetrics.has_deficit if stop_on_deficit else None)
+        result = self._result(design, metrics, parent)
+        result.complete = metrics.is_complete()
+        self._store_results([result])
+        return result
+
+    def _complete(self, result):
+        """Simulates the full horizon of the input result if it stopped at its first deficit"""
+        if result.complete: return result
+        full_result = self._simulate(result.design, result.parent)
+        for k in _RESULT_VALUES: setattr(result, k, getattr(full_result, k))
+        return result
+
+    def _screen(self, search):
+        """Runs the input search on a screening horizon (representative days and/or aggregated timesteps),
+        then verifies the results near the boundary of designs without deficit on all timesteps (see _verify)
+        A deficit on the screening horizon is not conservative (aggregated timesteps delay energy management
+        and diesel start decisions and average battery charge and discharge, representative days leave days out),
+        so it only prunes the search: designs with a deficit next to designs without deficit are verified too,
+        and so are designs one level down from every verified design without deficit.
+        Results that are not verified keep values from the screening horizon and are not written (see _written_results)"""
+        if self.screening_days is not None: self.core_sim.set_representative_days(self.screening_days)
+        if self.coarse_hours is not None: self.core_sim.set_resolution(self.coarse_hours)
+        self._signature = self.core_sim.signature()
+        try:
+            search()
+        finally:
+            self.core_sim.set_resolution(None)
+            self.core_sim.set_representative_days(None)
+            self._signature = self.core_sim.signature()
+            self._batch_results = dict()
+        for result in self.results.values(): result.complete = False
+        self._verify()
+
+    def _verify(self):
+        """Simulates all timesteps of results without deficit that are not dominated,
+        until no such result is left with values from the screening horizon (dominance is set again each time);
+        designs one level up from results found to have a deficit are simulated on all timesteps too,
+        unless dominated by a verified result without deficit.
+        A deficit on the screening horizon does not prove one on all timesteps, so results with a deficit
+        one level down from a result without deficit, and designs one level down from verified results
+        without deficit, are simulated on all timesteps too"""
+        self._phase = "verification"
+        failed = []
+        expanded = set() # names of verified results whose designs one level down are verified
+        while True:
+            self._indexes = dict()
+            for result in self.results.values(): result.dominated_by = None
+            for result in list(self.results.values()): self._set_dominated_by(result, self.results)
+            unverified = [result for result in self.results.values() if not result.complete
+                          and result.deficit_percentage == 0.0 and not result.is_dominated()]
+            borders = [result for result in self.results.values() if not result.complete
+                       and result.deficit_percentage > 0.0 and self._borders_feasible(result)]
+            verified = { k:v for k,v in self.results.items() if v.complete and v.deficit_percentage == 0.0 }
+            new_designs = dict() # name --> (design, parent) of designs not in the results
+            repairs = set()
+            for result in failed:
+                if not all(result.design[t] in self.levels[t] for t in self.der_types): continue
+                for der_type in self.der_types:
+                    design = result.generate_alternative_design(False, der_type, 1)
+                    if design is None or design.get_name() in self.results or design.get_name() in new_designs: continue
+                    if self._dominance_index(verified).dominates_design(design): continue
+                    new_designs[design.get_name()] = (design, result)
+                    repairs.add(design.get_name())
+            for name, result in verified.items():
+                if name in expanded or not all(result.design[t] in self.levels[t] for t in self.der_types): continue
+                expanded.add(name)
+                for der_type in self.der_types:
+                    design = result.generate_alternative_design(True, der_type, 1)
+                    if design is None or design.get_name() in new_designs: continue
+                    child = self.results.get(design.get_name())
+                    if child is None: new_designs[design.get_name()] = (design, result)
+                    elif not child.complete and child not in unverified and child not in borders: borders.append(child)
+            existing = unverified + borders
+            designs = [result.design for result in existing] + [design for design, _ in new_designs.values()]
+            if len(designs) == 0: break
+            if self.batch_size is None: full_results = [self._simulate(design, None) for design in designs]
+            else: full_results = self._simulate_batch(designs)
+            for result, full_result in zip(existing, full_results):
+                for k in _RESULT_VALUES: setattr(result, k, getattr(full_result, k))
+            new_results = full_results[len(existing):]
+            for (_, parent), result in zip(new_designs.values(), new_results):
+                result.parent = parent
+                self.results[result.get_name()] = result
+            failed = [result for result in unverified + [r for r in new_results if r.get_name() in repairs]
+                      if result.deficit_percentage > 0.0]
+
+    def _borders_feasible(self, result):
+        """Checks if a design one level up from the input result for any DER type has no deficit
+        (a result without deficit, or dominated by one)"""
+        if not all(result.design[t] in self.levels[t] for t in self.der_types): return False
+        for der_type in self.der_types:
+            design = result.generate_alternative_design(False, der_type, 1)
+            if design is None: continue
+            parent = self.results.get(design.get_name())
+            if parent is not None and parent.deficit_percentage == 0.0: return True
+            if self._dominance_index(self.results).dominates_design(design): return True
+        return False
+
+    def _simulate_batch(self, designs, parent=None):
+        """Simulates the input designs in batches of at most batch_size and returns the results in the same order"""
+        if len(designs) > 0: self.core_sim.seed(_SEED)
+        stored = { design.get_name():self._stored_result(design, parent) for design in designs }
+        designs_to_simulate = [design for design in designs if stored[design.get_name()] is None]
+        results = dict()
+        for i in range(0, len(designs_to_simulate), self.batch_size):
+            self.core_sim.seed(_SEED)
+            batch = designs_to_simulate[i:i+self.batch_size]
+            metrics = self.core_sim.der_sizing_run_batch(self.energy_resources, batch)
+            batch_results = [self._result(design, m, parent) for design, m in zip(batch, metrics)]
+            self._store_results(batch_results)
+            results.update({ result.get_name():result for result in batch_results })
+        return [stored[design.get_name()] or results[design.get_name()] for design in designs]
+
+    def _store_key(self, design):
+        """Returns the key of the input design in the results stored across runs"""
+        return hashlib.sha256(json.dumps([_SEED, self._signature, design], sort_keys=True).encode()).hexdigest()
+
+    def _stored_result(self, design, parent):
+        """Returns the result of the input design checkpointed or stored by a previous run, or None"""
+        key = self._store_key(design)
+        values = self._checkpoint_values.get(key)
+        if values is None and self.cache_dir is not None:
+            values = store_sizing_results.get(self.cache_dir, key)
+        if values is None: return None
+        return Result(sizing=self, design=design, parent=parent, **values)
+
+    def _store_results(self, results):
+        """Stores the input results for future runs"""
+        self._checkpoint(results)
+        if self.cache_dir is None: return
+        store_sizing_results.put(self.cache_dir, {
+            self._store_key(result.design):{ k:getattr(result, k) for k in _RESULT_VALUES }
+            for result in results if result.complete
+        })
+
+    def _checkpoint(self, results):
+        """Adds the input results to the checkpoint, written at most every checkpoint_interval seconds"""
+        if self.checkpoint_path is None: return
+        for result in results:
+            if result.complete: self._checkpoint_values[self._store_key(result.design)] = { k:getattr(result, k) for k in _RESULT_VALUES }
+        if time.time() - self._checkpoint_time >= self.checkpoint_interval: self._write_checkpoint()
+
+    def _write_checkpoint(self):
+        """Writes the results simulated so far and the current phase of the run to the checkpoint file"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint_path)), exist_ok=True)
+        checkpoint = {
+            "version":_CHECKPOINT_VERSION,
+            "key":self._checkpoint_key,
+            "phase":self._phase,
+            "values":self._checkpoint_values,
+        }
+        with open(self.checkpoint_path+".tmp", "wb") as f:
+            pickle.dump(checkpoint, f)
+        os.replace(self.checkpoint_path+".tmp", self.checkpoint_path)
+        self._checkpoint_time = time.time()
+
+    def _resume(self):
+        """Loads the checkpoint of an interrupted run (if any), its results are used instead of simulating their designs"""
+        if self.checkpoint_path is None or not os.path.exists(self.checkpoint_path): return
+        with open(self.checkpoint_path, "rb") as f:
+            checkpoint = pickle.load(f)
+        if checkpoint["version"] != _CHECKPOINT_VERSION or checkpoint["key"] != self._checkpoint_key:
+            raise ValueError("Checkpoint "+self.checkpoint_path+" is not from a run of the same sizing problem")
+        self._checkpoint_values = checkpoint["values"]
+        print("resuming "+str(checkpoint["phase"])+" with "+str(len(self._checkpoint_values))+" results", flush=True)
+
+    def _result(self, design, metrics, parent):
+        """Returns the result of the input design from simulation metrics"""
         result = Result(
             sizing = self,
             design = design,
@@ -203,26 +421,53 @@ class Sizing(object):
         )
         return result
 
-    def _analyze_design(self, design, parent, results):
-        """Analyzes the input design and returns the result if it is not dominated by any existing results"""
+    def _analyze_design(self, design, parent, results, stop_on_deficit=False):
+        """Analyzes the input design and returns the result if it is not dominated by any existing results
+        (possibly incomplete if stop_on_deficit, see _simulate)"""
         if design is None: return None
-        if results is not None and design.is_dominated(results): return None
+        if results is not None and self._dominance_index(results).dominates_design(design): return None
         if design.get_name() in self.results:
             result = self.results[design.get_name()]
+            if not stop_on_deficit: self._complete(result)
         else:
-            result = self._simulate(design, parent)
+            result = self._simulate(design, parent, stop_on_deficit)
             self.results[result.get_name()] = result
-            if results is not None: result.set_dominated_by(results)
+            if results is not None: self._set_dominated_by(result, results)
         if results is not None and result.is_dominated(): return None
         return result
 
     def _run_designs(self, designs, debug=False):
         """Runs the input designs""" 
         if debug: designs = [Design({'SolarPhotovoltaicPanel': 0, 'DieselGenerator': 70, 'Battery': 385})]
+        if self.batch_size is not None: # simulate all designs up front, dominated designs are still skipped below
+            names = set(self.results.keys())
+            batch = []
+            for design in designs:
+                if design.get_name() in names: continue
+                names.add(design.get_name())
+                batch.append(design)
+            for result in self._simulate_batch(batch):
+                self._batch_results[result.get_name()] = result
         for design in designs:            
             self._analyze_design(design, None, self.results)
+        self._batch_results = dict()
         for result in list(self.results.values()):
-            result.set_dominated_by(self.results)
+            self._set_dominated_by(result, self.results)
+
+    def _dominance_index(self, results):
+        """Returns the DominanceIndex of the input results dictionary, synced with results appended since last use
+        (indexes are kept for self.results and the last other dictionary)"""
+        if id(results) not in self._indexes or self._indexes[id(results)][0] is not results:
+            self._indexes = { k:v for k,v in self._indexes.items() if v[0] is self.results }
+            self._indexes[id(results)] = (results, DominanceIndex(self.der_types))
+        index = self._indexes[id(results)][1]
+        index.sync(results)
+        return index
+
+    def _set_dominated_by(self, result, results):
+        """Sets the first result of the input results that dominates the input result"""
+        name = self._dominance_index(results).first_dominating(result)
+        if name is not None: result.dominated_by = results[name]
 
     def _filter_non_dominated(self, deficit_percentage=1.0):
         """Filters non-dominated results by deficit percentage"""
@@ -231,31 +476,148 @@ class Sizing(object):
             if not v.is_dominated() and v.deficit_percentage <= deficit_percentage: non_dominated[k] = v
         return non_dominated
 
-    def _run_exact(self, num_levels=None):
+    def _run_exact(self, num_levels=None, stop_on_deficit=None, energy_bounds=None):
         """exact algorithm performs an exhaustive search (grows exponentially), 
         but prunes branches when designs are dominated or when deficits are encountered"""
         if num_levels is None: num_levels = self.num_levels
+        if stop_on_deficit is None: stop_on_deficit = self.stop_on_deficit
+        if energy_bounds is None: energy_bounds = self.energy_bounds
         self._generate_levels(num_levels)
         cutoff_set = set()
         combinations = sorted(product(range(num_levels), repeat=len(self.der_types)), reverse=True)
+        if self.num_workers > 1:
+            self._run_exact_parallel(combinations, cutoff_set, num_levels, stop_on_deficit, energy_bounds)
+        elif self.batch_size is not None: self._run_exact_batch(combinations, cutoff_set, energy_bounds)
+        else:
+            for combination in combinations:
+                if self._is_cut_off(combination, cutoff_set, energy_bounds):
+                    cutoff_set.add(combination)
+                    continue
+                result = self._simulate(self._combination_design(combination), None, stop_on_deficit)
+                self.results[result.get_name()] = result
+                if result.deficit_percentage > 0.0: cutoff_set.add(combination)
+        for result in list(self.results.values()):
+            if not result.is_dominated(): self._set_dominated_by(result, self.results)
+
+    def _run_exact_batch(self, combinations, cutoff_set, energy_bounds=False):
+        """exact algorithm with designs simulated in batches:
+        all parents of a combination have a level sum one larger,
+        so combinations with equal level sums (a wavefront) are independent"""
+        wavefronts = dict()
         for combination in combinations:
-            design = Design({self.der_types[i]:self.levels[self.der_types[i]][combination[i]] \
-                             for i in range(len(self.der_types))})
-            flag = True
-            for i in range(len(self.der_types)):
-                parent = list(combination)
-                parent[i] = parent[i] + 1
-                if tuple(parent) in cutoff_set:
-                    flag = False
-                    break
-            if not flag:
-                cutoff_set.add(combination)
-                continue
-            result = self._simulate(design, None)
-            self.results[result.get_name()] = result
-            if result.deficit_percentage > 0.0: cutoff_set.add(combination)
+            wavefronts.setdefault(sum(combination), []).append(combination)
+        results = dict()
+        for level_sum in sorted(wavefronts.keys(), reverse=True):
+            wavefront = []
+            for combination in wavefronts[level_sum]:
+                if self._is_cut_off(combination, cutoff_set, energy_bounds): cutoff_set.add(combination)
+                else: wavefront.append(combination)
+            designs = [self._combination_design(combination) for combination in wavefront]
+            for combination, result in zip(wavefront, self._simulate_batch(designs)):
+                results[combination] = result
+                if result.deficit_percentage > 0.0: cutoff_set.add(combination)
+        self._add_exact_results(combinations, results)
+
+    def _run_exact_parallel(self, combinations, cutoff_set, num_levels, stop_on_deficit=False, energy_bounds=False):
+        """exact algorithm with designs simulated by a pool of worker processes:
+        a combination is submitted as soon as all of its parents are resolved (simulated or cut off),
+        so pruning uses each result as it arrives"""
+        num_parents = { c:sum(1 for i in c if i+1 < num_levels) for c in combinations }
+        ready = [c for c in combinations if num_parents[c] == 0]
+        chunk_size = 1 if self.batch_size is None else self.batch_size
+        results = dict()
+        futures = dict()
+
+        def resolve(combination):
+            for i in range(len(combination)):
+                if combination[i] == 0: continue
+                child = combination[:i] + (combination[i]-1,) + combination[i+1:]
+                num_parents[child] -= 1
+                if num_parents[child] == 0: ready.append(child)
+
+        with parallel.pool(self.num_workers, self) as executor:
+            while True:
+                submit = []
+                while len(ready) > 0:
+                    combination = ready.pop()
+                    if self._is_cut_off(combination, cutoff_set, energy_bounds):
+                        cutoff_set.add(combination)
+                        resolve(combination)
+                    else: submit.append(combination)
+                submit = sorted(submit, reverse=True)
+                for i in range(0, len(submit), chunk_size):
+                    chunk = submit[i:i+chunk_size]
+                    designs = [self._combination_design(combination) for combination in chunk]
+                    futures[executor.submit(_simulate_designs, designs, stop_on_deficit)] = chunk
+                if len(futures) == 0: break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = futures.pop(future)
+                    for combination, values in zip(chunk, future.result()):
+                        results[combination] = Result(
+                            sizing=self, design=self._combination_design(combination), parent=None, **values
+                        )
+                        if results[combination].deficit_percentage > 0.0: cutoff_set.add(combination)
+                        resolve(combination)
+                    self._checkpoint([results[combination] for combination in chunk])
+        self.core_sim.seed(_SEED)
+        self._add_exact_results(combinations, results)
+
+    def _add_exact_results(self, combinations, results):
+        """Adds the input results keyed by combination in the same order as the serial exact algorithm"""
+        for combination in combinations:
+            if combination in results: self.results[results[combination].get_name()] = results[combination]
+
+    def _combination_design(self, combination):
+        """Returns the design for the input combination of level indices"""
+        return Design({self.der_types[i]:self.levels[self.der_types[i]][combination[i]] \
+                       for i in range(len(self.der_types))})
+
+    def _is_cut_off(self, combination, cutoff_set, energy_bounds=False):
+        """Checks if any parent of the input combination (one level higher for one DER type) is cut off,
+        or if energy_bounds and energy bounds prove its design has a deficit"""
+        for i in range(len(self.der_types)):
+            parent = list(combination)
+            parent[i] = parent[i] + 1
+            if tuple(parent) in cutoff_set: return True
+        return energy_bounds and self._has_bounded_deficit(self._combination_design(combination))
+
+    def _has_bounded_deficit(self, design):
+        """Checks if energy bounds prove the input design has a deficit (never without energy_bounds)"""
+        return self._bounds is not None and self._bounds.has_deficit(design)
+
+    def _run_frontier(self):
+        """frontier algorithm traces the boundary of designs without deficit (deficit does not increase with any rating):
+        for each combination of levels of all DER types but the last (children first), searches down from the lowest
+        level of the last DER type without deficit of its children, so only designs near the boundary are simulated"""
+        self._generate_levels(self.num_levels)
+        num_levels = self.num_levels
+        lowest = dict() # levels of all DER types but the last --> lowest level of the last without deficit (or num_levels)
+        for prefix in product(range(num_levels), repeat=len(self.der_types)-1):
+            children = [prefix[:i] + (prefix[i]-1,) + prefix[i+1:] for i in range(len(prefix)) if prefix[i] > 0]
+            lowest[prefix] = self._search_frontier(prefix, min([lowest[child] for child in children], default=num_levels))
         for result in list(self.results.values()):
-            if not result.is_dominated(): result.set_dominated_by(self.results)
+            if not result.is_dominated(): self._set_dominated_by(result, self.results)
+
+    def _search_frontier(self, prefix, high):
+        """Returns the lowest level of the last DER type without deficit for the input levels of the other DER types
+        (or the number of levels), which is at most the input high level (no deficit or the number of levels):
+        galloping search down from the high level then binary search
+        (with stop_on_deficit, designs found to have a deficit stay incomplete and are not written, see _written_results)"""
+        def has_deficit(level):
+            design = self._combination_design(prefix + (level,))
+            if self._has_bounded_deficit(design): return True
+            return self._analyze_design(design, None, None, self.stop_on_deficit).deficit_percentage > 0.0
+        if high == 0 or has_deficit(high-1): return high
+        feasible, step = high-1, 1
+        while feasible-step >= 0 and not has_deficit(feasible-step):
+            feasible, step = feasible-step, step*2
+        infeasible = feasible-step if feasible-step >= 0 else -1
+        while feasible-infeasible > 1:
+            level = (feasible+infeasible) // 2
+            if has_deficit(level): infeasible = level
+            else: feasible = level
+        return feasible
 
     def _map_to_finer_grid(self):
         """map results to closest values in levels"""
@@ -269,55 +631,103 @@ class Sizing(object):
         then maps the solutions identified to a finer grid specified by the input number of levels,
         performs a binary search for designs followed by a linear search to refine those designs"""
         print("starting exact search",datetime.datetime.now().time().strftime("%H:%M:%S"), flush=True)
-        self._run_exact(num_levels=min(self.num_levels, 6))
+        self._phase = "heuristic exact search"
+        # binary search compares deficits, starting from every design of the exact search
+        self._run_exact(num_levels=min(self.num_levels, 6), stop_on_deficit=False, energy_bounds=False)
         self._generate_levels(self.num_levels)
         self._map_to_finer_grid()
         print("starting binary search",datetime.datetime.now().time().strftime("%H:%M:%S"), flush=True)
+        self._phase = "heuristic binary search"
+        # each chain shuffles DER types with its own seed, so the order does not depend on the chains run before
+        chains = [(result.get_name(), randomize_order(self.der_types, i, random.Random(result.get_name()+"-"+str(i))))
+                  for result in self.results.values() for i in range(0,len(self.der_types))]
+        if self.num_workers > 1: self._run_chains(_binary_search_chain, chains)
+        else:
+            for name, der_types in chains: self._binary_search(self.results[name], der_types)
         for result in list(self.results.values()):
-            for i in range(0,len(self.der_types)):
-                down_flag = result.deficit_percentage == 0.0
-                current_result = result
-                for der_type in randomize_order(self.der_types, i):
-                    step_size = int(2 ** math.floor(math.log2(len(self.levels[der_type]))))
-                    while (step_size >= 1):
-                        new_result = current_result
-                        while (new_result is not None):
-                            current_result = new_result
-                            design = current_result.generate_alternative_design(down_flag, der_type, int(step_size))
-                            new_result = self._analyze_design(design, current_result, None)
-                            if new_result is not None: 
-                                self.results[new_result.get_name()] = new_result
-                                if new_result.deficit_percentage > current_result.deficit_percentage: break
-                            else:
-                                if (not down_flag) and (current_result.deficit_percentage == 0.0) : down_flag = True
-                        step_size = step_size / 2
-        for result in list(self.results.values()):
-            if not result.is_dominated(): result.set_dominated_by(self.results)
+            if not result.is_dominated(): self._set_dominated_by(result, self.results)
         print("finished binary search",datetime.datetime.now().time().strftime("%H:%M:%S"), flush=True)
         non_dominated = self._filter_non_dominated(deficit_percentage=0.0)
-        for result in list(non_dominated.values()):
-            current_result = result
-            for i in range(len(self.der_types)):
-                for der_type in self.der_types:
-                    while(True):
-                        design = current_result.generate_alternative_design(True, der_type, 1)
-                        new_result = self._analyze_design(design, current_result, non_dominated)
-                        if new_result is None: break
-                        self.results[new_result.get_name()] = new_result
-                        if new_result.deficit_percentage > 0.0: break
-                        current_result = new_result
+        self._phase = "heuristic linear search"
+        if self.num_workers > 1:
+            self._run_chains(_linear_search_chain, [(name,) for name in non_dominated], non_dominated)
+        else:
+            for result in list(non_dominated.values()):
+                self._linear_search(result, non_dominated)
         for result in list(self.results.values()):
-            if not result.is_dominated(): result.set_dominated_by(self.results)
+            if not result.is_dominated(): self._set_dominated_by(result, self.results)
         print("finished linear search",datetime.datetime.now().time().strftime("%H:%M:%S"), flush=True)
 
+    def _binary_search(self, result, der_types):
+        """Binary search from the input result, one DER type at a time in the input order"""
+        down_flag = result.deficit_percentage == 0.0
+        current_result = result
+        for der_type in der_types:
+            step_size = int(2 ** math.floor(math.log2(len(self.levels[der_type]))))
+            while (step_size >= 1):
+                new_result = current_result
+                while (new_result is not None):
+                    current_result = new_result
+                    design = current_result.generate_alternative_design(down_flag, der_type, int(step_size))
+                    new_result = self._analyze_design(design, current_result, None)
+                    if new_result is not None: 
+                        self.results[new_result.get_name()] = new_result
+                        if new_result.deficit_percentage > current_result.deficit_percentage: break
+                    else:
+                        if (not down_flag) and (current_result.deficit_percentage == 0.0) : down_flag = True
+                step_size = step_size / 2
+
+    def _linear_search(self, result, non_dominated):
+        """Linear search down from the input result for designs not dominated by the input results"""
+        current_result = result
+        for i in range(len(self.der_types)):
+            for der_type in self.der_types:
+                while(True):
+                    design = current_result.generate_alternative_design(True, der_type, 1)
+                    if design is not None and self._has_bounded_deficit(design): break
+                    new_result = self._analyze_design(design, current_result, non_dominated, self.stop_on_deficit)
+                    if new_result is None: break
+                    self.results[new_result.get_name()] = new_result
+                    if new_result.deficit_percentage > 0.0: break
+                    current_result = new_result
+
+    def _run_chains(self, task, chains, results=None):
+        """Runs the input search chains (arguments of the input task) in a pool of worker processes,
+        each starting from the current results, then adds the new results in the order of the chains,
+        as if the chains ran one after another (set dominated by the input results if not None)"""
+        with parallel.pool(self.num_workers, self) as executor:
+            futures = [executor.submit(task, *chain) for chain in chains]
+            chain_results = []
+            for future in futures:
+                chain_results.append(future.result())
+                self._checkpoint([Result(sizing=self, design=design, parent=None, **values)
+                                  for design, values, _ in chain_results[-1]])
+        for chain in chain_results:
+            for design, values, parent in chain:
+                if design.get_name() in self.results: continue
+                result = Result(sizing=self, design=design, parent=self.results.get(parent), **values)
+                self.results[result.get_name()] = result
+                if results is not None: self._set_dominated_by(result, results)
+
+    def _written_results(self):
+        """Returns the results written to csv and database: only complete results, simulated on all timesteps
+        (results that stopped at their first deficit are left out, results that were dominated by one of those
+        are set dominated by the first complete result that dominates them instead, if any)"""
+        written = { k:v for k,v in self.results.items() if v.complete }
+        for result in written.values():
+            if result.dominated_by is None or result.dominated_by.complete: continue
+            result.dominated_by = None
+            self._set_dominated_by(result, written)
+        return written
+
     def results_to_csv(self, results_dir=None, debug=False):
-        """Returns a csv string of the results.
+        """Returns a csv string of the results (complete results only, see _written_results).
         Writes results to a file if results_dir is not None"""
         results_csv = "name,"+",".join(self.der_types)+","+"deficit_percentage,excess_percentage,"
         for der_type in self.der_types:
             results_csv += "unused-"+der_type+",time-steps-in-use-%-"+der_type+","
         results_csv += "dominated_by,parent\n"
-        for result in self.results.values(): results_csv += result.to_csv()
+        for result in self._written_results().values(): results_csv += result.to_csv()
         if debug: print(results_csv, flush=True)
         if results_dir is not None: 
             with open(os.path.join(results_dir,"results.csv"), "w") as f:
@@ -325,24 +735,29 @@ class Sizing(object):
         return results_csv
     
     def results_to_database(self, id):
-        """Writes the results to the database"""
+        """Writes the results to the database (complete results only, see _written_results)"""
         database_sizing.grid_designs_remove(id)
-        for result in self.results.values():
-            result.to_database(id)
+        database_sizing.grid_designs_add(id, [result.to_database_record() for result in self._written_results().values()])
 
-    def run(self, algorithm, results_dir=None, database_id=None, debug=False):
-        """Runs the input algorithm and writes the results to a file or database"""
+    def run(self, algorithm, results_dir=None, database_id=None, debug=False, resume=False):
+        """Runs the input algorithm and writes the results to a file or database
+        (resuming from the checkpoint of an interrupted run if resume)"""
         print("running "+algorithm, flush=True)
+        self._phase = algorithm
+        if resume: self._resume()
         algorithm = str("_run_"+str(algorithm))
         if hasattr(self, algorithm) and callable(getattr(self, algorithm)):
             function_to_call = getattr(self, algorithm)  
-            function_to_call()
+            if self.screening_days is None and self.coarse_hours is None: function_to_call()
+            else: self._screen(function_to_call)
         else:
             print(algorithm+" not found or not callable", flush=True)
             exit()
+        if self.cache_dir is not None: store_sizing_results.trim(self.cache_dir)
         if results_dir is not None: self.results_to_csv(results_dir, debug)
         if database_id is not None:
             self.results_to_database(database_id)
+        if self.checkpoint_path is not None and os.path.exists(self.checkpoint_path): os.remove(self.checkpoint_path)
 
 def update_results(results, result):
     """Updates the results with the input result"""
@@ -352,11 +767,50 @@ def update_results(results, result):
             del results[k]
     results[result.get_name()] = result
 
-def randomize_order(list_to_randomize, index_to_place_first):
-    """Randomizes the order of the input list"""
+def _worker_sizing():
+    """Returns the Sizing object of a worker process pool (only the pool owner writes checkpoints)"""
+    sizing = parallel.get_state()
+    sizing.checkpoint_path = None
+    return sizing
+
+def _simulate_designs(designs, stop_on_deficit=False):
+    """Simulates the input designs with the Sizing object of a worker process pool,
+    returns the values of each result (without references to the Sizing object) in the same order"""
+    sizing = _worker_sizing()
+    if sizing.batch_size is None: results = [sizing._simulate(design, None, stop_on_deficit) for design in designs]
+    else: results = sizing._simulate_batch(designs)
+    return [{ k:getattr(result, k) for k in _RESULT_VALUES } for result in results]
+
+def _binary_search_chain(name, der_types):
+    """Runs a binary search from the named result with the Sizing object of a worker process pool"""
+    sizing = _worker_sizing()
+    return _search_chain(sizing, lambda: sizing._binary_search(sizing.results[name], der_types))
+
+def _linear_search_chain(name):
+    """Runs a linear search from the named result with the Sizing object of a worker process pool"""
+    sizing = _worker_sizing()
+    non_dominated = sizing._filter_non_dominated(deficit_percentage=0.0)
+    return _search_chain(sizing, lambda: sizing._linear_search(sizing.results[name], non_dominated))
+
+def _search_chain(sizing, search):
+    """Runs the input search on a copy of the results at the time the worker was forked
+    (so the outcome does not depend on other chains run by the same worker),
+    returns the design, values and parent name of each new result in order"""
+    results = sizing.results
+    sizing.results = dict(results)
+    try:
+        search()
+        new_results = [result for name, result in sizing.results.items() if name not in results]
+    finally:
+        sizing.results = results
+    return [(result.design, { k:getattr(result, k) for k in _RESULT_VALUES },
+             result.parent.get_name() if result.parent is not None else None) for result in new_results]
+
+def randomize_order(list_to_randomize, index_to_place_first, rng=random):
+    """Randomizes the order of the input list (with the input random number generator)"""
     randomized = [i for i in list_to_randomize]
     randomized.pop(index_to_place_first)
-    random.shuffle(randomized)
+    rng.shuffle(randomized)
     randomized.insert(0, list_to_randomize[index_to_place_first])
     return randomized
 
@@ -1,52 +1,85 @@
 import src.data.mysql.weather as database_weather
 import src.data.mysql.locations as database_locations
-import pandas
+import src.data.npy.weather as npy_weather
+import numpy
+from src.components import RenewableProfileCache
 from datetime import timedelta
 
 _YEAR_PLACEHOLDER = 1904 # must be a leap year or February 29th records will trigger errors
+_SLOTS_PER_DAY = 48 # half-hourly records
+_NUM_SLOTS = 366 * _SLOTS_PER_DAY
+SAMPLE_METHODS = ["mean", "empirical", "normal"]
+_DAYS_BEFORE_MONTH = numpy.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30]) # leap year
 
 class WeatherSample(object):
 
-    def __init__(self, parent, dataframe_row):
+    def __init__(self, parent, values):
         """Weather sample constructor __init__
-        Do not store parent because it would cause memory issues"""
+        Do not store parent because it would cause memory issues
+
+        Keyword arguments:
+        parent      Weather object with location metadata
+        values      array of metric values ordered as database_weather.METRIC_COLS_SQL
+        """
         self.latitude = parent.latitude
         self.longitude = parent.longitude
         self.elevation = parent.elevation
         self.timezone = parent.timezone
-        if dataframe_row.shape[0] != 1:
-            raise Exception("WeatherSample error: dataframe does not have exactly 1 row")
-        self.temperature = dataframe_row["temperature"].values[0]
-        self.global_horizontal_irradiance = dataframe_row["ghi"].values[0]
-        self.diffuse_horizontal_irradiance = dataframe_row["dhi"].values[0]
-        self.direct_normal_irradiance = dataframe_row["dni"].values[0]
-        self.solar_zenith_angle = dataframe_row["solarZenithAngle"].values[0]
-        self.surface_albedo = dataframe_row["surfaceAlbedo"].values[0]
-        self.pressure = dataframe_row["pressure"].values[0]                    
-        self.wind_speed = dataframe_row["windSpeed"].values[0]
+        if len(values) != len(database_weather.METRIC_COLS_SQL) or numpy.isnan(values).all():
+            raise Exception("WeatherSample error: no weather data for sample")
+        metrics = dict(zip(database_weather.METRIC_COLS_SQL, values))
+        self.temperature = metrics["temperature"]
+        self.global_horizontal_irradiance = metrics["ghi"]
+        self.diffuse_horizontal_irradiance = metrics["dhi"]
+        self.direct_normal_irradiance = metrics["dni"]
+        self.solar_zenith_angle = metrics["solarZenithAngle"]
+        self.surface_albedo = metrics["surfaceAlbedo"]
+        self.pressure = metrics["pressure"]
+        self.wind_speed = metrics["windSpeed"]
 
 
 class Weather(object):
 
-    def __init__(self, location_id, sample_method="empirical"):
+    def __init__(self, location_id, sample_method="empirical", cache_dir=None, seed=None):
         """Weather constructor __init__
 
         Keyword arguments:
         location_id             ID of location to retrieve historical data
         sample_method           "mean", "empirical" or "normal"
+        cache_dir               directory of local weather cache (None to always read from database)
+        seed                    random number generator seed for "empirical" and "normal" realizations
         """
+        if sample_method not in SAMPLE_METHODS:
+            raise ValueError("sample method for Weather undefined: "+str(sample_method))
         self._location_id = location_id
+        self._cache_dir = cache_dir
         self._get_metadata()
         self._sample_method = sample_method
-        self._dataframe = self._initialize()
+        self._seed = numpy.random.SeedSequence(seed).entropy
+        self._stats = None
+        self._sums = None
+        self._counts = None
+        self._initialize()
         self._current_conditions = dict()
+        self._slot_ranges = dict()
         self._cached_samples = dict()
         self.current_sample = None
+        self.renewable_profiles = RenewableProfileCache()
+        self.realization = None
+        self._realization_year = None
+        self._realization_normal = None
+        self.set_realization(0)
 
     def __repr__(self):
         return (f'{self.__class__.__name__}('
            f'location_id={self._location_id!r},'
-           f'deterministic_flag={self._deterministic_flag!r},')
+           f'sample_method={self._sample_method!r},'
+           f'realization={self.realization!r})')
+
+    def signature(self):
+        """Return list of inputs that determine the weather samples"""
+        if self._sample_method == "mean": return [self._location_id, self._sample_method]
+        return [self._location_id, self._sample_method, self._seed, self.realization]
 
     def _get_metadata(self):
         """Retrieve metadata or location"""
@@ -57,17 +90,46 @@ class Weather(object):
         self.timezone = metadata["timezone"]
 
     def _initialize(self):
-        """Retrieve data for location and add datetime column for search efficiency"""
+        """Retrieve data for location and build dense arrays indexed by
+        (half-hour slot of year, yearOrStat, metric) for constant time lookups
+        Arrays are read from the local cache if it matches the database"""
+        if self._cache_dir is not None:
+            signature = database_weather.signature(self._location_id)
+            cached = npy_weather.read(self._cache_dir, self._location_id, signature,
+                                      database_weather.SIGNATURE_COLS_SQL, database_weather.METRIC_COLS_SQL)
+            if cached is not None:
+                self._stats, self._sums, self._counts = cached
+                return
         dataframe = database_weather.read(self._location_id)
         if dataframe.shape[0] == 0:
             raise Exception("Weather error: no data found for location "+str(self._location_id))
-        dataframe["year"] = _YEAR_PLACEHOLDER
-        dataframe["datetime"] = pandas.to_datetime(dataframe[["year", "month", "day", "hour", "minute"]])
-        return dataframe.drop("year", axis=1)
+        self._stats = sorted(dataframe["yearOrStat"].unique())
+        stat_index = { stat:i for i, stat in enumerate(self._stats) }
+        slots = _slot(
+            month=dataframe["month"].to_numpy(dtype=int),
+            day=dataframe["day"].to_numpy(dtype=int),
+            hour=dataframe["hour"].to_numpy(dtype=int),
+            minute=dataframe["minute"].to_numpy(dtype=int),
+        )
+        stats = dataframe["yearOrStat"].map(stat_index).to_numpy(dtype=int)
+        values = dataframe[database_weather.METRIC_COLS_SQL].to_numpy(dtype=float)
+        is_valid = ~numpy.isnan(values)
+        shape = (_NUM_SLOTS, len(self._stats), len(database_weather.METRIC_COLS_SQL))
+        self._sums = numpy.zeros(shape)
+        self._counts = numpy.zeros(shape, dtype=numpy.int32)
+        numpy.add.at(self._sums, (slots, stats), numpy.where(is_valid, values, 0.0))
+        numpy.add.at(self._counts, (slots, stats), is_valid)
+        if self._cache_dir is not None:
+            try:
+                npy_weather.write(self._cache_dir, self._location_id, signature,
+                                  database_weather.SIGNATURE_COLS_SQL, database_weather.METRIC_COLS_SQL,
+                                  [str(stat) for stat in self._stats], self._sums, self._counts)
+            except OSError:
+                pass # cache is optional
 
-    def _get_current_conditions(self, timeperiod):
-        """Return dataframe rows corresponding to input time period"""
-        if timeperiod in self._current_conditions: return self._current_conditions[timeperiod]
+    def _get_slot_range(self, timeperiod):
+        """Return first and last half-hour slots of year corresponding to input time period"""
+        if timeperiod in self._slot_ranges: return self._slot_ranges[timeperiod]
         start = timeperiod.start().replace(year=_YEAR_PLACEHOLDER, second=0, microsecond=0)
         end = timeperiod.end().replace(year=_YEAR_PLACEHOLDER, second=0, microsecond=0)
         while (start.month == 2 and start.day == 29) or (end.month == 2 and end.month == 29):
@@ -79,45 +141,103 @@ class Weather(object):
         if end.minute < 15: end = end.replace(minute=0)
         if end.minute >= 45: end = (end.replace(minute=0) + timedelta(hours=1)).replace(year=_YEAR_PLACEHOLDER)
         if end.minute != 0: end = end.replace(minute=30)
-        if start <= end: # check required because all years are the same _YEAR_PLACEHOLDER value
-            dataframe = self._dataframe.loc[
-                (self._dataframe["datetime"] >= start) &
-                (self._dataframe["datetime"] <= end)
-            ]
+        start_slot = int(_slot(start.month, start.day, start.hour, start.minute))
+        end_slot = int(_slot(end.month, end.day, end.hour, end.minute))
+        self._slot_ranges[timeperiod] = (start_slot, end_slot)
+        return start_slot, end_slot
+
+    def _get_slots(self, timeperiod):
+        """Return array of half-hour slots of year corresponding to input time period (in order, across the new year)"""
+        start_slot, end_slot = self._get_slot_range(timeperiod)
+        if start_slot <= end_slot: return numpy.arange(start_slot, end_slot+1)
+        return numpy.concatenate([numpy.arange(start_slot, _NUM_SLOTS), numpy.arange(0, end_slot+1)])
+
+    def _get_current_conditions(self, timeperiod):
+        """Return array (yearOrStat x metric) of mean values over slots corresponding to input time period"""
+        if timeperiod in self._current_conditions: return self._current_conditions[timeperiod]
+        start_slot, end_slot = self._get_slot_range(timeperiod)
+        if start_slot <= end_slot: # check required because all years are the same _YEAR_PLACEHOLDER value
+            sums = self._sums[start_slot:end_slot+1].sum(axis=0)
+            counts = self._counts[start_slot:end_slot+1].sum(axis=0)
         else:
-            dataframe = pandas.concat([
-                self._dataframe.loc[
-                    (self._dataframe["datetime"] >= start) &
-                    (self._dataframe["datetime"] < str(_YEAR_PLACEHOLDER+1)+"-01-01")
-                ],
-                self._dataframe.loc[
-                    (self._dataframe["datetime"] >= str(_YEAR_PLACEHOLDER)+"-01-01") &
-                    (self._dataframe["datetime"] <= end)
-                ]
-            ], axis=0)
-        current_conditions = dataframe.groupby(["yearOrStat"])[
-            database_weather.METRIC_COLS_SQL
-        ].agg("mean").reset_index() # if multiple datetimes exist (spacing > 30 mins), combine
+            sums = self._sums[start_slot:].sum(axis=0) + self._sums[:end_slot+1].sum(axis=0)
+            counts = self._counts[start_slot:].sum(axis=0) + self._counts[:end_slot+1].sum(axis=0)
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            current_conditions = sums / counts # if multiple datetimes exist (spacing > 30 mins), combine
         self._current_conditions[timeperiod] = current_conditions
         return current_conditions
 
+    def _stat_values(self, current_conditions, stat):
+        """Values of input summary statistic row (None if not available for location)"""
+        if stat not in self._stats: return None
+        return current_conditions[self._stats.index(stat)]
+
     def _method_mean(self, timeperiod):
         """Apply 'mean' method for generating weather sample"""
-        if timeperiod in self._cached_samples:
-            return self._cached_samples[timeperiod]
+        if "mean" not in self._stats:
+            raise Exception("Weather error: no mean records found for location "+str(self._location_id))
         current_conditions = self._get_current_conditions(timeperiod)
-        mean_row = current_conditions.loc[current_conditions["yearOrStat"] == "mean"]
-        current_sample = WeatherSample(self, mean_row)
-        self._cached_samples[timeperiod] = current_sample
-        return current_sample
-    
+        return WeatherSample(self, self._stat_values(current_conditions, "mean"))
+
+    def _method_empirical(self, timeperiod):
+        """Apply 'empirical' method for generating weather sample:
+        historical values of the year drawn for the current realization (mean where a value is missing)"""
+        current_conditions = self._get_current_conditions(timeperiod)
+        values = current_conditions[self._realization_year]
+        mean = self._stat_values(current_conditions, "mean")
+        if mean is not None: values = numpy.where(numpy.isnan(values), mean, values)
+        return WeatherSample(self, values)
+
+    def _method_normal(self, timeperiod):
+        """Apply 'normal' method for generating weather sample:
+        mean + std * standard normal draw of the current realization at each half-hour slot of the time period,
+        clipped to historical min and max, then averaged over the slots (weighted by their number of mean records,
+        so the sample is the 'mean' sample when all draws are 0)"""
+        for stat in ["mean", "std"]:
+            if stat not in self._stats:
+                raise Exception("Weather error: no "+stat+" records found for location "+str(self._location_id))
+        slots = self._get_slots(timeperiod)
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            slot_conditions = self._sums[slots] / self._counts[slots] # slot x yearOrStat x metric
+        std = numpy.nan_to_num(slot_conditions[:, self._stats.index("std")])
+        values = slot_conditions[:, self._stats.index("mean")] + std * self._realization_normal[slots]
+        for stat, is_beyond in [("min", numpy.less), ("max", numpy.greater)]:
+            if stat not in self._stats: continue
+            bound = slot_conditions[:, self._stats.index(stat)]
+            values = numpy.where(is_beyond(values, bound), bound, values)
+        weights = self._counts[slots, self._stats.index("mean")]
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            values = numpy.where(weights > 0, values * weights, 0.0).sum(axis=0) / weights.sum(axis=0)
+        return WeatherSample(self, values)
+
+    def set_realization(self, realization):
+        """Draw the input realization (index) of the sample method for the entire year of slots at once.
+        Realizations are reproducible from the seed and index, independent of the order they are drawn in"""
+        if realization == self.realization: return
+        rng = numpy.random.default_rng([self._seed, realization])
+        if self._sample_method == "empirical":
+            years = [i for i, stat in enumerate(self._stats) if str(stat).isdigit()]
+            if len(years) == 0:
+                raise Exception("Weather error: no historical years found for location "+str(self._location_id))
+            self._realization_year = years[rng.integers(len(years))]
+        elif self._sample_method == "normal":
+            self._realization_normal = rng.standard_normal((_NUM_SLOTS, len(database_weather.METRIC_COLS_SQL)))
+        if self.realization is not None and self._sample_method != "mean":
+            self._cached_samples = dict()
+            self.renewable_profiles.clear()
+        self.realization = realization
+
+    def redraw(self):
+        """Draw the next realization"""
+        self.set_realization(self.realization + 1)
+
     def update(self, timeperiod):
         """Generate WeatherSample for input time period"""
-        if self._sample_method == "mean":
-            self.current_sample = self._method_mean(timeperiod)
-        elif self._sample_method == "empirical":
-            self.current_sample = None # need to write this method
-        elif self._sample_method == "normal":
-            self.current_sample = None # need to write this method
-        else:
-            raise ValueError("sample method for Weather undefined: "+self._sample_method)
+        if timeperiod not in self._cached_samples:
+            self._cached_samples[timeperiod] = getattr(self, "_method_"+self._sample_method)(timeperiod)
+        self.current_sample = self._cached_samples[timeperiod]
+
+def _slot(month, day, hour, minute):
+    """Half-hour slot of the (leap) year for input date and time values (scalars or arrays)"""
+    return (_DAYS_BEFORE_MONTH[numpy.asarray(month) - 1] + day - 1) * _SLOTS_PER_DAY \
+        + hour * 2 + numpy.asarray(minute) // 30
@@ -1 +1,3 @@
 from .metrics import Metrics
+from .array_metrics import ArrayMetrics
+from .streaming_metrics import StreamingMetrics
@@ -0,0 +1,139 @@
+import os
+import csv
+import io
+import numpy
+from src.utils import helpers
+from src.components import defaults
+import src.data.mysql.mysql_microgrid as mysql_microgrid
+
+class ArrayMetrics(object):
+
+    _EPSILON = 10**-10
+
+    def __init__(self, timesteps, state_arrays):
+        """ArrayMetrics constructor __init__
+        Same outputs as Metrics computed from arrays indexed by timestep
+        (summary outputs count each timestep as many times as its weight)
+
+        Keyword arguments:
+        timesteps          list of TimeStep objects in chronological order
+        state_arrays       GridStateArrays with one row per timestep
+        """
+        self.timesteps = timesteps
+        self.types = [defaults.LOAD] + state_arrays.types
+        self.duration = numpy.array([t.time_period().duration() for t in timesteps])
+        self.weight = numpy.array([t.weight() for t in timesteps], dtype=float)
+        self.load = numpy.array([t.power_load() for t in timesteps], dtype=float)
+        self.power = numpy.column_stack([-1 * self.load, state_arrays.power_generation])
+        self.deficit = -1 * self.load
+        for i in range(1, len(self.types)):
+            self.deficit = self.deficit + self.power[:, i]
+        self.supply = numpy.maximum(0.0, state_arrays.available_power_all)
+        self.load_peak = float(self.load.max())
+        self.load_median = float(numpy.median(self.load))
+        self.state_of_charge = state_arrays.state_of_charge
+        self.power_availability_ratio = numpy.ones(len(timesteps))
+        mask = state_arrays.non_degraded_power_total > defaults.EPSILON
+        self.power_availability_ratio[mask] = state_arrays.available_power_total[mask] \
+                                            / state_arrays.non_degraded_power_total[mask]
+        self.load_satisfaction_ratio = numpy.ones(len(timesteps))
+        mask = self.load > 0.0
+        self.load_satisfaction_ratio[mask] = numpy.minimum(
+            1.0, state_arrays.power_supply[mask] / self.load[mask]
+        )
+        self.available_power = state_arrays.available_power
+        self.excess_power = self.available_power - self.power[:, 1:]
+        self.case = state_arrays.case
+        self._diesel_consumption = state_arrays.diesel_consumption
+        self._diesel_is_wet_stacking = state_arrays.diesel_is_wet_stacking
+
+    def _type_index(self, type):
+        """Column index of input generator type in available power"""
+        return self.types.index(type) - 1
+
+    def summary_stats(self):
+        """Percent of powerload by type, including unmet powerload demand; total fuel consumption;
+        Total time wet stacking"""
+        percent_powerload_energy = "Contribution as a % of Total Energy"
+        total_diesel_gallons = "Diesel (gallons)"
+        total_diesel_wet_stacking_hours = "Diesel Generator Wet Stacking (hours)"
+        total_unmet_power_hours = "Unmet Power (hours)"
+        total_co2_pounds = "CO2 (pounds)"
+        unmet_energy = "Unmet Energy"
+        summary_stats = {
+            percent_powerload_energy: {
+                t:_sequential_sum(self.power[:, i] * (self.duration * self.weight)) for i, t in enumerate(self.types)
+            },
+            total_diesel_gallons: _sequential_sum(self.weight * self._diesel_consumption),
+            total_diesel_wet_stacking_hours: _sequential_sum(self._diesel_is_wet_stacking * (self.duration * self.weight)),
+            total_unmet_power_hours: self.deficit_time()
+        }
+        for t in self.types:
+            if t == defaults.LOAD: continue
+            summary_stats[percent_powerload_energy][t] /= -1 * summary_stats[percent_powerload_energy][defaults.LOAD]
+        summary_stats[percent_powerload_energy][defaults.LOAD] = 0
+        summary_stats[percent_powerload_energy][unmet_energy] = 1 - sum(summary_stats[percent_powerload_energy][t] for t in self.types)
+        del summary_stats[percent_powerload_energy][defaults.LOAD]
+        summary_stats[total_co2_pounds] = 22.45 * summary_stats[total_diesel_gallons]
+        return summary_stats
+
+    def results_to_csv(self, filename=None, round_output=False):
+        """Write csv file with data formatted to match Microgrid Excel tool"""
+        csv = "startDate,midDate,endDate"
+        for type in self.types:
+            csv += "," + type
+        csv += ",excess,stateOfCharge"
+        csv += "\n"
+        power = self.power.tolist()
+        state_of_charge = self.state_of_charge.tolist()
+        for i, timestep in enumerate(self.timesteps):
+            csv += timestep.time_period().start().strftime(mysql_microgrid.DATETIMEFORMAT) + ","
+            csv += timestep.time_period().mid().strftime(mysql_microgrid.DATETIMEFORMAT) + ","
+            csv += timestep.time_period().end().strftime(mysql_microgrid.DATETIMEFORMAT)
+            excess = 0.0
+            for value in power[i]:
+                csv += "," + str(round(value,3) if round_output else value)
+                excess += value
+            csv += ","+str(
+                round(excess,3) if round_output else excess
+            )+"," + str(state_of_charge[i])
+            csv += "\n"
+        if not filename:
+            return csv
+        if not os.path.exists(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        with open(filename, 'w') as f:
+            f.write(csv)
+
+    def deficit_time(self):
+        return _sequential_sum((self.duration * self.weight)[self.deficit < -self._EPSILON])
+
+    def deficit_percentage(self):
+        return _sequential_sum(self.weight[self.deficit < -self._EPSILON]) / _sequential_sum(self.weight)
+
+    def excess_percentage(self):
+        excess = numpy.zeros(len(self.timesteps))
+        for i in range(0, len(self.types)-1):
+            excess = excess + self.excess_power[:, i]
+        return _sequential_sum(self.weight[excess > 100 * self._EPSILON]) / _sequential_sum(self.weight)
+
+    def unused_percentage(self, type):
+        available_power = self.available_power[:, self._type_index(type)]
+        power = self.power[:, self._type_index(type)+1]
+        mask = (available_power > 100*self._EPSILON) & (power > 100*self._EPSILON) # differentiate battery charging vs. discharging
+        count = _sequential_sum(self.weight[mask])
+        ratio = _sequential_sum(self.weight[mask] * (available_power[mask] - power[mask]) / available_power[mask])
+        time_used_ratio = count / _sequential_sum(self.weight) if len(self.timesteps) > 0 else 0
+        return ratio / count if count > 0 else -1, time_used_ratio
+
+    def output_to_dict(self):
+        """write output to dictionary for frontend display"""
+        csv_data = self.results_to_csv(round_output=True)
+        list_of_dicts = [helpers.float_values(i) for i in list(csv.DictReader(io.StringIO(csv_data)))]
+        return {"output":list_of_dicts, "summary_stats":self.summary_stats()}
+
+
+def _sequential_sum(values):
+    """Sum values in order (matches the accumulation order of Metrics)"""
+    if len(values) == 0: return 0.0
+    return float(numpy.cumsum(values)[-1])
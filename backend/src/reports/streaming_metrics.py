@@ -0,0 +1,116 @@
+from src.components import defaults
+
+class StreamingMetrics(object):
+
+    _EPSILON = 10**-10
+
+    def __init__(self, timesteps, types):
+        """StreamingMetrics constructor __init__
+        Running totals updated once per timestep (see record); nothing is stored per timestep.
+        Same deficit, excess, unused and summary outputs as Metrics, without the per-timestep outputs
+        (each timestep counts as many times as its weight)
+
+        Keyword arguments:
+        timesteps          list of TimeStep objects in chronological order
+        types              list of generator types
+        """
+        self.timesteps = timesteps
+        self.types = [defaults.LOAD] + list(types)
+        self.num_recorded = 0
+        self._total_weight = sum(t.weight() for t in timesteps)
+        self._energy = { t:0.0 for t in self.types }
+        self._diesel_consumption = 0.0
+        self._diesel_wet_stacking_time = 0.0
+        self._deficit_time = 0.0
+        self._deficit_count = 0
+        self._excess_count = 0
+        self._unused_ratio = { t:0.0 for t in types }
+        self._used_count = { t:0 for t in types }
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}('
+           f'num_timesteps={len(self.timesteps)!r},'
+           f'types={self.types!r})')
+
+    def record(self, index, state):
+        """Add input GridState at input timestep index to the running totals"""
+        self.store(index, state.case(), state._non_degraded_power, state._available_power, state._power_generation,
+                   state.state_of_charge(), state.diesel_consumption(), state.diesel_is_wet_stacking())
+
+    def store(self, index, case, non_degraded_power, available_power, power_generation,
+              state_of_charge, diesel_consumption, diesel_is_wet_stacking):
+        """Add grid state at input timestep index to the running totals, from the same inputs
+        as the GridState constructor (see Grid.operate_into)"""
+        timestep = self.timesteps[index]
+        weight = timestep.weight()
+        duration = timestep.time_period().duration() * weight
+        power = { t:0.0 for t in self.types[1:] }
+        available = { t:0.0 for t in self.types[1:] }
+        for generator, value in power_generation.items():
+            power[generator.__class__.__name__] += value
+        for generator, value in available_power.items():
+            available[generator.__class__.__name__] += value
+        deficit = -1 * timestep.power_load()
+        excess = 0.0
+        self._energy[defaults.LOAD] += deficit * duration
+        for t in self.types[1:]:
+            deficit += power[t]
+            excess += available[t] - power[t]
+            self._energy[t] += power[t] * duration
+            if available[t] > 100*self._EPSILON and power[t] > 100*self._EPSILON:
+                self._unused_ratio[t] += weight * (available[t] - power[t]) / available[t]
+                self._used_count[t] += weight
+        if deficit < -self._EPSILON:
+            self._deficit_count += weight
+            self._deficit_time += duration
+        if excess > 100 * self._EPSILON:
+            self._excess_count += weight
+        self._diesel_consumption += weight * diesel_consumption
+        self._diesel_wet_stacking_time += diesel_is_wet_stacking * duration
+        self.num_recorded += 1
+
+    def is_complete(self):
+        """Checks if every timestep was recorded (a run stopped early gives partial totals)"""
+        return self.num_recorded == len(self.timesteps)
+
+    def has_deficit(self):
+        """Checks if any timestep recorded so far has a deficit"""
+        return self._deficit_count > 0
+
+    def summary_stats(self):
+        """Percent of powerload by type, including unmet powerload demand; total fuel consumption;
+        Total time wet stacking"""
+        percent_powerload_energy = "Contribution as a % of Total Energy"
+        total_diesel_gallons = "Diesel (gallons)"
+        total_diesel_wet_stacking_hours = "Diesel Generator Wet Stacking (hours)"
+        total_unmet_power_hours = "Unmet Power (hours)"
+        total_co2_pounds = "CO2 (pounds)"
+        unmet_energy = "Unmet Energy"
+        summary_stats = {
+            percent_powerload_energy: { t:self._energy[t] for t in self.types },
+            total_diesel_gallons: self._diesel_consumption,
+            total_diesel_wet_stacking_hours: self._diesel_wet_stacking_time,
+            total_unmet_power_hours: self.deficit_time()
+        }
+        for t in self.types:
+            if t == defaults.LOAD: continue
+            summary_stats[percent_powerload_energy][t] /= -1 * summary_stats[percent_powerload_energy][defaults.LOAD]
+        summary_stats[percent_powerload_energy][defaults.LOAD] = 0
+        summary_stats[percent_powerload_energy][unmet_energy] = 1 - sum(summary_stats[percent_powerload_energy][t] for t in self.types)
+        del summary_stats[percent_powerload_energy][defaults.LOAD]
+        summary_stats[total_co2_pounds] = 22.45 * summary_stats[total_diesel_gallons]
+        return summary_stats
+
+    def deficit_time(self):
+        return self._deficit_time
+
+    def deficit_percentage(self):
+        return self._deficit_count / self._total_weight
+
+    def excess_percentage(self):
+        return self._excess_count / self._total_weight
+
+    def unused_percentage(self, type):
+        count = self._used_count[type]
+        time_used_ratio = count / self._total_weight if len(self.timesteps) > 0 else 0
+        return self._unused_ratio[type] / count if count > 0 else -1, time_used_ratio
@@ -0,0 +1,31 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+_STATE = None # object shared with forked workers, see pool
+
+def get_num_workers(num_workers=None):
+    """Return input number of worker processes if positive,
+    otherwise the number of cpus allocated by Slurm to the task (or available to this process)"""
+    if num_workers is not None and num_workers > 0:
+        return int(num_workers)
+    if os.environ.get("SLURM_CPUS_PER_TASK"):
+        return max(1, int(os.environ["SLURM_CPUS_PER_TASK"]))
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def pool(num_workers, state):
+    """Return a process pool with workers forked from this process,
+    which get read-only access to input state through get_state
+    (shared copy-on-write, so simulations and weather are not pickled)"""
+    global _STATE
+    _STATE = state
+    return ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("fork"),
+    )
+
+def get_state():
+    """Return state of the pool this worker was forked from"""
+    return _STATE
@@ -1,16 +1,18 @@
 class TimeStep(object):
 
-    def __init__(self, time_period, power_load, sun_weight):
+    def __init__(self, time_period, power_load, sun_weight, weight=1.0):
         """TimeStep constructor __init__
 
         Keyword arguments:
         time_period        time period object
         power_load         constant / average power load during time period
         sun_weight         sun weight as a percent of max sun during time period
+        weight             number of timesteps this timestep stands for in summary metrics (representative days)
         """
         self._time_period = time_period
         self._power_load = power_load
         self._sun_weight = sun_weight
+        self._weight = weight
         self._online_ratio = None
         self._grid_state = None
 
@@ -29,6 +31,9 @@ class TimeStep(object):
     def update_sun_weight(self, sun_weight):
         self._sun_weight = sun_weight
 
+    def weight(self):
+        return self._weight
+
     def set_online_ratio(self, online_ratio):
         self._online_ratio = online_ratio
 
@@ -46,6 +51,7 @@ class TimeStep(object):
            f'time_period={self._time_period!r},'
            f'power_load={self._power_load!r},'
            f'sun_weight={self._sun_weight!r},'
+           f'weight={self._weight!r},'
            f'online_ratio={self._online_ratio!r},'
            f'grid_state={self._grid_state!r})')
 
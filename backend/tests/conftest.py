@@ -1,6 +1,8 @@
 import pytest
+from datetime import datetime
 from make import make_data
 from src.data.mysql import mysql_authentication, mysql_microgrid, mysql_weather
+import run.helpers as run_helpers
 
 def pytest_sessionstart(session):
     if not mysql_authentication.DB.exists() or mysql_authentication.DB.num_tables() == 0:
@@ -17,3 +19,18 @@ def pytest_sessionstart(session):
 
     if not mysql_weather.DB.exists() or mysql_weather.DB.num_tables() == 0:
         make_data.weather_database(drop_create_db=True)
+
+
+@pytest.fixture
+def params():
+    """Parameters of a simulation of the guest account grid with all component types over 12 hours
+    (a new dictionary for each test, override keys as needed)"""
+    return {
+        run_helpers.LOAD_ID:1, # guest account power load
+        run_helpers.GRID_ID:4, # guest account grid with all component types
+        run_helpers.LOCATION_ID:145612, # Monterey, California
+        run_helpers.ENERGY_MANAGEMENT_SYSTEM_ID:1, # default energy management system
+        run_helpers.STARTDATETIME:datetime.strptime("2023-09-01_08:00:00", '%Y-%m-%d_%H:%M:%S'),
+        run_helpers.ENDDATETIME:datetime.strptime("2023-09-01_20:00:00", '%Y-%m-%d_%H:%M:%S'),
+        run_helpers.WEATHER_SAMPLE_METHOD : "mean",
+    }
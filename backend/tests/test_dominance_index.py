@@ -0,0 +1,52 @@
+import pytest
+import random
+from src.models.sizing.model import Design, Result
+from src.models.sizing.dominance_index import DominanceIndex
+
+_DER_TYPES = ["SolarPhotovoltaicPanel", "WindTurbine", "DieselGenerator", "Battery"]
+
+def _result(rng):
+    """Result of a random design on a small grid of levels (so ratings tie on single DER types),
+    with no deficit half of the time"""
+    design = Design({ t:5*rng.randrange(4) for t in _DER_TYPES })
+    deficit_percentage = rng.choice([0.0, 0.0, 0.5, 1.0, rng.random()])
+    return Result(sizing=None, design=design, deficit_percentage=deficit_percentage, excess_percentage=0.0,
+                  unused_percentage=None, time_used_ratio=None, metrics_summary_stats=None, parent=None)
+
+def test_dominance_index():
+
+    # random results inserted one at a time, across many merges of trees
+    rng = random.Random(1)
+    index = DominanceIndex(_DER_TYPES)
+    results = []
+    for _ in range(300):
+        result = _result(rng)
+        index.insert(result)
+        results.append(result)
+
+        # test passes if queries match a scan of all results in insertion order
+        for probe in [result, rng.choice(results), _result(rng)]:
+            expected = next((r.get_name() for r in results if probe.is_dominated_by(r)), None)
+            assert(index.first_dominating(probe) == expected)
+            assert(index.dominates_design(probe.design) == any(r.deficit_percentage == 0.0 \
+                and probe.design.may_be_dominated_by(r.design) for r in results))
+    assert(len(index) == len(results))
+
+def test_dominance_index_sync():
+
+    # dictionary of results synced as results are appended, then replaced by a smaller dictionary
+    rng = random.Random(2)
+    index = DominanceIndex(_DER_TYPES)
+    results = dict()
+    for _ in range(100):
+        result = _result(rng)
+        results[result.get_name()] = result
+        index.sync(results)
+    probes = [_result(rng) for _ in range(50)]
+    smaller = dict(list(results.items())[:20])
+    expected = [next((r.get_name() for r in smaller.values() if p.is_dominated_by(r)), None) for p in probes]
+    index.sync(smaller)
+
+    # test passes if the index holds each result once and is rebuilt for the smaller dictionary
+    assert(len(index) == len(smaller))
+    assert([index.first_dominating(p) for p in probes] == expected)
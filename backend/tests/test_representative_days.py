@@ -0,0 +1,32 @@
+import pytest
+import math
+from datetime import datetime, timedelta
+from src.utils import TimePeriod, TimeStep
+from src.models.representative_days import representative_days
+
+def _timesteps(num_days, num_shapes):
+    """Half-hour timesteps of input number of days, with daily load of one of num_shapes shapes in turn
+    (so many days are identical) and a shorter last day"""
+    start = datetime(2024, 2, 1)
+    timesteps = []
+    for i in range(num_days*48 - 12):
+        time_period = TimePeriod(start=start + timedelta(minutes=30*i), mid=start + timedelta(minutes=30*i+15),
+                                 end=start + timedelta(minutes=30*(i+1)))
+        shape = (i // 48) % num_shapes
+        timesteps.append(TimeStep(time_period, 50.0 + 10.0*shape*math.sin(i*math.pi/24), 0.0))
+    return timesteps
+
+def test_representative_days_weights():
+
+    # days of a few distinct shapes, with a profile that is the same every day
+    for num_shapes in [1, 2, 5]:
+        timesteps = _timesteps(30, num_shapes)
+        profiles = [[max(0.0, math.sin((i % 48 - 12)*math.pi/24)) for i in range(len(timesteps))]]
+        for num_days in range(1, 12):
+            days = representative_days(timesteps, profiles, num_days)
+
+            # test passes if each day is chosen once and weights sum to the number of days
+            # (the number of timesteps for timestep weights)
+            assert(len(set(day[0] for day, _ in days)) == len(days))
+            assert(sum(weight for _, weight in days) == 30)
+            assert(sum(len(day)*weight for day, weight in days) == len(timesteps))
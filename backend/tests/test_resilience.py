@@ -0,0 +1,64 @@
+import pytest
+import math
+import statistics
+from datetime import datetime
+import run.helpers as run_helpers
+from src.grid import Disturbance
+from src.models import Resilience
+
+def _core_sim(params, method):
+    """Simulation of three days with a disturbance taking every generator offline on the second day"""
+    params[run_helpers.STARTDATETIME] = datetime.strptime("2023-09-01_00:00:00", '%Y-%m-%d_%H:%M:%S')
+    params[run_helpers.ENDDATETIME] = datetime.strptime("2023-09-04_00:00:00", '%Y-%m-%d_%H:%M:%S')
+    core_sim = run_helpers.initialize_simulation_object(params)
+    generators = core_sim.grid.get_generators()
+    core_sim.disturbance = Disturbance(
+        start_datetime=datetime.strptime("2023-09-02_03:00:00", '%Y-%m-%d_%H:%M:%S'),
+        probabilities=[{"componentId":g.id_(), "value":0.7, "quantity":1} for g in generators],
+        repair_times=[{"componentId":g.id_(), "value":6.0} for g in generators],
+        method=method,
+    )
+    return core_sim
+
+def test_resilience_parallel(params):
+
+    # run deterministic and stochastic disturbances in this process and in a pool of worker processes
+    for method, num_runs in [("deterministic", None), ("stochastic", 3)]:
+        results = []
+        for num_workers in [None, 2]:
+            resilience = Resilience(_core_sim(params, method), num_workers=num_workers, seed=3, num_runs=num_runs)
+            results.append(resilience.run(hours=12))
+
+        # test passes if worker processes give the same results
+        assert(results[0] == results[1])
+
+def test_resilience_monte_carlo(params):
+
+    # each realization of a stochastic disturbance, then their average
+    num_runs = 5
+    core_sim = _core_sim(params, "stochastic")
+    start = core_sim.disturbance.start_datetime
+    core_sim.set_incremental(True)
+    runs = Resilience(core_sim, seed=3, num_runs=num_runs)._realizations(None, range(num_runs), start, hours=12)
+    results = Resilience(_core_sim(params, "stochastic"), seed=3, num_runs=num_runs).run(hours=12)
+    single = Resilience(_core_sim(params, "stochastic"), seed=3).run(hours=12)
+
+    # test passes if results average the realizations with confidence intervals of the mean as scalar values
+    # and a single run is the first realization
+    z = statistics.NormalDist().inv_cdf(0.975)
+    for key in runs[0]:
+        values = [r[key] for r in runs]
+        assert(abs(results[key] - sum(values) / num_runs) < 10**-12)
+        assert(abs(results[key+" CI Half-Width"] - z * statistics.stdev(values) / math.sqrt(num_runs)) < 10**-12)
+        assert(single[key] == runs[0][key])
+    assert(results["Monte Carlo Runs"] == num_runs and not results["Monte Carlo Stopped Early"])
+    assert(all(isinstance(value, (bool, int, float)) for value in results.values()))
+    assert(all(not key.startswith("Monte Carlo") and not key.endswith("CI Half-Width") for key in single))
+
+    # runs stopped early by a tolerance every confidence interval is within, and never stopped by a tolerance of 0
+    stopped = Resilience(_core_sim(params, "stochastic"), seed=3, num_runs=30, tolerance=1.0).run(hours=12)
+    not_stopped = Resilience(_core_sim(params, "stochastic"), seed=3, num_runs=12, tolerance=0.0).run(hours=12)
+
+    # test passes if early stopping happens after the minimum number of runs
+    assert(stopped["Monte Carlo Runs"] == 10 and stopped["Monte Carlo Stopped Early"])
+    assert(not_stopped["Monte Carlo Runs"] == 12 and not not_stopped["Monte Carlo Stopped Early"])
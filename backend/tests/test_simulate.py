@@ -1,7 +1,9 @@
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta
 import src.data.mysql.simulate as database_simulate
 import run.helpers as run_helpers
+from src.grid import Disturbance
+from src.components.electric_generators import SolarPhotovoltaicPanel
 
 def test_simulate():
 
@@ -70,3 +72,122 @@ def test_simulate():
     assert(stats['DieselGenerator'] >= 0.0 and 
         stats['SolarPhotovoltaicPanel'] >= 0.0 and stats['WindTurbine'] >= 0.0
         and stats['Unmet Energy'] >= 0.0)
+
+def test_simulate_array_engine(params):
+
+    # shared parameters over a different horizon
+    params[run_helpers.ENDDATETIME] = datetime.strptime("2023-09-01_10:30:00", '%Y-%m-%d_%H:%M:%S')
+
+    # run both engines on the same inputs
+    metrics = {}
+    for engine in ["timestep", "array"]:
+        params[run_helpers.ENGINE] = engine
+        metrics[engine] = run_helpers.initialize_simulation_object(params).run()
+
+    # test passes if the array engine reproduces the timestep engine outputs
+    assert(metrics["timestep"].summary_stats() == metrics["array"].summary_stats())
+    assert(metrics["timestep"].results_to_csv() == metrics["array"].results_to_csv())
+    assert(metrics["timestep"].deficit_percentage() == metrics["array"].deficit_percentage())
+
+    # test passes if streaming metrics reproduce the summary outputs
+    streaming = run_helpers.initialize_simulation_object(params).run(streaming=True)
+    assert(metrics["timestep"].summary_stats() == streaming.summary_stats())
+    assert(metrics["timestep"].deficit_percentage() == streaming.deficit_percentage())
+    assert(metrics["timestep"].excess_percentage() == streaming.excess_percentage())
+
+def test_simulate_incremental(params):
+
+    # shared parameters over a different horizon
+    params[run_helpers.STARTDATETIME] = datetime.strptime("2023-09-01_00:00:00", '%Y-%m-%d_%H:%M:%S')
+    params[run_helpers.ENDDATETIME] = datetime.strptime("2023-09-03_00:00:00", '%Y-%m-%d_%H:%M:%S')
+
+    # disturbance taking every generator offline for 4 hours
+    core_sim = run_helpers.initialize_simulation_object(params)
+    generators = core_sim.grid.get_generators()
+    core_sim.disturbance = Disturbance(
+        start_datetime=datetime.strptime("2023-09-01_18:00:00", '%Y-%m-%d_%H:%M:%S'),
+        probabilities=[{"componentId":g.id_(), "value":1.0, "quantity":1} for g in generators],
+        repair_times=[{"componentId":g.id_(), "value":4.0} for g in generators],
+        method="deterministic",
+    )
+
+    # run all timesteps, then only timesteps that differ from a run without disturbance
+    metrics = core_sim.run()
+    csv = metrics.results_to_csv()
+    core_sim.set_incremental(True)
+    incremental = core_sim.run()
+
+    # test passes if the incremental run reproduces the outputs of the run of all timesteps
+    assert(metrics.summary_stats() == incremental.summary_stats())
+    assert(csv == incremental.results_to_csv())
+
+def test_disturbance_online_ratio(params):
+
+    # shared parameters over two days
+    params[run_helpers.STARTDATETIME] = datetime.strptime("2023-09-01_00:00:00", '%Y-%m-%d_%H:%M:%S')
+    params[run_helpers.ENDDATETIME] = datetime.strptime("2023-09-03_00:00:00", '%Y-%m-%d_%H:%M:%S')
+
+    # disturbance taking every generator offline for 6 minutes, within a single time period
+    core_sim = run_helpers.initialize_simulation_object(params)
+    generators = core_sim.grid.get_generators()
+    time_periods = [t.time_period() for t in core_sim.timesteps]
+    disturbed = time_periods[10]
+    disturbance = Disturbance(
+        start_datetime=disturbed.start() + (disturbed.end() - disturbed.start()) / 4,
+        probabilities=[{"componentId":g.id_(), "value":1.0, "quantity":1} for g in generators],
+        repair_times=[{"componentId":g.id_(), "value":0.1} for g in generators],
+        method="deterministic",
+    )
+    disturbance.simulate(core_sim.grid)
+    online_ratios = disturbance.propogate(core_sim.grid, time_periods)
+
+    # test passes if generators are offline for the duration of the disturbance in that time period only
+    assert(online_ratios.shape == (len(time_periods), len(generators)))
+    assert(all(abs(ratio - (1.0 - 0.1 / disturbed.duration())) < 10**-9 for ratio in online_ratios[10]))
+    assert((online_ratios[:10] == 1.0).all() and (online_ratios[11:] == 1.0).all())
+
+    # disturbance taking generators offline for different durations across several time periods
+    repair_times = [0.0, 1.3, 5.0, 30.0]
+    disturbance = Disturbance(
+        start_datetime=disturbed.start() + (disturbed.end() - disturbed.start()) / 3,
+        probabilities=[{"componentId":g.id_(), "value":1.0, "quantity":1} for g in generators],
+        repair_times=[{"componentId":g.id_(), "value":repair_times[i % len(repair_times)]} \
+                      for i, g in enumerate(generators)],
+        method="deterministic",
+    )
+    disturbance.simulate(core_sim.grid)
+    online_ratios = disturbance.propogate(core_sim.grid, time_periods)
+
+    # test passes if online ratios match the overlap of each time period with each outage
+    for column, generator in enumerate(generators):
+        end = disturbance.start_datetime + timedelta(hours=repair_times[column % len(repair_times)])
+        for row, time_period in enumerate(time_periods):
+            overlap = (min(time_period.end(), end) - max(time_period.start(), disturbance.start_datetime)).total_seconds()
+            expected = 1.0 - max(overlap, 0.0) / 3600.0 / time_period.duration()
+            assert(abs(online_ratios[row, column] - expected) < 10**-9)
+
+def test_photovoltaic_profile(params):
+
+    # power per unit from one PVwatts run over the horizon and from one run per timestep
+    core_sim = run_helpers.initialize_simulation_object(params)
+    weather = core_sim._weather
+    panels = [g for g in core_sim.grid.get_generators() if isinstance(g, SolarPhotovoltaicPanel)]
+    assert(len(panels) > 0)
+    for panel in panels:
+        panel.prepare_profile(core_sim.timesteps, weather)
+        profile, per_timestep = [], []
+        for timestep in core_sim.timesteps:
+            weather.update(timestep.time_period())
+            panel.update_current_conditions(timestep, weather)
+            profile.append(panel._power_per_unit())
+            per_timestep.append(panel._power_pvwatts())
+
+        # test passes if the run over the horizon is within 5% of the runs per timestep in energy
+        assert(abs(sum(profile) - sum(per_timestep)) <= 0.05 * sum(per_timestep))
+
+        # test passes if values of the run over the horizon are not used outside of it
+        for timestep, value in zip(core_sim.timesteps, per_timestep):
+            panel.prepare_profile([timestep], weather)
+            weather.update(timestep.time_period())
+            panel.update_current_conditions(timestep, weather)
+            assert(panel._power_per_unit() == value)
@@ -1,7 +1,14 @@
 import pytest
 from datetime import datetime
+from itertools import product
 import src.data.mysql.sizing as database_sizing
 import run.helpers as run_helpers
+from src.models import Sizing
+
+def _written_values(sizing):
+    """Values of each result written to csv (row without dominated by and parent) keyed by design name"""
+    rows = sizing.results_to_csv().splitlines()[1:]
+    return { row.split(",")[0]:row.rsplit(",", 2)[0] for row in rows if row != "" }
 
 def test_sizing():
 
@@ -71,3 +78,190 @@ def test_sizing():
 
     # test passes if all component types aside from battery have a non-negative contribution
     assert(results is not None)
+
+def test_sizing_batch(params):
+
+    # run exact algorithm one design at a time and in batches
+    results_csv = []
+    for batch_size in [None, 16]:
+        sizing = Sizing(run_helpers.initialize_simulation_object(params), 4, batch_size=batch_size)
+        sizing.run(algorithm="exact")
+        results_csv.append(sizing.results_to_csv())
+
+    # test passes if batched designs give the same results
+    assert(results_csv[0] == results_csv[1])
+
+def test_sizing_parallel(params):
+
+    # run exact algorithm in this process and in a pool of worker processes
+    results_csv = []
+    for num_workers in [None, 2]:
+        sizing = Sizing(run_helpers.initialize_simulation_object(params), 4, num_workers=num_workers)
+        sizing.run(algorithm="exact")
+        results_csv.append(sizing.results_to_csv())
+
+    # test passes if worker processes give the same results
+    assert(results_csv[0] == results_csv[1])
+
+def test_sizing_frontier(params):
+
+    # run exact and frontier algorithms, then frontier algorithm stopping designs at their first deficit
+    non_dominated = []
+    values = []
+    for algorithm, stop_on_deficit in [("exact", False), ("frontier", False), ("frontier", True)]:
+        sizing = Sizing(run_helpers.initialize_simulation_object(params), 4, stop_on_deficit=stop_on_deficit)
+        sizing.run(algorithm=algorithm)
+        non_dominated.append(sorted(result.get_name() for result in sizing.results.values() \
+                                    if result.deficit_percentage == 0.0 and not result.is_dominated()))
+        values.append(_written_values(sizing))
+
+    # test passes if all runs find the same designs without deficit that are not dominated
+    # and designs searched by the frontier algorithm are written with the values of all timesteps
+    assert(non_dominated[0] == non_dominated[1] == non_dominated[2])
+    assert(all(sizing.results[name].complete for name in values[2]))
+    assert(all(values[2][name] == values[1][name] for name in values[2]))
+
+def test_sizing_screening(params):
+
+    # shared parameters over a different horizon
+    params[run_helpers.STARTDATETIME] = datetime.strptime("2023-09-01_00:00:00", '%Y-%m-%d_%H:%M:%S')
+    params[run_helpers.ENDDATETIME] = datetime.strptime("2023-09-15_00:00:00", '%Y-%m-%d_%H:%M:%S')
+
+    # run frontier algorithm on representative days
+    sizing = Sizing(run_helpers.initialize_simulation_object(params), 4, screening_days=4)
+    sizing.run(algorithm="frontier")
+    values = _written_values(sizing)
+
+    # simulate all timesteps of the designs written
+    baseline = Sizing(run_helpers.initialize_simulation_object(params), 4)
+    baseline_values = { name:baseline._simulate(sizing.results[name].design, None).to_csv().rsplit(",", 2)[0] \
+                        for name in values }
+
+    # test passes if the simulation is back on all timesteps,
+    # designs without deficit that are not dominated were verified on all timesteps
+    # and no result written has values from the representative days
+    assert(sizing.core_sim.timesteps[0].weight() == 1.0)
+    assert(all(result.complete for result in sizing.results.values() \
+               if result.deficit_percentage == 0.0 and not result.is_dominated()))
+    assert(values == baseline_values)
+
+def test_sizing_coarse(params):
+
+    # shared parameters over a different horizon
+    params[run_helpers.STARTDATETIME] = datetime.strptime("2023-09-01_00:00:00", '%Y-%m-%d_%H:%M:%S')
+    params[run_helpers.ENDDATETIME] = datetime.strptime("2023-09-04_00:00:00", '%Y-%m-%d_%H:%M:%S')
+
+    # run frontier algorithm on 2-hour timesteps
+    core_sim = run_helpers.initialize_simulation_object(params)
+    num_timesteps = len(core_sim.timesteps)
+    sizing = Sizing(core_sim, 4, coarse_hours=2)
+    sizing.run(algorithm="frontier")
+    values = _written_values(sizing)
+
+    # simulate the designs written at the powerload resolution
+    baseline = Sizing(run_helpers.initialize_simulation_object(params), 4)
+    baseline_values = { name:baseline._simulate(sizing.results[name].design, None).to_csv().rsplit(",", 2)[0] \
+                        for name in values }
+
+    # test passes if the simulation is back at the powerload resolution,
+    # designs without deficit that are not dominated were verified at that resolution
+    # and no result written has values from the aggregated timesteps
+    assert(len(sizing.core_sim.timesteps) == num_timesteps)
+    assert(all(result.complete for result in sizing.results.values() \
+               if result.deficit_percentage == 0.0 and not result.is_dominated()))
+    assert(values == baseline_values)
+
+def test_sizing_coarse_spurious_deficit(params):
+
+    # shared parameters over a different horizon
+    params[run_helpers.STARTDATETIME] = datetime.strptime("2023-09-01_00:00:00", '%Y-%m-%d_%H:%M:%S')
+    params[run_helpers.ENDDATETIME] = datetime.strptime("2023-09-04_00:00:00", '%Y-%m-%d_%H:%M:%S')
+
+    # exact search on 2-hour timesteps, where designs without deficit that are not dominated get a spurious deficit
+    # and designs below them are left out of the results, as if pruned by the search
+    sizing = Sizing(run_helpers.initialize_simulation_object(params), 4, coarse_hours=2)
+    def search():
+        sizing._run_exact()
+        spurious = list(sizing._filter_non_dominated(0.0).values())
+        for result in spurious: result.deficit_percentage = 1.0
+        for name in [name for name, result in sizing.results.items() \
+                     if any(s.design.may_be_dominated_by(result.design) for s in spurious)]:
+            del sizing.results[name]
+    sizing._screen(search)
+    values = _written_values(sizing)
+
+    # exact search at the powerload resolution
+    baseline = Sizing(run_helpers.initialize_simulation_object(params), 4)
+    baseline.run(algorithm="exact")
+    baseline_values = { name:baseline._simulate(sizing.results[name].design, None).to_csv().rsplit(",", 2)[0] \
+                        for name in values }
+
+    # test passes if designs with a spurious deficit and the designs below them are verified,
+    # so that no design without deficit that is not dominated is lost to screening
+    assert(set(name for name, result in baseline.results.items() \
+               if result.deficit_percentage == 0.0 and not result.is_dominated()) \
+           <= set(name for name, result in sizing.results.items() \
+                  if result.deficit_percentage == 0.0 and not result.is_dominated()))
+    assert(values == baseline_values)
+
+def test_sizing_energy_bounds(params):
+
+    # run exact algorithm with and without energy bounds
+    results = []
+    for energy_bounds in [False, True]:
+        sizing = Sizing(run_helpers.initialize_simulation_object(params), 4, energy_bounds=energy_bounds)
+        sizing.run(algorithm="exact")
+        results.append(sizing.results)
+
+    # test passes if designs skipped by energy bounds have a deficit
+    # and designs without deficit that are not dominated are the same
+    assert(all(results[0][name].deficit_percentage > 0.0 for name in results[0] if name not in results[1]))
+    assert(sorted(name for name, result in results[0].items() if result.deficit_percentage == 0.0 and not result.is_dominated()) \
+           == sorted(name for name, result in results[1].items() if result.deficit_percentage == 0.0 and not result.is_dominated()))
+
+def test_sizing_stop_on_deficit(params):
+
+    # run exact algorithm on all timesteps of every design, and stopping designs at their first deficit
+    values = []
+    for stop_on_deficit in [False, True]:
+        sizing = Sizing(run_helpers.initialize_simulation_object(params), 4, stop_on_deficit=stop_on_deficit)
+        sizing.run(algorithm="exact")
+        values.append(_written_values(sizing))
+
+    # test passes if no result stopped at its first deficit is written
+    # and every result written has the values of the simulation of all timesteps
+    assert(all(result.complete for name, result in sizing.results.items() if name in values[1]))
+    assert(all(values[1][name] == values[0][name] for name in values[1]))
+
+def test_sizing_heuristic_parallel(params):
+
+    # run heuristic algorithm in this process and in a pool of worker processes
+    sizings = []
+    for num_workers in [None, 2]:
+        sizing = Sizing(run_helpers.initialize_simulation_object(params), 6, num_workers=num_workers)
+        sizing.run(algorithm="heuristic")
+        sizings.append(sizing)
+
+    # test passes if search chains run by worker processes give the same results in the same order
+    assert(sizings[0].results_to_csv() == sizings[1].results_to_csv())
+    assert(list(sizings[0].results) == list(sizings[1].results))
+
+    # test passes if merged results link to parent and dominating results of the merged results
+    results = sizings[1].results
+    assert(any(result.parent is not None for result in results.values()))
+    assert(all(result.parent is None or results[result.parent.get_name()] is result.parent
+               for result in results.values()))
+    assert(all(result.dominated_by is None or results[result.dominated_by.get_name()] is result.dominated_by
+               for result in results.values()))
+
+def test_sizing_energy_bounds_deficit(params):
+
+    # designs of all combinations of levels that energy bounds prove to have a deficit
+    sizing = Sizing(run_helpers.initialize_simulation_object(params), 4, energy_bounds=True)
+    sizing._generate_levels(4)
+    designs = [sizing._combination_design(c) for c in product(range(4), repeat=len(sizing.der_types))]
+    rejected = [design for design in designs if sizing._has_bounded_deficit(design)]
+
+    # test passes if some designs are rejected and every one of them has a deficit when simulated
+    assert(len(rejected) > 0)
+    assert(all(sizing._simulate(design, None).deficit_percentage > 0.0 for design in rejected))
@@ -0,0 +1,43 @@
+import pytest
+from types import SimpleNamespace
+from datetime import datetime
+import src.data.sqlite.sizing_results as store_sizing_results
+import run.helpers as run_helpers
+from src.models import Sizing
+
+def test_sizing_results_eviction(tmp_path, monkeypatch):
+
+    # store results at increasing times, then use some of the oldest ones again
+    clock = SimpleNamespace(now=0.0)
+    def tick():
+        clock.now += 1.0
+        return clock.now
+    monkeypatch.setattr(store_sizing_results, "time", SimpleNamespace(time=tick))
+    for i in range(10):
+        store_sizing_results.put(tmp_path, { "key-"+str(i):{ "value":i } })
+    for i in [0, 2]:
+        assert(store_sizing_results.get(tmp_path, "key-"+str(i)) == { "value":i })
+
+    # keep 5 results
+    store_sizing_results.trim(tmp_path, max_entries=5)
+    kept = [i for i in range(10) if store_sizing_results.get(tmp_path, "key-"+str(i)) is not None]
+
+    # test passes if the least recently used results were evicted
+    assert(kept == [0, 2, 7, 8, 9])
+
+def test_sizing_results_signature(params, tmp_path):
+
+    # run exact algorithm storing results, then look them up from the same and from a different simulation
+    sizing = Sizing(run_helpers.initialize_simulation_object(params), 4, cache_dir=tmp_path)
+    sizing.run(algorithm="exact")
+    same = Sizing(run_helpers.initialize_simulation_object(params), 4, cache_dir=tmp_path)
+    params[run_helpers.ENDDATETIME] = datetime.strptime("2023-09-01_18:00:00", '%Y-%m-%d_%H:%M:%S')
+    other = Sizing(run_helpers.initialize_simulation_object(params), 4, cache_dir=tmp_path)
+
+    # test passes if the same simulation finds every result with the same values
+    # and a simulation with a different signature finds none
+    assert(same._signature == sizing._signature and other._signature != sizing._signature)
+    for result in sizing.results.values():
+        stored = same._stored_result(result.design, None)
+        assert(stored is not None and stored.to_csv().rsplit(",", 2)[0] == result.to_csv().rsplit(",", 2)[0])
+        assert(other._stored_result(result.design, None) is None)
@@ -0,0 +1,121 @@
+import pytest
+import numpy
+import pandas
+from datetime import datetime, timedelta
+import src.data.mysql.weather as database_weather
+import src.data.npy.weather as npy_weather
+from src.models import Weather
+from src.utils import TimePeriod
+
+_LOCATION_ID = 145612 # Monterey, California
+
+def _time_period(start, hours):
+    """Time period of input duration in hours from input start datetime"""
+    return TimePeriod(start=start, mid=start + timedelta(hours=hours/2.0), end=start + timedelta(hours=hours))
+
+def _dataframe_conditions(dataframe, time_period):
+    """Mean of each metric by yearOrStat over the database records of input time period (on half hours),
+    selected with dataframe masks: February 29th is read as March 1st and periods may wrap around the year"""
+    start = time_period.start().replace(year=1904)
+    end = time_period.end().replace(year=1904)
+    if start.month == 2 and start.day == 29:
+        start, end = start + timedelta(days=1), end + timedelta(days=1)
+    if start <= end: records = dataframe.loc[(dataframe["datetime"] >= start) & (dataframe["datetime"] <= end)]
+    else: records = dataframe.loc[(dataframe["datetime"] >= start) | (dataframe["datetime"] <= end)]
+    return records.groupby("yearOrStat")[database_weather.METRIC_COLS_SQL].agg("mean").sort_index().to_numpy()
+
+def test_weather_cache_signature(tmp_path):
+
+    # signature of the database records: number of records, sum of each metric column and a checksum of records
+    signature = database_weather.signature(_LOCATION_ID)
+    assert(len(signature) == len(database_weather.METRIC_COLS_SQL) + 2)
+    assert(signature == database_weather.signature(_LOCATION_ID))
+
+    # cache written with the signature over the signature columns
+    sums, counts = numpy.ones((4, 2, 3)), numpy.ones((4, 2, 3), dtype=numpy.int32)
+    signature_cols, metric_cols = database_weather.SIGNATURE_COLS_SQL, database_weather.METRIC_COLS_SQL
+    npy_weather.write(tmp_path, _LOCATION_ID, signature, signature_cols, metric_cols, ["mean", "std"], sums, counts)
+
+    # test passes if the cache is read only with the same signature over the same signature columns
+    assert(npy_weather.read(tmp_path, _LOCATION_ID, signature, signature_cols, metric_cols) is not None)
+    changed = signature[:-1] + [signature[-1] + "0"]
+    assert(npy_weather.read(tmp_path, _LOCATION_ID, changed, signature_cols, metric_cols) is None)
+    assert(npy_weather.read(tmp_path, _LOCATION_ID, signature, signature_cols[:-1], metric_cols) is None)
+
+def test_weather_slots(tmp_path):
+
+    # database records with a datetime of the placeholder leap year
+    dataframe = database_weather.read(_LOCATION_ID)
+    dataframe["datetime"] = pandas.to_datetime(dataframe[["month", "day", "hour", "minute"]].assign(year=1904))
+
+    # time periods on several dates, including February 29th, December 31st and periods across the new year
+    time_periods = [_time_period(datetime(2023, 1, 1, 0, 0), 0.5), _time_period(datetime(2023, 6, 15, 12, 30), 3.0),
+                    _time_period(datetime(2024, 2, 28, 23, 30), 0.5), _time_period(datetime(2024, 2, 29, 10, 0), 0.5),
+                    _time_period(datetime(2024, 2, 29, 23, 0), 2.0), _time_period(datetime(2024, 3, 1, 0, 0), 1.0),
+                    _time_period(datetime(2023, 12, 31, 23, 30), 0.5), _time_period(datetime(2023, 12, 31, 23, 0), 2.0),
+                    _time_period(datetime(2024, 12, 31, 12, 0), 1.0)]
+
+    # weather read from the database, then written to and read from the local cache
+    weathers = [Weather(_LOCATION_ID, "mean"), Weather(_LOCATION_ID, "mean", cache_dir=tmp_path),
+                Weather(_LOCATION_ID, "mean", cache_dir=tmp_path)]
+
+    # test passes if the slot arrays reproduce the records selected by datetime for every yearOrStat,
+    # and cached arrays are memory-mapped and give the same samples
+    assert(isinstance(weathers[2]._sums, numpy.memmap))
+    for time_period in time_periods:
+        expected = _dataframe_conditions(dataframe, time_period)
+        for weather in weathers:
+            assert(weather._stats == sorted(dataframe["yearOrStat"].unique()))
+            assert(numpy.allclose(weather._get_current_conditions(time_period), expected, equal_nan=True))
+            weather.update(time_period)
+            assert(weather.current_sample.temperature == weathers[0].current_sample.temperature)
+            assert(weather.current_sample.global_horizontal_irradiance \
+                   == weathers[0].current_sample.global_horizontal_irradiance)
+
+def test_weather_normal():
+
+    # samples of the normal method over periods of one to several half-hour slots
+    time_periods = [_time_period(datetime(2023, 1, 1, 0, 0), 0.5), _time_period(datetime(2023, 6, 15, 12, 30), 3.0),
+                    _time_period(datetime(2023, 12, 31, 23, 0), 2.0)]
+    def samples(weather):
+        values = []
+        for time_period in time_periods:
+            weather.update(time_period)
+            values.append((weather.current_sample.temperature, weather.current_sample.global_horizontal_irradiance,
+                           weather.current_sample.wind_speed))
+        return values
+
+    # same seed and realization drawn directly or after others, other seed, other realization
+    weather = Weather(_LOCATION_ID, "normal", seed=5)
+    first = samples(weather)
+    weather.redraw()
+    weather.redraw()
+    third = samples(weather)
+    again = Weather(_LOCATION_ID, "normal", seed=5)
+    again.set_realization(2)
+    again_third = samples(again)
+    other_seed = samples(Weather(_LOCATION_ID, "normal", seed=6))
+
+    # test passes if realizations are reproducible from the seed and realization only
+    assert(samples(Weather(_LOCATION_ID, "normal", seed=5)) == first)
+    assert(again_third == third)
+    assert(third != first and other_seed != first)
+
+    # draws of 0 at every slot, then a different draw at every slot but the first
+    mean = Weather(_LOCATION_ID, "mean")
+    weather = Weather(_LOCATION_ID, "normal", seed=5)
+    weather._realization_normal = numpy.zeros(weather._realization_normal.shape)
+    for time_period in time_periods:
+        mean.update(time_period)
+        weather.update(time_period)
+        sample = weather.current_sample
+        slots = weather._get_slots(time_period)
+        weather._realization_normal[slots[1:]] = 1.0
+        weather._cached_samples = dict()
+        weather.update(time_period)
+
+        # test passes if draws of 0 give the mean sample and the draw of every slot of the period counts
+        assert(abs(sample.temperature - mean.current_sample.temperature) < 10**-9)
+        assert(abs(sample.wind_speed - mean.current_sample.wind_speed) < 10**-9)
+        assert(weather.current_sample.temperature > sample.temperature)
+        weather._realization_normal[slots] = 0.0
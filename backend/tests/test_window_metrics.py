@@ -0,0 +1,72 @@
+import pytest
+import random
+import statistics
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+from src.utils import TimePeriod, TimeStep
+from src.models.resilience.model import _time_window
+from src.models.resilience.window_metrics import WindowMetrics
+
+def _metrics(rng, num_timesteps):
+    """Metrics of random load and supply at half-hour timesteps (some loads and supplies are 0)"""
+    start = datetime(2023, 9, 1)
+    timesteps = [TimeStep(TimePeriod(start=start + timedelta(minutes=30*i), mid=start + timedelta(minutes=30*i+15),
+                                     end=start + timedelta(minutes=30*(i+1))), 0.0, 0.0) for i in range(num_timesteps)]
+    load = { t:rng.choice([0.0, rng.uniform(10.0, 100.0)]) for t in timesteps }
+    supply = { t:rng.choice([0.0, load[t], rng.uniform(0.0, 120.0)]) for t in timesteps }
+    return SimpleNamespace(
+        timesteps=timesteps,
+        load=load,
+        supply=supply,
+        load_satisfaction_ratio={ t:min(1.0, supply[t]/load[t]) if load[t] > 0.0 else 1.0 for t in timesteps },
+        load_median=statistics.median(load.values()),
+        load_peak=max(load.values()),
+    )
+
+def _performance(supply, denominator):
+    """Performance of a timestep (loop implementation of the fixed window methods)"""
+    return min(1.0, supply/denominator) if denominator > 0.0 else 1.0
+
+def _window_results(metrics, window):
+    """Fixed window methods over the input list of timesteps, one timestep at a time"""
+    duration = (window[-1].time_period().end() - window[0].time_period().start()).total_seconds() / 3600.0
+    energy_supply = sum(min(metrics.supply[t], metrics.load[t]) * t.time_period().duration() for t in window)
+    energy_load = sum(metrics.load[t] * t.time_period().duration() for t in window)
+    measured = [t for t in window if metrics.load[t] > metrics.load_median]
+    if len(measured) == 0:
+        window_median = statistics.median([metrics.load[t] for t in window])
+        measured = [t for t in window if metrics.load[t] >= window_median]
+    return {
+        "Invulnerability-Recovery":0.5 * metrics.load_satisfaction_ratio[window[0]] \
+            + 0.5 * (energy_supply/energy_load if energy_load > 0.0 else 1.0),
+        "Average Performance Demand":sum(_performance(metrics.supply[t], metrics.load[t]) * t.time_period().duration() \
+            for t in window) / duration,
+        "Average Performance Peak Demand":sum(_performance(metrics.supply[t], metrics.load_peak) \
+            * t.time_period().duration() for t in window) / duration,
+        "Average Performance Median Demand":sum(_performance(metrics.supply[t], metrics.load[t]) \
+            * t.time_period().duration() for t in measured) / sum(t.time_period().duration() for t in measured),
+    }
+
+def test_window_metrics():
+
+    # random metrics and windows, including windows before, after and over all timesteps,
+    # windows of zero length and windows without load above the median
+    rng = random.Random(1)
+    for num_timesteps in [1, 2, 48, 200]:
+        metrics = _metrics(rng, num_timesteps)
+        window_metrics = WindowMetrics(metrics)
+        first = metrics.timesteps[0].time_period()
+        last = metrics.timesteps[-1].time_period()
+        windows = [(first.start() - timedelta(hours=5), first.start() - timedelta(hours=1)),
+                   (last.end() + timedelta(hours=1), last.end() + timedelta(hours=5)),
+                   (first.start(), last.end()), (first.mid(), first.mid()), (last.mid(), last.mid())]
+        for _ in range(200):
+            start = first.start() + timedelta(minutes=rng.randrange(-60, 30*num_timesteps + 60))
+            windows.append((start, start + timedelta(minutes=rng.choice([0, 15, 30, rng.randrange(0, 30*num_timesteps)]))))
+
+        # test passes if results from cumulative sums match the loops over the timesteps of each window
+        for start, end in windows:
+            expected = _window_results(metrics, _time_window(metrics.timesteps, start, end))
+            results = window_metrics.results(start, end)
+            assert(results.keys() == expected.keys())
+            assert(all(abs(results[key] - expected[key]) < 10**-9 for key in expected))